@@ -0,0 +1,95 @@
+"""
+JWT authentication that does not load the user row on every request.
+
+The access token only identifies the user; the flags authorization depends
+on (is_active, is_staff, is_superuser) come from a small per-process cache
+with a short TTL, filled with a narrow query on a miss. request.user is a
+real User instance with only those fields loaded, so request.user.id and
+FK lookups like filter(user=request.user) never touch the users table.
+Any other field is loaded from the database on first access.
+"""
+
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+CLAIM_FIELDS = ("id", "is_active", "is_staff", "is_superuser")
+
+# Bound on cached users per process; the cache is simply emptied when full
+MAX_CACHED_USERS = 10000
+
+_claims_cache = {}
+_claims_lock = threading.Lock()
+
+
+def get_user_claims(user_id):
+    """
+    Return a dict with the CLAIM_FIELDS of a user, or None if it does not exist.
+    """
+    now = time.monotonic()
+    cached = _claims_cache.get(user_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    claims = (
+        get_user_model()
+        .objects.filter(pk=user_id)
+        .values(*CLAIM_FIELDS)
+        .first()
+    )
+    if claims is not None:
+        with _claims_lock:
+            if len(_claims_cache) >= MAX_CACHED_USERS:
+                _claims_cache.clear()
+            _claims_cache[user_id] = (now + settings.AUTH_USER_CACHE_TTL, claims)
+    return claims
+
+
+def invalidate_user_claims(user_id):
+    """
+    Drop a user's cached claims in this process. Other processes see the
+    change once their entry expires, after at most AUTH_USER_CACHE_TTL.
+    """
+    with _claims_lock:
+        _claims_cache.pop(user_id, None)
+
+
+def clear_user_claims():
+    with _claims_lock:
+        _claims_cache.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        # Revocation on password change needs the password hash
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        claims = get_user_claims(user_id)
+        if claims is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        # from_db() expects the values in model field order
+        field_names = [
+            field.attname
+            for field in self.user_model._meta.concrete_fields
+            if field.attname in claims
+        ]
+        user = self.user_model.from_db(
+            self.user_model.objects.db,
+            field_names,
+            [claims[name] for name in field_names],
+        )
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -8,7 +8,10 @@ from accounts.api.utils import custom_password_validator
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
         data = super().validate(attrs)
-        serializer = UserSerializerWithToken(self.user).data
+        # Reuse the access token minted above instead of signing a new pair
+        serializer = UserSerializerWithToken(
+            self.user, context={"access_token": data["access"]}
+        ).data
         for k, v in serializer.items():
             data[k] = v
 
@@ -74,6 +77,8 @@ class UserSerializerWithToken(UserSerializer):
         ]
 
     def get_token(self, obj):
+        if "access_token" in self.context:
+            return self.context["access_token"]
         token = RefreshToken.for_user(obj)
         return str(token.access_token)
 
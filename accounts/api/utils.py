@@ -5,9 +5,12 @@ from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from datetime import datetime, timedelta
 import time
 from django.contrib.auth import get_user_model
+from core.mail import queue_email
 import re
 
 
@@ -49,21 +52,13 @@ class AccountTokenGenerator(PasswordResetTokenGenerator):
 account_token_generator = AccountTokenGenerator()
 
 
-def send_user_email(request, user, mail_subject, email_template):
+def render_user_email(user, email_template):
     """
-    Sends an email to a user for various purposes such as account
-    verification or password reset.
-
-    Parameters:
-    - request: HttpRequest object.
-    - user: The user instance to whom the email is to be sent.
-    - mail_subject: Subject of the email.
-    - email_template: Path to the template used for the email body.
+    Render an account email (verification, password reset) for a user.
     """
-    from_email = settings.DEFAULT_FROM_EMAIL
     frontend_site = settings.FRONTEND_BASE_URL
     scheme = "https" if "https" in frontend_site else "http"
-    message = render_to_string(
+    return render_to_string(
         email_template,
         {
             "user": user,
@@ -74,28 +69,105 @@ def send_user_email(request, user, mail_subject, email_template):
             "timestamp": int(time.time()),
         },
     )
+
+
+def send_user_email(request, user, mail_subject, email_template):
+    """
+    Sends an email to a user for various purposes such as account
+    verification or password reset.
+
+    Parameters:
+    - request: HttpRequest object.
+    - user: The user instance to whom the email is to be sent.
+    - mail_subject: Subject of the email.
+    - email_template: Path to the template used for the email body.
+    """
+    from_email = settings.DEFAULT_FROM_EMAIL
+    message = render_user_email(user, email_template)
     to_email = user.email
     mail = EmailMessage(mail_subject, message, from_email, to=[to_email])
     mail.content_subtype = "html"
     mail.send()
 
 
+def queue_user_email(user, mail_subject, email_template):
+    """
+    Like send_user_email, but only queues the email in the email outbox;
+    the send_queued_emails worker delivers it.
+    """
+    return queue_email(
+        mail_subject,
+        render_user_email(user, email_template),
+        to=[user.email],
+        content_subtype="html",
+    )
+
+
 def generate_username(email, first_name, last_name):
+    """
+    Pick a free username in a single query.
+
+    The email's local part is preferred; if it is taken, the lowercased
+    first and last name are used, followed by the lowest free numeric
+    suffix (juangarcia, juangarcia1, juangarcia2, ...). All candidates are
+    checked against one prefix lookup, which is served by the username
+    index.
+
+    The result is not reserved: use create_user_with_generated_username()
+    to handle a concurrent registration taking it first.
+    """
     # Split the email to get the potential username
     username = email.split("@")[0].lower()
+    base = (first_name + last_name).lower()
 
-    # Check if a user with that username already exists
-    if User.objects.filter(username=username).exists():
-        username = (first_name + last_name).lower()
+    taken = set(
+        User.objects.filter(
+            Q(username=username) | Q(username__startswith=base)
+        ).values_list("username", flat=True)
+    )
 
-        # If there's still a conflict, append a sequence to make it unique
-        counter = 1
-        original_username = username
-        while User.objects.filter(username=username).exists():
-            username = (original_username + str(counter)).lower()
-            counter += 1
+    if username not in taken:
+        return username
+    if base not in taken:
+        return base
+
+    suffixes = {
+        int(name[len(base):])
+        for name in taken
+        if name.startswith(base) and name[len(base):].isdigit()
+    }
+    counter = 1
+    while counter in suffixes:
+        counter += 1
+    return f"{base}{counter}"
+
+
+def create_user_with_generated_username(
+    email, first_name, last_name, attempts=5, **extra_fields
+):
+    """
+    Create a user with a generated username, retrying with a fresh username
+    if a concurrent registration claimed it between generation and INSERT.
 
-    return username
+    IntegrityErrors caused by a duplicate email, or left after the last
+    attempt, are raised to the caller.
+    """
+    for attempt in range(attempts):
+        username = generate_username(email, first_name, last_name)
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(
+                    first_name=first_name,
+                    last_name=last_name,
+                    username=username,
+                    email=email,
+                    **extra_fields,
+                )
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
+            if User.objects.filter(email=User.objects.normalize_email(email)).exists():
+                raise
 
 
 def custom_password_validator(value):
@@ -7,9 +7,9 @@ from accounts.api.serializers import (
     PasswordResetConfirmSerializer,
 )
 from accounts.api.utils import (
-    send_user_email,
+    queue_user_email,
     account_token_generator,
-    generate_username,
+    create_user_with_generated_username,
 )
 from django.db.utils import IntegrityError
 from django.utils.encoding import force_str
@@ -60,14 +60,11 @@ def register_user(request):
 
     data = request.data
 
-    username = generate_username(data["email"], data["first_name"], data["last_name"])
-
     try:
-        user = get_user_model().objects.create_user(
+        user = create_user_with_generated_username(
             first_name=data["first_name"],
             last_name=data["last_name"],
             second_last_name=data.get("second_last_name", ""),
-            username=username,
             email=data["email"],
             password=data["password"],
         )
@@ -75,7 +72,7 @@ def register_user(request):
         # Send verification email
         mail_subject = "Complete Your Registration"
         email_template = "accounts/emails/account_verification_email.html"
-        send_user_email(request, user, mail_subject, email_template)
+        queue_user_email(user, mail_subject, email_template)
 
         serializer = UserSerializerWithToken(user, many=False)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -155,7 +152,7 @@ def forgot_password(request):
     if user:
         mail_subject = "Reset Your Password"
         email_template = "accounts/emails/password_reset_email.html"
-        send_user_email(request, user, mail_subject, email_template)
+        queue_user_email(user, mail_subject, email_template)
         return JsonResponse(
             {"success": True, "message": "Password reset email sent successfully."}
         )
@@ -229,7 +226,8 @@ def get_user_profile(request):
 
     Use this endpoint to get the profile details of the currently authenticated user.
     """
-    user = request.user
+    # request.user only carries the auth flags; load the whole profile at once
+    user = get_user_model().objects.get(pk=request.user.pk)
     serializer = UserSerializer(user, many=False)
     return Response(serializer.data)
 
@@ -247,7 +245,7 @@ def update_user_profile(request):
     Use this endpoint to update the profile details of the currently authenticated user.
     Updateable fields are: first_name, last_name, second_last_name, and email.
     """
-    user = request.user
+    user = get_user_model().objects.get(pk=request.user.pk)
     serializer = UserSerializerWithToken(user, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.tracing import traced
+from accounts.models import User
+from accounts.api.authentication import invalidate_user_claims
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@traced()
+def invalidate_cached_user_claims(sender, instance, **kwargs):
+    invalidate_user_claims(instance.pk)
@@ -1,4 +1,5 @@
 from credit_origination.models import CreditType
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -65,3 +66,8 @@ class BaseTest(TestCase):
             "active": True,
         }
         cls.credit_type = CreditType.objects.create(**cls.credit_type_data)
+
+    def setUp(self):
+        super().setUp()
+        # Cached values outlive the rolled back test transactions
+        cache.clear()
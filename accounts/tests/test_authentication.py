@@ -0,0 +1,83 @@
+from accounts.api.authentication import clear_user_claims
+from accounts.tests.base_test import BaseTest
+from credit_line.models import CreditLine
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+class CachedJWTAuthenticationTests(BaseTest, APITestCase):
+    def setUp(self):
+        super().setUp()
+        clear_user_claims()
+        self.addCleanup(clear_user_claims)
+        self.credit_line = CreditLine.objects.create(
+            user=self.user,
+            credit_limit=Decimal("10000"),
+            start_date=timezone.now().date(),
+        )
+        self.url = reverse(
+            "credit_line_api:get_credit_line", kwargs={"pk": self.credit_line.pk}
+        )
+
+    def authenticate(self, user):
+        token = AccessToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def user_queries(self, queries):
+        return [q["sql"] for q in queries if "accounts_user" in q["sql"]]
+
+    def test_cached_request_does_not_query_users(self):
+        self.authenticate(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.user_queries(queries.captured_queries), [])
+
+    def test_cache_miss_loads_only_auth_flags(self):
+        self.authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        (sql,) = self.user_queries(queries.captured_queries)
+        self.assertNotIn("password", sql)
+
+    def test_deactivation_is_picked_up_on_save(self):
+        self.authenticate(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(
+            self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_staff_flag_is_used_for_permissions(self):
+        url = reverse("accounts_api:users-list")
+        self.authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_deleted_user_is_rejected(self):
+        self.authenticate(self.admin_user)
+        url = reverse("accounts_api:users-list")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        self.admin_user.delete()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_is_fully_loaded(self):
+        self.authenticate(self.user)
+        response = self.client.get(reverse("accounts_api:user-profile"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], self.user.email)
+        self.assertEqual(response.data["username"], self.user.username)
@@ -2,8 +2,11 @@ from django.test import TestCase, RequestFactory
 from accounts.api.utils import (
     send_user_email,
     generate_username,
+    create_user_with_generated_username,
     custom_password_validator,
 )
+from unittest.mock import patch
+from django.db import IntegrityError
 from django.contrib.auth import get_user_model
 from django.core import mail
 from django.core.exceptions import ValidationError
@@ -94,6 +97,73 @@ class UsernameGenerationTest(TestCase):
         expected_username = "testuser3"
         self.assertEqual(username, expected_username)
 
+    def test_single_query_regardless_of_collisions(self):
+        for i in range(3, 20):
+            User.objects.create_user(
+                first_name="Test",
+                last_name="User",
+                email=f"testuser{i}@example.com",
+                username=f"testuser{i}",
+                password="password",
+            )
+        with self.assertNumQueries(1):
+            username = generate_username("testuser@gmail.com", "Test", "User")
+        self.assertEqual(username, "testuser20")
+
+    def test_lowest_free_suffix_ignores_other_names(self):
+        User.objects.create_user(
+            first_name="Test",
+            last_name="User",
+            email="testusers@example.com",
+            username="testusers",
+            password="password",
+        )
+        User.objects.filter(username="testuser1").delete()
+        username = generate_username("testuser@gmail.com", "Test", "User")
+        self.assertEqual(username, "testuser1")
+
+
+class CreateUserWithGeneratedUsernameTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(
+            first_name="Juan",
+            last_name="Garcia",
+            email="juan@example.com",
+            username="juangarcia",
+            password="password",
+        )
+
+    def test_creates_user(self):
+        user = create_user_with_generated_username(
+            email="juangarcia@another.com",
+            first_name="Juan",
+            last_name="Garcia",
+            password="password",
+        )
+        self.assertEqual(user.username, "juangarcia1")
+
+    @patch("accounts.api.utils.generate_username")
+    def test_retries_when_username_is_claimed_concurrently(self, mock_generate):
+        # The first candidate was free when generated but is taken at INSERT
+        mock_generate.side_effect = ["juangarcia", "juangarcia1"]
+        user = create_user_with_generated_username(
+            email="juan@another.com",
+            first_name="Juan",
+            last_name="Garcia",
+            password="password",
+        )
+        self.assertEqual(user.username, "juangarcia1")
+        self.assertEqual(mock_generate.call_count, 2)
+
+    def test_duplicate_email_is_not_retried(self):
+        with self.assertRaises(IntegrityError):
+            create_user_with_generated_username(
+                email="juan@example.com",
+                first_name="Juan",
+                last_name="Garcia",
+                password="password",
+            )
+
 
 class CustomPasswordValidatorTest(TestCase):
     def test_password_with_all_requirements(self):
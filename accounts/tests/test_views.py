@@ -3,6 +3,10 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from accounts.tests.base_test import BaseTest
 from django.contrib.auth import get_user_model
+from django.core import mail
+from core.models import QueuedEmail
+from unittest.mock import patch
+from rest_framework_simplejwt.tokens import RefreshToken
 
 User = get_user_model()
 
@@ -19,6 +23,13 @@ class UserViewTest(APITestCase, BaseTest):
         response = self.client.post(reverse("accounts_api:register-user"), data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+        # The verification email is queued, not sent inline
+        self.assertEqual(len(mail.outbox), 0)
+        queued = QueuedEmail.objects.get()
+        self.assertEqual(queued.to, ["bob@example.com"])
+        self.assertEqual(queued.subject, "Complete Your Registration")
+        self.assertEqual(queued.content_subtype, "html")
+
     def test_user_login(self):
         # Manually activate the user for testing purposes
         self.user.is_active = True
@@ -33,6 +44,21 @@ class UserViewTest(APITestCase, BaseTest):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn("access", response.data)
 
+    def test_user_login_mints_one_token_pair(self):
+        login_data = {
+            "email": "phil@grateful.com",
+            "password": "password123",
+        }
+        with patch.object(
+            RefreshToken, "for_user", wraps=RefreshToken.for_user
+        ) as for_user:
+            response = self.client.post(
+                reverse("accounts_api:token_obtain_pair"), login_data
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(for_user.call_count, 1)
+        self.assertEqual(response.data["token"], response.data["access"])
+
     def test_user_password_reset(self):
         """Test password reset for an active user."""
         request_data = {
@@ -45,6 +71,11 @@ class UserViewTest(APITestCase, BaseTest):
         self.assertIn(
             "Password reset email sent successfully.", response.json()["message"]
         )
+        self.assertTrue(
+            QueuedEmail.objects.filter(
+                to=["phil@grateful.com"], subject="Reset Your Password"
+            ).exists()
+        )
 
     def test_inactive_user_password_reset(self):
         """Test password reset for an inactive user."""
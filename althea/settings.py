@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+import copy
+import django
 from pathlib import Path
-from decouple import config
+from django.core.exceptions import ImproperlyConfigured
+from decouple import config, Csv
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,10 +59,15 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.api.authentication.CachedJWTAuthentication",
     )
 }
 
+# Seconds a process trusts its cached is_active/is_staff/is_superuser flags
+# for a user; saves through the ORM invalidate them right away in the saving
+# process.
+AUTH_USER_CACHE_TTL = config("AUTH_USER_CACHE_TTL", default=30, cast=int)
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=30),
@@ -97,6 +105,10 @@ SIMPLE_JWT = {
 
 
 MIDDLEWARE = [
+    "core.middleware.TracingMiddleware",
+    "core.middleware.RequestMetricsMiddleware",
+    "core.middleware.MemoryProfilerMiddleware",
+    "core.middleware.SlowQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -105,6 +117,9 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.ReplicaPinMiddleware",
+    "core.middleware.ProfilerMiddleware",
+    "core.middleware.NPlusOneMiddleware",
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True  # For development purposes only
@@ -149,11 +164,153 @@ WSGI_APPLICATION = "althea.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # PostgreSQL backend that also records connection wait metrics
+        "ENGINE": "core.db.backends.postgresql",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        # Keep connections open across requests (seconds, None for unlimited)
+        # and check them before reuse, instead of connecting on every request.
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=60, cast=int),
+        "CONN_HEALTH_CHECKS": config("DB_CONN_HEALTH_CHECKS", default=True, cast=bool),
+        "OPTIONS": {
+            "connect_timeout": config("DB_CONNECT_TIMEOUT", default=5, cast=int),
+        },
+    }
+}
+
+# Connection pooling needs Django 5.1+ with psycopg 3 and replaces persistent
+# connections.
+if config("DB_POOL", default=False, cast=bool):
+    if django.VERSION < (5, 1):
+        raise ImproperlyConfigured("DB_POOL requires Django 5.1 or later.")
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+        "max_size": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+        "timeout": config("DB_POOL_TIMEOUT", default=10, cast=int),
+    }
+
+# Queries slower than SLOW_QUERY_THRESHOLD seconds are appended to the slow
+# query log (see core.db.slow_queries); an empty path turns it off.
+SLOW_QUERY_THRESHOLD = config("SLOW_QUERY_THRESHOLD", default=0.1, cast=float)
+SLOW_QUERY_LOG_PATH = config(
+    "SLOW_QUERY_LOG_PATH", default=os.path.join(BASE_DIR, "slow_queries.jsonl")
+)
+SLOW_QUERY_LOG_MAX_BYTES = config(
+    "SLOW_QUERY_LOG_MAX_BYTES", default=10 * 1024 * 1024, cast=int
+)
+
+# N+1 query detection (see core.db.nplusone), off by default. A query repeated
+# more than NPLUSONE_THRESHOLD times from one line is logged, or fails the
+# request with NPLUSONE_RAISE (CI runs the tests that way).
+NPLUSONE_DETECTION = config("NPLUSONE_DETECTION", default=False, cast=bool)
+NPLUSONE_THRESHOLD = config("NPLUSONE_THRESHOLD", default=5, cast=int)
+NPLUSONE_RAISE = config("NPLUSONE_RAISE", default=False, cast=bool)
+
+# Read replicas: comma separated hosts reachable with the primary's
+# credentials, exposed as the aliases replica_1, replica_2, ... Only reads
+# that opt in (core.db.routers.use_replica) are sent to them.
+DATABASE_REPLICAS = []
+for index, host in enumerate(config("DB_REPLICA_HOSTS", default="", cast=Csv()), 1):
+    alias = f"replica_{index}"
+    DATABASES[alias] = copy.deepcopy(DATABASES["default"])
+    DATABASES[alias]["HOST"] = host
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["core.db.routers.PrimaryReplicaRouter"]
+
+# Seconds a user's reads stay on the primary after they write
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=5, cast=int)
+
+# Log a warning when opening or checking out a connection takes this long
+DB_CONNECTION_WAIT_WARNING = config(
+    "DB_CONNECTION_WAIT_WARNING", default=0.5, cast=float
+)
+
+
+# Import pandas/numpy_financial and build the holiday calendar at startup
+# instead of on the first amortization (see loan_management.finance_utils).
+PRELOAD_FINANCE_UTILS = config("PRELOAD_FINANCE_UTILS", default=False, cast=bool)
+
+
+# Request metrics served at /metrics (see core.metrics). Set
+# METRICS_MULTIPROC_DIR to a directory shared by the server processes to
+# aggregate them across workers; empty keeps them per process.
+METRICS_MULTIPROC_DIR = config("METRICS_MULTIPROC_DIR", default="")
+METRICS_FLUSH_INTERVAL = config("METRICS_FLUSH_INTERVAL", default=1.0, cast=float)
+
+
+# On-demand profiles of superuser requests (see core.profiling), kept in a
+# ring buffer of PROFILER_MAX_PROFILES in PROFILER_DIR.
+PROFILER_DIR = config("PROFILER_DIR", default=os.path.join(BASE_DIR, "profiles"))
+PROFILER_MAX_PROFILES = config("PROFILER_MAX_PROFILES", default=50, cast=int)
+PROFILER_SAMPLE_INTERVAL = config("PROFILER_SAMPLE_INTERVAL", default=0.005, cast=float)
+
+
+# tracemalloc memory profiling of requests and periodic process snapshots
+# (see core.memory), off by default. Reported to staff at /api/memory/.
+MEMORY_PROFILING = config("MEMORY_PROFILING", default=False, cast=bool)
+MEMORY_TRACE_FRAMES = config("MEMORY_TRACE_FRAMES", default=10, cast=int)
+MEMORY_SITES_SAMPLE_RATE = config("MEMORY_SITES_SAMPLE_RATE", default=0.01, cast=float)
+MEMORY_SNAPSHOT_INTERVAL = config("MEMORY_SNAPSHOT_INTERVAL", default=300, cast=float)
+MEMORY_SNAPSHOT_HISTORY = config("MEMORY_SNAPSHOT_HISTORY", default=12, cast=int)
+MEMORY_TOP_SITES = config("MEMORY_TOP_SITES", default=20, cast=int)
+
+
+# Tracing spans (see core.tracing), off by default. Traces are exported with
+# TRACING_EXPORTER: "file" (JSON lines), "otlp" (OTLP/HTTP JSON) or "stub".
+TRACING = config("TRACING", default=False, cast=bool)
+TRACING_EXPORTER = config("TRACING_EXPORTER", default="file")
+TRACING_FILE_PATH = config(
+    "TRACING_FILE_PATH", default=os.path.join(BASE_DIR, "traces.jsonl")
+)
+TRACING_OTLP_URL = config("TRACING_OTLP_URL", default="http://localhost:4318/v1/traces")
+TRACING_OTLP_TIMEOUT = config("TRACING_OTLP_TIMEOUT", default=2.0, cast=float)
+TRACING_SERVICE_NAME = config("TRACING_SERVICE_NAME", default="althea")
+# Traces waiting for the export thread; more are dropped
+TRACING_QUEUE_SIZE = config("TRACING_QUEUE_SIZE", default=1000, cast=int)
+TRACING_EXPORT_BATCH_SIZE = config("TRACING_EXPORT_BATCH_SIZE", default=50, cast=int)
+# Seconds a process waits at exit for its queued traces, below gunicorn's
+# graceful_timeout
+TRACING_FLUSH_TIMEOUT = config("TRACING_FLUSH_TIMEOUT", default=5.0, cast=float)
+
+
+# OpenAPI schema prebuilt into OPENAPI_SCHEMA_DIR by `manage.py
+# generate_openapi_schema` (see core.openapi) and served from memory with an
+# ETag. PRELOAD_OPENAPI_SCHEMA loads it at startup instead of on the first hit.
+OPENAPI_SCHEMA_DIR = config(
+    "OPENAPI_SCHEMA_DIR", default=os.path.join(BASE_DIR, "openapi")
+)
+OPENAPI_CACHE_MAX_AGE = config("OPENAPI_CACHE_MAX_AGE", default=86400, cast=int)
+PRELOAD_OPENAPI_SCHEMA = config("PRELOAD_OPENAPI_SCHEMA", default=False, cast=bool)
+
+# The swagger and redoc pages fetch the prebuilt schema
+SWAGGER_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+REDOC_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# CACHE_BACKEND is one of the short names below or a dotted backend path.
+# "file" needs CACHE_LOCATION set to a directory, "redis" a redis:// URL.
+
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+    "dummy": "django.core.cache.backends.dummy.DummyCache",
+}
+CACHE_BACKEND = config("CACHE_BACKEND", default="locmem")
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        "LOCATION": config("CACHE_LOCATION", default=""),
+        "TIMEOUT": config("CACHE_TIMEOUT", default=300, cast=int),
+        "KEY_PREFIX": config("CACHE_KEY_PREFIX", default="althea"),
     }
 }
 
@@ -222,3 +379,11 @@ DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL")
 
 
 FRONTEND_BASE_URL = config("FRONTEND_BASE_URL")
+
+
+# Transactional outbox
+# Sink targets used by `manage.py relay_outbox` when --target is not given
+
+OUTBOX_FILE_PATH = config("OUTBOX_FILE_PATH", default=os.path.join(BASE_DIR, "outbox.jsonl"))
+
+OUTBOX_HTTP_URL = config("OUTBOX_HTTP_URL", default="")
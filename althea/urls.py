@@ -19,38 +19,19 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Althea API",
-        default_version="v1",
-        description="""credit core / calculator for simple loans,
-                    using Python, NumPy, NumPy Financial, Pandas,
-                    Django, and Django Rest Framework""",
-        terms_of_service="https://www.google.com/policies/terms/",  # change later
-        contact=openapi.Contact(email="contact@snippets.local"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(
-        permissions.IsAuthenticatedOrReadOnly,
-    ),  # IsAuthenticatedOrReadOnly, AllowAny, IsAdminUser
-)
+from core.api.views import openapi_schema
+from core.openapi import schema_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path(
-        "swagger<format>/", schema_view.without_ui(cache_timeout=0), name="schema-json"
-    ),
+    path("swagger<format>/", openapi_schema, name="schema-json"),
     path(
         "swagger/",
         schema_view.with_ui("swagger", cache_timeout=0),
         name="schema-swagger-ui",
     ),
     path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    path("", include("core.api.routers", namespace="core_api")),
     path("api/users/", include("accounts.api.routers", namespace="accounts_api")),
     path(
         "api/credit-origination/",
@@ -0,0 +1,250 @@
+"""
+Micro-benchmarks of the amortization helpers and of loan term approval.
+
+    python -m benchmarks.amortization --repeat 5 --record
+    python -m benchmarks.amortization --check --threshold 0.25
+
+Cases:
+
+- schedule/<frequency>/<term>: generate_amortization_schedule for every
+  repayment frequency and term lengths from 1 to 360 periods;
+- adjust_payment_date: rolling a year of dates back to business days;
+- calculate_periodic_interest_rate: 10,000 calls;
+- approve/<frequency>/<term>: saving a pending LoanTerm as approved, which
+  runs generate_periodic_payments and inserts the schedule, against a
+  throwaway test database.
+
+Every case reports the median and minimum time per call of --repeat timed
+runs, after an untimed call; fast cases are called in a loop for at least
+50 ms per run. --check compares the minimums, which other load on the machine
+inflates least, with the last recorded run and exits with status 1 when a case
+got slower by more than --threshold, so it can gate deploys. --record appends
+the result to benchmarks/history/amortization.jsonl.
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import django
+
+from benchmarks.history import append_result, load_history
+
+FREQUENCIES = ("biweekly", "monthly", "bimonthly", "quarterly")
+TERM_LENGTHS = (1, 6, 12, 24, 60, 120, 240, 360)
+# Database round trips make approvals much slower; keep that grid small
+APPROVAL_TERM_LENGTHS = (12, 120, 360)
+RATE_CALLS = 10000
+# Fast cases are called in a loop for at least this long per timed run, so
+# that timer and scheduling noise stay well below the regression threshold
+MIN_RUN_SECONDS = 0.05
+
+
+def measure(func, repeat):
+    """
+    Median and minimum milliseconds per call of func over repeat timed runs,
+    after one untimed call.
+    """
+    start = time.perf_counter()
+    func()
+    number = max(1, math.ceil(MIN_RUN_SECONDS / (time.perf_counter() - start)))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) * 1000 / number)
+    return {
+        "median_ms": round(statistics.median(timings), 4),
+        "min_ms": round(min(timings), 4),
+    }
+
+
+def helper_cases(repeat, selected):
+    from loan_management.finance_utils import (
+        adjust_payment_date,
+        calculate_periodic_interest_rate,
+        generate_amortization_schedule,
+        preload,
+    )
+
+    preload()
+    cases = {}
+    for frequency in FREQUENCIES:
+        for term in TERM_LENGTHS:
+            name = f"schedule/{frequency}/{term}"
+            if selected(name):
+                cases[name] = measure(
+                    lambda: generate_amortization_schedule(
+                        100000, 0.12, term, frequency, "2024-01-15", 15
+                    ),
+                    repeat,
+                )
+
+    if selected("adjust_payment_date"):
+        import pandas as pd
+
+        days = [pd.Timestamp(2024, 1, 1) + pd.Timedelta(days=i) for i in range(365)]
+        cases["adjust_payment_date"] = measure(
+            lambda: [adjust_payment_date(day) for day in days], repeat
+        )
+
+    if selected("calculate_periodic_interest_rate"):
+        cases["calculate_periodic_interest_rate"] = measure(
+            lambda: [
+                calculate_periodic_interest_rate(0.12, FREQUENCIES[i % 4])
+                for i in range(RATE_CALLS)
+            ],
+            repeat,
+        )
+    return cases
+
+
+def approval_cases(repeat, selected):
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from accounts.models import User
+    from credit_line.models import CreditLine
+    from credit_origination.models import CreditType
+    from credit_subline.models import CreditSubline
+    from loan_management.models import LoanTerm
+
+    names = [
+        (f"approve/{frequency}/{term}", frequency, term)
+        for frequency in FREQUENCIES
+        for term in APPROVAL_TERM_LENGTHS
+        if selected(f"approve/{frequency}/{term}")
+    ]
+    if not names:
+        return {}
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        user = User.objects.create_user(
+            first_name="Bench",
+            last_name="Mark",
+            username="benchmark",
+            email="benchmark@example.com",
+            password="Benchmark123@",
+        )
+        credit_line = CreditLine.objects.create(
+            user=user,
+            credit_limit=Decimal("1000000000"),
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=3650),
+            status="approved",
+        )
+        credit_type = CreditType.objects.create(name="Benchmark", active=True)
+
+        def pending_loan_term(frequency, term):
+            subline = CreditSubline.objects.create(
+                credit_line=credit_line,
+                subline_type=credit_type,
+                subline_amount=Decimal("100000"),
+                interest_rate=Decimal("0.12"),
+                status="active",
+            )
+            return LoanTerm.objects.create(
+                credit_subline=subline,
+                term_length=term,
+                repayment_frequency=frequency,
+                payment_due_day=15,
+                start_date=date(2024, 1, 15),
+            )
+
+        cases = {}
+        for name, frequency, term in names:
+            # Each approval needs a fresh pending loan term: time only the save
+            timings = []
+            for run in range(repeat + 1):
+                loan_term = pending_loan_term(frequency, term)
+                loan_term.status = "approved"
+                start = time.perf_counter()
+                loan_term.save()
+                elapsed = (time.perf_counter() - start) * 1000
+                assert loan_term.payments.exists(), name
+                if run:  # the first one warms up
+                    timings.append(elapsed)
+            cases[name] = {
+                "median_ms": round(statistics.median(timings), 4),
+                "min_ms": round(min(timings), 4),
+            }
+        return cases
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+
+def run(repeat, only=None):
+    def selected(name):
+        return not only or any(name.startswith(prefix) for prefix in only)
+
+    cases = helper_cases(repeat, selected)
+    cases.update(approval_cases(repeat, selected))
+    return {"repeat": repeat, "cases": cases}
+
+
+def regressions(result, previous, threshold):
+    """
+    Cases whose minimum got slower than in the previous result by more than
+    threshold (0.25 = 25%).
+    """
+    slower = []
+    for name, case in result["cases"].items():
+        before = previous.get("cases", {}).get(name)
+        if before and case["min_ms"] > before["min_ms"] * (1 + threshold):
+            slower.append(
+                {
+                    "case": name,
+                    "before_ms": before["min_ms"],
+                    "after_ms": case["min_ms"],
+                    "change": round(case["min_ms"] / before["min_ms"] - 1, 4),
+                }
+            )
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--only",
+        action="append",
+        help="Run only the cases starting with this prefix, e.g. schedule/monthly.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with status 1 if a case regressed since the last recorded run.",
+    )
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument(
+        "--record", action="store_true", help="Append the result to the history."
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "althea.settings")
+    django.setup()
+    result = run(args.repeat, args.only)
+
+    history = load_history("amortization")
+    if history:
+        result["previous_revision"] = history[-1]["revision"]
+        result["regressions"] = regressions(result, history[-1], args.threshold)
+    if args.record:
+        append_result("amortization", result)
+    print(json.dumps(result, indent=2))
+    if args.check and result.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
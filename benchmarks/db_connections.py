@@ -0,0 +1,111 @@
+"""
+Benchmark per-request connection handling against the configured database.
+
+Requests go through the full WSGI handler, so connections are closed or
+kept exactly as they would be under a real server. Each mode runs against
+a throwaway test database; point DB_* at a local PostgreSQL to measure the
+connect and authentication handshake:
+
+    python -m benchmarks.db_connections --requests 500
+
+Compares CONN_MAX_AGE=0 (connect per request) with the configured
+persistence, reporting latency, connections opened and connection wait.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+import django
+
+
+def run_mode(handler, environ, requests, conn_max_age):
+    from django.db import close_old_connections, connection
+    from django.db.backends.signals import connection_created
+    from core.db.metrics import connection_stats, reset_connection_stats
+
+    connection.settings_dict["CONN_MAX_AGE"] = conn_max_age
+    connection.close()
+    close_old_connections()
+    reset_connection_stats()
+
+    opened = []
+
+    def count(sender, connection, **kwargs):
+        opened.append(connection.alias)
+
+    connection_created.connect(count)
+    timings = []
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = handler(dict(environ), lambda status, headers: None)
+            b"".join(response)
+            response.close()
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        connection_created.disconnect(count)
+
+    quantiles = statistics.quantiles(timings, n=100)
+    wait = connection_stats().get(connection.alias, {})
+    return {
+        "conn_max_age": conn_max_age,
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(quantiles[49], 3),
+        "p95_ms": round(quantiles[94], 3),
+        "connections_opened": len(opened),
+        "connection_wait_seconds_total": round(wait.get("wait_seconds_total", 0), 4),
+        "connection_wait_seconds_max": round(wait.get("wait_seconds_max", 0), 4),
+    }
+
+
+def run(requests):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from django.urls import reverse
+    from credit_origination.models import CreditType
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    configured_max_age = connection.settings_dict["CONN_MAX_AGE"]
+    try:
+        CreditType.objects.create(name="Personal Loan", active=True)
+        handler = WSGIHandler()
+        environ = RequestFactory()._base_environ(
+            PATH_INFO=reverse("credit_origination_api:credit_type_list"),
+            REQUEST_METHOD="GET",
+        )
+        results = [
+            run_mode(handler, environ, requests, 0),
+            run_mode(handler, environ, requests, configured_max_age or 60),
+        ]
+    finally:
+        connection.settings_dict["CONN_MAX_AGE"] = configured_max_age
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+    return {
+        "vendor": connection.vendor,
+        "requests_per_mode": requests,
+        "modes": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "althea.settings")
+    django.setup()
+    print(json.dumps(run(args.requests), indent=2))
+
+
+if __name__ == "__main__":
+    main()
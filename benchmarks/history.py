@@ -0,0 +1,50 @@
+"""
+Benchmark history.
+
+Results are appended as JSON lines to benchmarks/history/<name>.jsonl,
+each stamped with the time and git commit, so runs can be compared over
+time.
+"""
+
+import json
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+HISTORY_DIR = Path(__file__).resolve().parent / "history"
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def history_path(name):
+    return HISTORY_DIR / f"{name}.jsonl"
+
+
+def append_result(name, result):
+    entry = {
+        "recorded": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        **result,
+    }
+    HISTORY_DIR.mkdir(exist_ok=True)
+    with open(history_path(name), "a", encoding="utf-8") as outfile:
+        outfile.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def load_history(name):
+    path = history_path(name)
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as infile:
+        return [json.loads(line) for line in infile if line.strip()]
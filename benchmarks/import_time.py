@@ -0,0 +1,109 @@
+"""
+Benchmark process startup with `python -X importtime manage.py check`.
+
+    python -m benchmarks.import_time --runs 5 --record
+
+Reports the wall time of the command, the total import time, the slowest
+top-level imports and whether the heavy numeric stack (pandas, numpy,
+numpy_financial) was imported at all. --record appends the result to
+benchmarks/history/import_time.jsonl.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.history import append_result, load_history
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("pandas", "numpy", "numpy_financial")
+
+
+def parse_importtime(stderr):
+    """
+    Parse -X importtime output into {module: (self_us, cumulative_us, depth)}.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # One space after the bar, then two more per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def measure_once(python):
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [python, "-X", "importtime", "manage.py", "check"],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+    return wall, parse_importtime(completed.stderr)
+
+
+def run(runs, top):
+    walls, totals = [], []
+    modules = {}
+    for _ in range(runs):
+        wall, modules = measure_once(sys.executable)
+        walls.append(wall)
+        totals.append(sum(self_us for self_us, _, _ in modules.values()))
+
+    top_level = sorted(
+        (
+            (name, cumulative_us)
+            for name, (_, cumulative_us, depth) in modules.items()
+            if depth == 0
+        ),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+    return {
+        "runs": runs,
+        "wall_seconds_median": round(statistics.median(walls), 4),
+        "import_seconds_median": round(statistics.median(totals) / 1e6, 4),
+        "modules_imported": len(modules),
+        "heavy_modules_imported": [name for name in HEAVY_MODULES if name in modules],
+        "slowest_imports": [
+            {"module": name, "cumulative_ms": round(us / 1000, 2)}
+            for name, us in top_level
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--record", action="store_true", help="Append the result to the history."
+    )
+    args = parser.parse_args()
+
+    result = run(args.runs, args.top)
+    history = load_history("import_time")
+    if history:
+        previous = history[-1]["wall_seconds_median"]
+        result["wall_seconds_change"] = round(
+            result["wall_seconds_median"] - previous, 4
+        )
+    if args.record:
+        append_result("import_time", result)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
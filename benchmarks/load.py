@@ -0,0 +1,486 @@
+"""
+Replay a weighted request mix against a live server and report latencies.
+
+Start the server (runserver or gunicorn) and run the harness with the same
+settings, so that it can prepare its users and credit line in the server's
+database:
+
+    python -m benchmarks.load run --base-url http://127.0.0.1:8000 \\
+        --duration 30 --concurrency 16 --output before.json
+    python -m benchmarks.load compare before.json after.json
+
+Each virtual user draws scenarios from the mix with its own seeded random
+generator, so the same --seed, --concurrency and --iterations replay the
+same requests. A scenario may chain requests, e.g. creating a credit line
+adjustment and approving it. The JSON report has, per route and overall,
+the request count, throughput, error rate and p50/p95/p99 latencies.
+
+compare flags the routes whose p50, p95 or p99 latency or error rate got
+worse by more than the thresholds, or whose throughput dropped, and exits
+with status 1 if any did.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import date
+
+import django
+
+from benchmarks.history import append_result
+
+ROUTES = {
+    "login": ("POST", "/api/users/login/"),
+    "credit_type_list": ("GET", "/api/credit-origination/credit-types/"),
+    "get_credit_line": ("GET", "/api/credit-lines/{credit_line}/"),
+    "credit_lines_admin_list": ("GET", "/api/credit-lines/list/"),
+    "credit_line_adjustments_admin_list": ("GET", "/api/credit-lines/adjustments/list/"),
+    "credit_requests_admin_list": ("GET", "/api/credit-origination/credit-requests/list/"),
+    "credit_sublines_admin_list": ("GET", "/api/credit-sublines/list/"),
+    "credit_subline_adjustments_admin_list": (
+        "GET",
+        "/api/credit-sublines/adjustments/list/",
+    ),
+    "credit_line_adjustment_create": (
+        "POST",
+        "/api/credit-lines/adjustments/create/{credit_line}/",
+    ),
+    "credit_line_adjustment_status_update": (
+        "PATCH",
+        "/api/credit-lines/adjustments/adjustment-status/update/{adjustment}/",
+    ),
+    "credit_subline_create": ("POST", "/api/credit-sublines/create/{credit_line}/"),
+    "loan_term_create": ("POST", "/api/loan-term/create/{subline}/"),
+    "loan_term_status_update": ("PATCH", "/api/loan-term/status/update/{loan_term}/"),
+}
+
+ADMIN_LISTS = (
+    "credit_lines_admin_list",
+    "credit_line_adjustments_admin_list",
+    "credit_requests_admin_list",
+    "credit_sublines_admin_list",
+    "credit_subline_adjustments_admin_list",
+)
+
+DEFAULT_MIX = {
+    "login": 5,
+    "credit_type_list": 25,
+    "get_credit_line": 25,
+    **{name: 5 for name in ADMIN_LISTS},
+    "adjustment_approve": 10,
+    "loan_term_approve": 5,
+}
+
+PASSWORD = "LoadTest123@"
+USER_EMAIL = "loadtest-user@example.com"
+ADMIN_EMAIL = "loadtest-admin@example.com"
+# Sublines drawn by loan_term_approve come out of this limit
+CREDIT_LIMIT = "1000000000.00"
+
+PERCENTILES = (50, 95, 99)
+LATENCY_METRICS = tuple(f"p{p}_ms" for p in PERCENTILES)
+
+
+def prepare():
+    """
+    Create or reset the load test user, superuser and credit line through
+    the ORM. Returns the ids the scenarios need.
+    """
+    from accounts.models import User
+    from credit_line.models import CreditLine
+    from credit_origination.models import CreditType
+
+    def user(email, username, superuser):
+        user, _ = User.objects.get_or_create(
+            email=email,
+            defaults={"username": username, "first_name": "Load", "last_name": "Test"},
+        )
+        user.set_password(PASSWORD)
+        user.is_active = True
+        user.is_staff = user.is_superuser = superuser
+        user.save()
+        return user
+
+    borrower = user(USER_EMAIL, "loadtest-user", False)
+    user(ADMIN_EMAIL, "loadtest-admin", True)
+
+    credit_type = CreditType.objects.filter(active=True).first()
+    if credit_type is None:
+        credit_type = CreditType.objects.create(name="Load test", active=True)
+
+    credit_line = CreditLine.objects.filter(user=borrower).first()
+    if credit_line is None:
+        credit_line = CreditLine(user=borrower, start_date=date.today())
+    credit_line.credit_limit = CREDIT_LIMIT
+    credit_line.status = "approved"
+    credit_line.end_date = None
+    credit_line.save()
+    return {"credit_line": credit_line.pk, "credit_type": credit_type.pk}
+
+
+def parse_mix(value):
+    """
+    The default mix updated with "name=weight,..." (weight 0 drops a scenario).
+    """
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, value.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown scenario: {name}")
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def percentile(sorted_values, p):
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[p - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+        self.recording = True
+
+    def add(self, route, seconds, status):
+        if not self.recording:
+            return
+        self.latencies[route].append(seconds * 1000)
+        self.statuses[route][str(status)] += 1
+        if not (isinstance(status, int) and status < 400):
+            self.errors[route] += 1
+
+    def route_summary(self, latencies, errors, statuses, seconds):
+        latencies = sorted(latencies)
+        summary = {
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / seconds, 2),
+            "errors": errors,
+            "error_rate": round(errors / len(latencies), 4),
+            "mean_ms": round(statistics.fmean(latencies), 3),
+        }
+        for p, name in zip(PERCENTILES, LATENCY_METRICS):
+            summary[name] = round(percentile(latencies, p), 3)
+        summary["statuses"] = dict(statuses)
+        return summary
+
+    def summary(self, seconds):
+        routes = {
+            route: self.route_summary(
+                latencies, self.errors[route], self.statuses[route], seconds
+            )
+            for route, latencies in sorted(self.latencies.items())
+        }
+        every = [latency for latencies in self.latencies.values() for latency in latencies]
+        overall = (
+            self.route_summary(
+                every,
+                sum(self.errors.values()),
+                sum(self.statuses.values(), Counter()),
+                seconds,
+            )
+            if every
+            else {}
+        )
+        return routes, overall
+
+
+class VirtualUser:
+    """
+    One client connection replaying scenarios drawn from the mix.
+    """
+
+    def __init__(self, client, recorder, fixtures, rng):
+        self.client = client
+        self.recorder = recorder
+        self.fixtures = fixtures
+        self.rng = rng
+        self.tokens = {}
+
+    async def request(self, route, token=None, json_body=None, **path_args):
+        method, path = ROUTES[route]
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method,
+                path.format(**self.fixtures, **path_args),
+                json=json_body,
+                headers=headers,
+            )
+        except Exception as error:
+            self.recorder.add(route, time.perf_counter() - start, type(error).__name__)
+            return None
+        self.recorder.add(route, time.perf_counter() - start, response.status_code)
+        if response.status_code >= 400:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    async def login(self, email):
+        data = await self.request("login", json_body={"email": email, "password": PASSWORD})
+        if data is not None:
+            self.tokens[email] = data["access"]
+        return data
+
+    async def token(self, email):
+        if email not in self.tokens:
+            await self.login(email)
+        return self.tokens.get(email)
+
+    async def adjustment_approve(self):
+        admin = await self.token(ADMIN_EMAIL)
+        adjustment = await self.request(
+            "credit_line_adjustment_create",
+            admin,
+            {"new_credit_limit": CREDIT_LIMIT, "reason": "Load test"},
+        )
+        if adjustment is not None:
+            await self.request(
+                "credit_line_adjustment_status_update",
+                admin,
+                {"adjustment_status": "approved"},
+                adjustment=adjustment["id"],
+            )
+
+    async def loan_term_approve(self):
+        admin = await self.token(ADMIN_EMAIL)
+        subline = await self.request(
+            "credit_subline_create",
+            admin,
+            {
+                "subline_type": self.fixtures["credit_type"],
+                "subline_amount": "1000.00",
+                "amount_disbursed": "0.00",
+                "outstanding_balance": "0.00",
+                "interest_rate": "0.12",
+            },
+        )
+        if subline is None:
+            return
+        loan_term = await self.request(
+            "loan_term_create",
+            admin,
+            {
+                "term_length": 12,
+                "repayment_frequency": "monthly",
+                "payment_due_day": 15,
+                "start_date": date.today().isoformat(),
+            },
+            subline=subline["id"],
+        )
+        if loan_term is not None:
+            await self.request(
+                "loan_term_status_update",
+                admin,
+                {"status": "approved"},
+                loan_term=loan_term["id"],
+            )
+
+    async def run_scenario(self, name):
+        if name == "login":
+            await self.login(USER_EMAIL)
+        elif name in ("credit_type_list", "get_credit_line"):
+            await self.request(name, await self.token(USER_EMAIL))
+        elif name in ADMIN_LISTS:
+            await self.request(name, await self.token(ADMIN_EMAIL))
+        else:
+            await getattr(self, name)()
+
+
+async def run_load(base_url, fixtures, mix, concurrency, duration, iterations, warmup, seed):
+    import httpx
+
+    recorder = Recorder()
+    names, weights = list(mix), list(mix.values())
+    limits = httpx.Limits(max_connections=concurrency)
+    # trust_env=False: talk to the local server even if a proxy is configured
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30, trust_env=False
+    ) as client:
+        users = [
+            VirtualUser(client, recorder, fixtures, random.Random(f"{seed}-{index}"))
+            for index in range(concurrency)
+        ]
+
+        async def warm_up(user):
+            for name in names[:warmup]:
+                await user.run_scenario(name)
+
+        recorder.recording = False
+        await asyncio.gather(*(warm_up(user) for user in users))
+        recorder.recording = True
+
+        deadline = time.perf_counter() + duration if duration else None
+
+        async def replay(user):
+            done = 0
+            while iterations is None or done < iterations:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                await user.run_scenario(user.rng.choices(names, weights)[0])
+                done += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(replay(user) for user in users))
+        seconds = time.perf_counter() - start
+
+    routes, overall = recorder.summary(seconds)
+    return {
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "duration_s": round(seconds, 3),
+        "iterations": iterations,
+        "seed": seed,
+        "mix": mix,
+        "overall": overall,
+        "routes": routes,
+    }
+
+
+def _change(before, after):
+    if not before:
+        return None
+    return round((after - before) / before, 4)
+
+
+def compare(before, after, threshold=0.1, min_delta_ms=1.0, error_threshold=0.01):
+    """
+    Per route changes between two reports and the list of regressions.
+    """
+    regressions = []
+    routes = {}
+    for route in sorted(set(before["routes"]) | set(after["routes"])):
+        old, new = before["routes"].get(route), after["routes"].get(route)
+        if old is None or new is None:
+            routes[route] = {"missing_in": "before" if old is None else "after"}
+            continue
+        changes = {}
+        for metric in (*LATENCY_METRICS, "throughput_rps", "error_rate"):
+            changes[metric] = {
+                "before": old[metric],
+                "after": new[metric],
+                "change": _change(old[metric], new[metric]),
+            }
+        routes[route] = changes
+
+        for metric in LATENCY_METRICS:
+            delta = new[metric] - old[metric]
+            if delta > min_delta_ms and delta > old[metric] * threshold:
+                regressions.append(
+                    f"{route}: {metric} {old[metric]} -> {new[metric]} ms"
+                )
+        if new["error_rate"] - old["error_rate"] > error_threshold:
+            regressions.append(
+                f"{route}: error rate {old['error_rate']} -> {new['error_rate']}"
+            )
+        if new["throughput_rps"] < old["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{route}: throughput {old['throughput_rps']} -> "
+                f"{new['throughput_rps']} rps"
+            )
+    return {"routes": routes, "regressions": regressions}
+
+
+def run_command(args):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "althea.settings")
+    django.setup()
+    fixtures = prepare()
+    result = asyncio.run(
+        run_load(
+            args.base_url.rstrip("/"),
+            fixtures,
+            args.mix,
+            args.concurrency,
+            None if args.iterations else args.duration,
+            args.iterations,
+            args.warmup,
+            args.seed,
+        )
+    )
+    if args.record:
+        result = append_result("load", result)
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as outfile:
+            outfile.write(output + "\n")
+    print(output)
+
+
+def compare_command(args):
+    with open(args.before, encoding="utf-8") as infile:
+        before = json.load(infile)
+    with open(args.after, encoding="utf-8") as infile:
+        after = json.load(infile)
+    report = compare(before, after, args.threshold, args.min_delta_ms, args.error_threshold)
+    print(json.dumps(report, indent=2))
+    return 1 if report["regressions"] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Replay the request mix.")
+    run.add_argument("--base-url", default="http://127.0.0.1:8000")
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--duration", type=float, default=30)
+    run.add_argument(
+        "--iterations",
+        type=int,
+        help="Scenarios per virtual user instead of a duration, for exact replays.",
+    )
+    run.add_argument(
+        "--warmup",
+        type=int,
+        default=len(DEFAULT_MIX),
+        help="Scenarios of the mix run once per virtual user before measuring.",
+    )
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=dict(DEFAULT_MIX),
+        help="Weights overriding the default mix, e.g. login=0,get_credit_line=50.",
+    )
+    run.add_argument("--output", help="Also write the JSON report to this file.")
+    run.add_argument(
+        "--record", action="store_true", help="Append the result to the history."
+    )
+
+    diff = commands.add_parser("compare", help="Flag regressions between two runs.")
+    diff.add_argument("before")
+    diff.add_argument("after")
+    diff.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative latency increase or throughput drop flagged (0.1 = 10%%).",
+    )
+    diff.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=1.0,
+        help="Latency increases below this are noise.",
+    )
+    diff.add_argument("--error-threshold", type=float, default=0.01)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run_command(args)
+    else:
+        sys.exit(compare_command(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark the login endpoint.
+
+Runs against a throwaway test database:
+
+    python -m benchmarks.login --requests 200
+
+Prints a JSON summary with latency percentiles and the number of token
+pairs minted per login, which should be exactly 1.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from unittest.mock import patch
+
+import django
+
+
+def run(requests):
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from accounts.models import User
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        user = User.objects.create_user(
+            first_name="Bench",
+            last_name="Mark",
+            username="benchmark",
+            email="benchmark@example.com",
+            password="Benchmark123@",
+        )
+        user.is_active = True
+        user.save()
+
+        client = APIClient()
+        url = reverse("accounts_api:token_obtain_pair")
+        credentials = {"email": user.email, "password": "Benchmark123@"}
+        client.post(url, credentials)  # warm up
+
+        timings = []
+        with patch.object(
+            RefreshToken, "for_user", wraps=RefreshToken.for_user
+        ) as for_user:
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = client.post(url, credentials)
+                timings.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.content
+    finally:
+        runner.teardown_databases(old_config)
+        teardown_test_environment()
+
+    quantiles = statistics.quantiles(timings, n=100)
+    return {
+        "requests": requests,
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(quantiles[49], 3),
+        "p95_ms": round(quantiles[94], 3),
+        "token_pairs_per_login": for_user.call_count / requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "althea.settings")
+    django.setup()
+    print(json.dumps(run(args.requests), indent=2))
+
+
+if __name__ == "__main__":
+    main()
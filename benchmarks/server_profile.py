@@ -0,0 +1,210 @@
+"""
+Compare memory and throughput of runserver and the gunicorn profile.
+
+Starts each server against the configured database (migrate it first),
+drives it with concurrent keep-alive-less GET requests for a fixed time and
+reads the memory of the whole process tree from /proc (Linux only):
+
+    python -m benchmarks.server_profile --duration 10 --concurrency 8 --record
+
+Modes: runserver, gunicorn with preload_app (the default profile) and
+gunicorn without it. RSS counts shared pages once per process; PSS splits
+them between the processes sharing them, so it shows the copy-on-write
+savings of preloading.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from benchmarks.history import append_result
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_PATH = "/api/credit-origination/credit-types/"
+
+# Talk to the local server directly even if an HTTP proxy is configured
+opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def children(pid):
+    pids = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # The command name may contain spaces; the ppid follows the last ")"
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        if ppid == pid:
+            pids.append(int(entry.name))
+    return pids
+
+
+def process_tree(pid):
+    tree = [pid]
+    for child in children(pid):
+        tree.extend(process_tree(child))
+    return tree
+
+
+def memory_kb(pid):
+    """
+    (rss, pss) in kB of one process.
+    """
+    rss = pss = 0
+    try:
+        for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+            if line.startswith("Rss:"):
+                rss = int(line.split()[1])
+            elif line.startswith("Pss:"):
+                pss = int(line.split()[1])
+    except OSError:
+        pass
+    return rss, pss
+
+
+def tree_memory_mb(pid):
+    pids = process_tree(pid)
+    totals = [memory_kb(p) for p in pids]
+    return {
+        "processes": len(pids),
+        "rss_mb": round(sum(rss for rss, _ in totals) / 1024, 1),
+        "pss_mb": round(sum(pss for _, pss in totals) / 1024, 1),
+    }
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with opener.open(url, timeout=2):
+                return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up")
+
+
+def load(url, duration, concurrency):
+    counts = [0] * concurrency
+    errors = [0] * concurrency
+    stop = time.time() + duration
+
+    def worker(index):
+        while time.time() < stop:
+            try:
+                with opener.open(url, timeout=10) as response:
+                    response.read()
+                counts[index] += 1
+            except (urllib.error.URLError, OSError):
+                errors[index] += 1
+
+    threads = [
+        threading.Thread(target=worker, args=(i,)) for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts), sum(errors)
+
+
+def server_command(mode, port, workers):
+    python = sys.executable
+    if mode == "runserver":
+        return [python, "manage.py", "runserver", "--noreload", f"127.0.0.1:{port}"]
+    return [
+        python,
+        "-m",
+        "gunicorn",
+        "althea.wsgi",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--workers",
+        str(workers),
+        "--access-logfile",
+        "/dev/null",
+    ]
+
+
+def run_mode(mode, path, duration, concurrency, workers):
+    port = free_port()
+    env = os.environ.copy()
+    env["PRELOAD_FINANCE_UTILS"] = "True"
+    env["GUNICORN_PRELOAD"] = "False" if mode == "gunicorn-no-preload" else "True"
+    process = subprocess.Popen(
+        server_command(mode, port, workers),
+        cwd=PROJECT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    url = f"http://127.0.0.1:{port}{path}"
+    try:
+        wait_until_up(url)
+        idle = tree_memory_mb(process.pid)
+        requests, errors = load(url, duration, concurrency)
+        loaded = tree_memory_mb(process.pid)
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=60)
+
+    return {
+        "mode": mode,
+        "requests_per_second": round(requests / duration, 1),
+        "errors": errors,
+        "idle": idle,
+        "after_load": loaded,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--modes",
+        default="runserver,gunicorn,gunicorn-no-preload",
+        help="Comma separated subset of the modes to run.",
+    )
+    parser.add_argument(
+        "--record", action="store_true", help="Append the result to the history."
+    )
+    args = parser.parse_args()
+
+    result = {
+        "path": args.path,
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "modes": [
+            run_mode(mode, args.path, args.duration, args.concurrency, args.workers)
+            for mode in args.modes.split(",")
+        ],
+    }
+    if args.record:
+        append_result("server_profile", result)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
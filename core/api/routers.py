@@ -0,0 +1,16 @@
+import core.api.views as views
+from django.urls import path
+
+app_name = "core_api"
+
+urlpatterns = [
+    path("metrics", views.metrics, name="metrics"),
+    path("api/profiles/", views.profile_list, name="profile_list"),
+    path("api/slow-queries/", views.slow_query_list, name="slow_query_list"),
+    path("api/memory/", views.memory, name="memory"),
+    path(
+        "api/profiles/<str:profile_id>/<str:kind>/",
+        views.profile_download,
+        name="profile_download",
+    ),
+]
@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from core.db.slow_queries import SORT_KEYS, slow_query_report
+from core.memory import memory_report, take_snapshot
+from core.metrics import CONTENT_TYPE, render_metrics
+from core.openapi import FORMATS, load_schema
+from core.profiling import list_profiles, profile_path
+
+
+@swagger_auto_schema(method="get", auto_schema=None)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """
+    Request metrics of all server processes in the Prometheus text format.
+
+    Only staff members can scrape them.
+    """
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
+
+
+@swagger_auto_schema(
+    method="get", responses={200: "Stored profiles", 401: "Unauthorized"}
+)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def profile_list(request):
+    """
+    List the stored request profiles, newest first.
+
+    Superusers record a profile by sending the X-Profile header (or the profile
+    query parameter) with "cprofile" or "sample". Only staff members can list them.
+    """
+    return Response(list_profiles())
+
+
+@swagger_auto_schema(
+    method="get",
+    responses={200: "Profile file", 401: "Unauthorized", 404: "Not Found"},
+)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def profile_download(request, profile_id, kind):
+    """
+    Download a stored request profile.
+
+    kind is "pstats" (cProfile profiles only) or "collapsed" (flamegraph input).
+    """
+    try:
+        path = profile_path(profile_id, kind)
+    except FileNotFoundError:
+        return Response(
+            {"error": "Profile not found."}, status=status.HTTP_404_NOT_FOUND
+        )
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name)
+
+
+minutes_param = openapi.Parameter(
+    "minutes",
+    openapi.IN_QUERY,
+    description="Window of the report in minutes (default 60)",
+    type=openapi.TYPE_INTEGER,
+)
+top_param = openapi.Parameter(
+    "top",
+    openapi.IN_QUERY,
+    description="Number of fingerprints to return (default 20)",
+    type=openapi.TYPE_INTEGER,
+)
+sort_param = openapi.Parameter(
+    "sort",
+    openapi.IN_QUERY,
+    description="total_ms (default), max_ms or count",
+    type=openapi.TYPE_STRING,
+)
+
+
+@swagger_auto_schema(
+    method="get",
+    responses={200: "Slow query report", 400: "Bad Request", 401: "Unauthorized"},
+    manual_parameters=[minutes_param, top_param, sort_param],
+)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def slow_query_list(request):
+    """
+    Slow queries report.
+
+    The slowest query fingerprints of the recent past, with the views and
+    lines of code that ran them. Only staff members can see it.
+    """
+    try:
+        minutes = int(request.query_params.get("minutes", 60))
+        top = int(request.query_params.get("top", 20))
+    except ValueError:
+        return Response(
+            {"error": "minutes and top must be integers."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    sort = request.query_params.get("sort", "total_ms")
+    if sort not in SORT_KEYS:
+        return Response(
+            {"error": f"sort must be one of {', '.join(SORT_KEYS)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response(slow_query_report(minutes=minutes, top=top, sort=sort))
+
+
+@swagger_auto_schema(
+    methods=["get", "post"],
+    responses={200: "Memory report", 401: "Unauthorized"},
+)
+@api_view(["GET", "POST"])
+@permission_classes([IsAdminUser])
+def memory(request):
+    """
+    Memory report of the server process.
+
+    Peak and retained traced memory per URL name with their top allocation
+    sites, and the recent diffs of whole-process snapshots. POST takes a
+    snapshot first. Needs MEMORY_PROFILING; only staff members can see it.
+    """
+    if request.method == "POST":
+        take_snapshot()
+    return Response(memory_report())
+
+
+@require_safe
+def openapi_schema(request, format):
+    """
+    The prebuilt OpenAPI schema, as JSON (format ".json") or YAML (".yaml").
+
+    Clients revalidate it with If-None-Match once OPENAPI_CACHE_MAX_AGE has
+    passed and get a 304 until the schema changes.
+    """
+    if format not in FORMATS:
+        raise Http404("No such schema format.")
+    content, etag = load_schema()[format]
+    response = HttpResponse(content, content_type=FORMATS[format][1])
+    response["ETag"] = f'"{etag}"'
+    patch_cache_control(response, public=True, max_age=settings.OPENAPI_CACHE_MAX_AGE)
+    return get_conditional_response(request, etag=response["ETag"], response=response)
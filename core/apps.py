@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+        from core import tracing
+        from core.db.slow_queries import install_wrapper
+        from core.metrics import instrument_serializers
+
+        instrument_serializers()
+        tracing.instrument_serializers()
+        connection_created.connect(install_wrapper)
+        connection_created.connect(tracing.install_wrapper)
+
+        if settings.PRELOAD_OPENAPI_SCHEMA:
+            from core.openapi import load_schema
+
+            load_schema()
@@ -0,0 +1,159 @@
+"""
+Namespaced caching on top of the default Django cache.
+
+Keys live in a namespace ("credit_types", "credit_line:42") whose version is
+stored in the cache itself; invalidate(namespace) bumps the version, which
+orphans every key of the namespace at once without having to know them.
+
+get_or_set() protects against stampedes in two ways. Entries stay usable for
+a grace period after they go stale, and while one caller recomputes them
+(holding a short lock) the others keep serving the stale value. When there is
+no value at all, callers that lose the lock wait briefly for the winner
+instead of all hitting the database.
+
+Versions live in the cache backend, so an invalidation only reaches the
+processes sharing it. With a per-process backend (locmem, the default) every
+gunicorn worker keeps its own copy until the timeout; callers that cannot
+serve stale data pass shared_only=True and are not cached there at all.
+
+Hits, misses and recomputes are counted per namespace in each process, and
+exported as althea_cache_requests_total at /metrics (see core.metrics).
+"""
+
+import hashlib
+import threading
+import time
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from core.metrics import inc
+
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+LOCK_POLL_INTERVAL = 0.05
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def _record(namespace, event):
+    # Count per namespace family: "credit_line:42" -> "credit_line"
+    family = namespace.split(":", 1)[0]
+    with _lock:
+        stats = _stats.setdefault(
+            family,
+            {"hits": 0, "stale_hits": 0, "misses": 0, "waits": 0, "recomputes": 0},
+        )
+        stats[event] += 1
+    inc("althea_cache_requests_total", {"namespace": family, "result": event})
+
+
+def cache_stats():
+    with _lock:
+        return {family: dict(stats) for family, stats in _stats.items()}
+
+
+def reset_cache_stats():
+    with _lock:
+        _stats.clear()
+
+
+def is_process_local():
+    """
+    Whether the default cache lives in each process rather than being shared
+    by all of them.
+    """
+    return isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def _version_key(namespace):
+    return f"ns:{namespace}"
+
+
+def namespace_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # Start from a time-based version so that an evicted version key
+        # never brings back entries written under an older version.
+        cache.add(_version_key(namespace), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(namespace), time.time_ns())
+    return version
+
+
+def _bump_version(namespace):
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.set(_version_key(namespace), time.time_ns(), timeout=None)
+
+
+def invalidate(namespace):
+    """
+    Make every cached key of a namespace unreachable.
+
+    Inside a transaction the version is bumped again on commit, so values
+    cached by other requests from the pre-commit state are dropped too.
+    """
+    _bump_version(namespace)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_version(namespace))
+
+
+def make_key(namespace, *parts):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f"{namespace}:{namespace_version(namespace)}:{digest}"
+
+
+def _compute_and_store(key, compute, timeout, stale_timeout):
+    value = compute()
+    cache.set(key, (value, time.time() + timeout), timeout + stale_timeout)
+    return value
+
+
+def get_or_set(
+    namespace, parts, compute, timeout=300, stale_timeout=None, shared_only=False
+):
+    """
+    Return the cached value for parts within namespace, calling compute()
+    to produce it when missing or stale.
+
+    Values are fresh for timeout seconds and may be served stale for
+    stale_timeout more (defaults to timeout) while a single caller refreshes
+    them. With shared_only, compute() is always called on a per-process
+    backend, whose invalidations would not reach the other processes.
+    """
+    if shared_only and is_process_local():
+        return compute()
+    if stale_timeout is None:
+        stale_timeout = timeout
+    key = make_key(namespace, *parts)
+    lock_key = f"lock:{key}"
+
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until > time.time():
+            _record(namespace, "hits")
+            return value
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            _record(namespace, "stale_hits")
+            return value
+    else:
+        _record(namespace, "misses")
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            deadline = time.time() + LOCK_WAIT
+            while time.time() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                entry = cache.get(key)
+                if entry is not None:
+                    _record(namespace, "waits")
+                    return entry[0]
+            # The lock holder is too slow; compute without storing
+            _record(namespace, "recomputes")
+            return compute()
+
+    _record(namespace, "recomputes")
+    try:
+        return _compute_and_store(key, compute, timeout, stale_timeout)
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,10 @@
+"""
+PostgreSQL backend that records connection acquisition metrics.
+"""
+
+from django.db.backends.postgresql import base
+from core.db.metrics import ConnectionMetricsMixin
+
+
+class DatabaseWrapper(ConnectionMetricsMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,61 @@
+"""
+Database connection acquisition metrics.
+
+DatabaseWrapper classes that include ConnectionMetricsMixin record how many
+physical connections each process opened (or, with a connection pool, took
+from it) and how long that took. With persistent connections the count
+should stay close to the number of worker threads; with a pool the time is
+the pool wait time. Every acquisition is also observed in the
+althea_db_connection_wait_seconds histogram served at /metrics.
+"""
+
+import logging
+import threading
+import time
+from django.conf import settings
+from core.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def _empty_stats():
+    return {"acquired": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+
+def record_connection_wait(alias, seconds):
+    with _lock:
+        stats = _stats.setdefault(alias, _empty_stats())
+        stats["acquired"] += 1
+        stats["wait_seconds_total"] += seconds
+        stats["wait_seconds_max"] = max(stats["wait_seconds_max"], seconds)
+    observe("althea_db_connection_wait_seconds", {"alias": alias}, seconds)
+
+    threshold = getattr(settings, "DB_CONNECTION_WAIT_WARNING", None)
+    if threshold is not None and seconds >= threshold:
+        logger.warning(
+            "Waited %.3fs for a database connection on %s", seconds, alias
+        )
+
+
+def connection_stats():
+    """
+    Per-alias copy of the metrics of this process.
+    """
+    with _lock:
+        return {alias: dict(stats) for alias, stats in _stats.items()}
+
+
+def reset_connection_stats():
+    with _lock:
+        _stats.clear()
+
+
+class ConnectionMetricsMixin:
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        record_connection_wait(self.alias, time.perf_counter() - start)
+        return connection
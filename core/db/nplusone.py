@@ -0,0 +1,162 @@
+"""
+N+1 query detection for development, staging and tests.
+
+detect_nplusone() fingerprints every query run in its block (see
+core.db.slow_queries.fingerprint) and counts them per call site. A
+fingerprint run more than NPLUSONE_THRESHOLD times from the same line of
+project code is an N+1 candidate. It is reported with the model it loads
+and, when a relation access triggered it, the attribute responsible, e.g.
+"CreditLine through CreditLineAdjustment.credit_line".
+
+Findings are logged as warnings, or raised as NPlusOneError when
+NPLUSONE_RAISE is set, which makes the offending test fail.
+NPlusOneMiddleware runs every request in such a block when
+NPLUSONE_DETECTION is set.
+"""
+
+import logging
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.fields.related_descriptors import (
+    ForwardManyToOneDescriptor,
+    ReverseOneToOneDescriptor,
+)
+from core.db.slow_queries import call_site, fingerprint
+
+logger = logging.getLogger(__name__)
+
+_FROM_TABLE = re.compile(r'\bFROM "?(\w+)"?', re.IGNORECASE)
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def _model_of_table(table):
+    for model in apps.get_models():
+        if model._meta.db_table == table:
+            return model.__name__
+    return table
+
+
+def _relation_access(frame):
+    """
+    (loaded model, "Model.attribute") of the innermost relation descriptor
+    or related manager on the stack, or None.
+    """
+    while frame is not None:
+        owner = frame.f_locals.get("self")
+        if isinstance(owner, ForwardManyToOneDescriptor):
+            field = owner.field
+            return field.related_model.__name__, f"{field.model.__name__}.{field.name}"
+        if isinstance(owner, ReverseOneToOneDescriptor):
+            related = owner.related
+            return (
+                related.related_model.__name__,
+                f"{related.model.__name__}.{related.get_accessor_name()}",
+            )
+        # Evaluating a reverse related manager's queryset, e.g. iterating
+        # credit_line.creditsubline_set.all(), from a ModelIterable
+        queryset = getattr(owner, "queryset", owner)
+        if isinstance(queryset, QuerySet) and queryset._known_related_objects:
+            field = next(iter(queryset._known_related_objects))
+            return (
+                field.model.__name__,
+                f"{field.related_model.__name__}.{field.remote_field.get_accessor_name()}",
+            )
+        # Related managers are classes created on the fly by Django
+        manager = type(owner).__name__
+        if manager == "RelatedManager":
+            accessor = owner.field.remote_field.get_accessor_name()
+            return owner.model.__name__, f"{type(owner.instance).__name__}.{accessor}"
+        if manager == "ManyRelatedManager":
+            return (
+                owner.model.__name__,
+                f"{type(owner.instance).__name__}.{owner.prefetch_cache_name}",
+            )
+        frame = frame.f_back
+    return None
+
+
+class NPlusOneDetector:
+    """
+    Database execute wrapper counting queries per fingerprint and call site.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.relations = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql), call_site()
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold + 1:
+            self.relations[key] = _relation_access(sys._getframe(1))
+        return execute(sql, params, many, context)
+
+    def findings(self):
+        """
+        One dict per repeated query: sql, call_site, count, model, attribute.
+        """
+        results = []
+        for (sql, site), count in self.counts.items():
+            if count <= self.threshold:
+                continue
+            relation = self.relations.get((sql, site))
+            if relation is not None:
+                model, attribute = relation
+            else:
+                match = _FROM_TABLE.search(sql)
+                model = _model_of_table(match.group(1)) if match else None
+                attribute = None
+            results.append(
+                {
+                    "sql": sql,
+                    "call_site": site,
+                    "count": count,
+                    "model": model,
+                    "attribute": attribute,
+                }
+            )
+        return results
+
+
+def describe(finding):
+    through = f" through {finding['attribute']}" if finding["attribute"] else ""
+    return (
+        f"{finding['count']} queries loading {finding['model']}{through} "
+        f"from {finding['call_site']}: {finding['sql']}"
+    )
+
+
+@contextmanager
+def detect_nplusone(label=None, threshold=None, raise_errors=None):
+    """
+    Report the N+1 candidates among the queries run in this block.
+    """
+    if threshold is None:
+        threshold = settings.NPLUSONE_THRESHOLD
+    if raise_errors is None:
+        raise_errors = settings.NPLUSONE_RAISE
+
+    detector = NPlusOneDetector(threshold)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
+
+    findings = detector.findings()
+    if not findings:
+        return
+    messages = [describe(finding) for finding in findings]
+    for message in messages:
+        logger.warning("N+1 queries in %s: %s", label, message)
+    if raise_errors:
+        raise NPlusOneError(f"N+1 queries in {label}:\n" + "\n".join(messages))
@@ -0,0 +1,361 @@
+"""
+Query plan checks for the admin API.
+
+PLAN_CASES lists the admin list and detail endpoints, with their filters,
+the indexes their queries must use and a ceiling on the planner's cost.
+check_plans() requests each endpoint as a staff user, records the SELECTs it
+runs and explains them with EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON). A case
+fails when one of its queries:
+
+- scans a table of SEQ_SCAN_MIN_ROWS rows or more sequentially;
+- uses none of the case's expected indexes;
+- has an estimated total cost above the case's ceiling.
+
+Pagination counts read every matching row whatever the indexes, so they are
+explained and reported but not checked.
+
+Plans depend on the volumes and the statistics of the database: run the
+checks on PostgreSQL after seed_portfolio, which analyzes the tables, with
+the check_query_plans command or core/tests/test_query_plans.py.
+"""
+
+import json
+from contextlib import ExitStack
+from fnmatch import fnmatch
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Count
+from django.urls import NoReverseMatch, resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+# Smaller tables are cheaper to read whole than through an index
+SEQ_SCAN_MIN_ROWS = 1000
+
+LIST_MAX_COST = 1000
+DETAIL_MAX_COST = 100
+
+# url is called with the samples of plan_samples() and returns the path to
+# request, or None when the database has no data for the case.
+PLAN_CASES = [
+    {
+        "name": "credit_lines_admin_list",
+        "url": lambda s: reverse("credit_line_api:credit_lines_admin_list"),
+        "indexes": ("credit_line_created_idx",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_lines_admin_list?status",
+        "url": lambda s: _with_query(
+            "credit_line_api:credit_lines_admin_list", status=s["credit_line_status"]
+        ),
+        "indexes": ("credit_line_status_idx",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_lines_admin_list?user",
+        "url": lambda s: _with_query(
+            "credit_line_api:credit_lines_admin_list", user=s["credit_line_user"]
+        ),
+        "indexes": ("credit_line_creditline_user_id_*",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_requests_admin_list",
+        "url": lambda s: reverse("credit_origination_api:credit_requests_admin_list"),
+        "indexes": ("credit_request_created_idx",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_requests_admin_list?status",
+        "url": lambda s: _with_query(
+            "credit_origination_api:credit_requests_admin_list",
+            status=s["credit_request_status"],
+        ),
+        "indexes": ("credit_request_status_idx",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_requests_admin_list?username",
+        "url": lambda s: _with_query(
+            "credit_origination_api:credit_requests_admin_list",
+            username=s["credit_request_username"],
+        ),
+        "indexes": ("accounts_user_username_*",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_sublines_admin_list",
+        "url": lambda s: reverse("credit_subline_api:credit_sublines_admin_list"),
+        "indexes": ("credit_subline_created_idx",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_sublines_admin_list?status",
+        "url": lambda s: _with_query(
+            "credit_subline_api:credit_sublines_admin_list", status=s["subline_status"]
+        ),
+        "indexes": ("credit_subline_status_idx",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_line_adjustments_admin_list",
+        "url": lambda s: reverse("credit_line_api:credit_line_adjustments_admin_list"),
+        "indexes": ("line_adjustment_date_idx",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_subline_adjustments_admin_list",
+        "url": lambda s: reverse("credit_subline_api:credit_subline_adjustments_admin_list"),
+        "indexes": ("ledger_queue_idx",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_subline_adjustments_admin_list?type",
+        "url": lambda s: _with_query(
+            "credit_subline_api:credit_subline_adjustments_admin_list",
+            type=s["subline_adjustment"][0],
+        ),
+        "indexes": ("ledger_queue_idx", "ledger_kind_queue_idx"),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_subline_adjustments_admin_list?adjustment_status",
+        "url": lambda s: _with_query(
+            "credit_subline_api:credit_subline_adjustments_admin_list",
+            adjustment_status=s["subline_adjustment_status"],
+        ),
+        "indexes": ("ledger_status_queue_idx",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_adjustment_ledger",
+        "url": lambda s: reverse(
+            "credit_subline_api:credit_adjustment_ledger",
+            kwargs={"credit_line_pk": s["ledger_credit_line"]},
+        ),
+        "indexes": ("ledger_account_date_idx",),
+        "max_cost": LIST_MAX_COST,
+    },
+    {
+        "name": "credit_line_adjustment_detail",
+        "url": lambda s: reverse(
+            "credit_line_api:credit_line_adjustment_detail",
+            kwargs={"pk": s["line_adjustment"]},
+        ),
+        "indexes": ("credit_line_creditlineadjustment_pkey",),
+        "max_cost": DETAIL_MAX_COST,
+    },
+    {
+        "name": "get_credit_subline_adjustment",
+        "url": lambda s: reverse(
+            "credit_subline_api:get_credit_subline_adjustment",
+            kwargs={"type": s["subline_adjustment"][0], "adj_id": s["subline_adjustment"][1]},
+        ),
+        "indexes": ("credit_subline_*adjustment_pkey",),
+        "max_cost": DETAIL_MAX_COST,
+    },
+    {
+        "name": "loan_term_detail",
+        "url": lambda s: reverse(
+            "loan_management_api:loan_term_detail",
+            kwargs={"loan_term_pk": s["loan_term"]},
+        ),
+        "indexes": ("loan_management_loanterm_pkey",),
+        "max_cost": DETAIL_MAX_COST,
+    },
+]
+
+
+def _with_query(url_name, **params):
+    if None in params.values():
+        return None
+    return f"{reverse(url_name)}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
+
+
+def _rarest(queryset, field):
+    # The filters are checked with their most selective value: the one an
+    # index must serve, rather than one a scan of the newest rows finds
+    row = queryset.values(field).annotate(rows=Count("pk")).order_by("rows", field).first()
+    return row[field] if row else None
+
+
+def plan_samples():
+    """
+    Ids and filter values taken from the database for PLAN_CASES; None
+    where the database has no rows for them.
+    """
+    from credit_line.models import CreditLine, CreditLineAdjustment
+    from credit_origination.models import CreditRequest
+    from credit_subline.models import AdjustmentLedgerEntry, CreditSubline
+    from loan_management.models import LoanTerm
+
+    ledger = AdjustmentLedgerEntry.objects.filter(is_current=True)
+    subline_ledger = ledger.filter(kind__in=AdjustmentLedgerEntry.SUBLINE_KINDS)
+    subline_entry = subline_ledger.values_list("kind", "source_id").first()
+    return {
+        "credit_line_status": _rarest(CreditLine.objects.all(), "status"),
+        "credit_line_user": CreditLine.objects.values_list("user_id", flat=True).first(),
+        "credit_request_status": _rarest(CreditRequest.objects.all(), "status"),
+        "credit_request_username": CreditRequest.objects.values_list(
+            "user__username", flat=True
+        ).first(),
+        "subline_status": _rarest(CreditSubline.objects.all(), "status"),
+        "subline_adjustment": subline_entry and tuple(subline_entry),
+        "subline_adjustment_status": _rarest(subline_ledger, "adjustment_status"),
+        "ledger_credit_line": ledger.values_list("credit_line_id", flat=True).first(),
+        "line_adjustment": CreditLineAdjustment.objects.values_list("pk", flat=True).first(),
+        "loan_term": LoanTerm.objects.values_list("pk", flat=True).first(),
+    }
+
+
+class SelectRecorder:
+    """
+    Execute wrapper keeping the SELECTs run on a connection with their
+    parameters, so they can be explained afterwards.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        statement = sql.lstrip().upper()
+        if not many and statement.startswith("SELECT") and " FOR UPDATE" not in statement:
+            self.queries.append((self.alias, sql, params))
+        return execute(sql, params, many, context)
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from plan_nodes(child)
+
+
+def explain(alias, sql, params):
+    """
+    Run EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) for a query and return the
+    top plan node, with "Execution Time" added.
+    """
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+        document = cursor.fetchone()[0]
+    if isinstance(document, str):
+        document = json.loads(document)
+    plan = document[0]["Plan"]
+    plan["Execution Time"] = document[0].get("Execution Time")
+    return plan
+
+
+def table_rows(alias, tables):
+    """
+    Rows of the given tables according to the planner's statistics.
+    """
+    if not tables:
+        return {}
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            "SELECT relname, reltuples FROM pg_class WHERE relname = ANY(%s)",
+            [sorted(tables)],
+        )
+        return dict(cursor.fetchall())
+
+
+def summarize(plan):
+    nodes = list(plan_nodes(plan))
+    return {
+        "total_cost": plan["Total Cost"],
+        "execution_ms": plan.get("Execution Time"),
+        "shared_hit_blocks": plan.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": plan.get("Shared Read Blocks", 0),
+        "indexes": sorted({node["Index Name"] for node in nodes if "Index Name" in node}),
+        "seq_scans": sorted(
+            {node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"}
+        ),
+    }
+
+
+def is_count(sql):
+    return sql.lstrip().upper().startswith('SELECT COUNT(*) AS "__COUNT"')
+
+
+def _plan_user():
+    # Never saved: the checks do not write to the database
+    return get_user_model()(username="query-plans", is_active=True, is_staff=True)
+
+
+def _request_host():
+    # Pagination links need a host that get_host() accepts
+    for host in settings.ALLOWED_HOSTS:
+        if host == "*":
+            break
+        if not host.startswith("."):
+            return host
+    return "localhost"
+
+
+def check_case(case, samples):
+    """
+    Request the endpoint of a case and explain its queries.
+    """
+    try:
+        path = case["url"](samples)
+    except (NoReverseMatch, TypeError):
+        # A sample the case needs is None
+        path = None
+    result = {"name": case["name"], "path": path, "queries": [], "problems": []}
+    if path is None:
+        result["skipped"] = "no data"
+        return result
+
+    request = APIRequestFactory().get(path, HTTP_HOST=_request_host())
+    force_authenticate(request, user=_plan_user())
+    match = resolve(request.path)
+    recorders = [SelectRecorder(alias) for alias in settings.DATABASES]
+    with ExitStack() as stack:
+        for recorder in recorders:
+            stack.enter_context(connections[recorder.alias].execute_wrapper(recorder))
+        response = match.func(request, *match.args, **match.kwargs)
+    result["status"] = response.status_code
+    if response.status_code != 200:
+        result["problems"].append(f"responded {response.status_code}")
+
+    indexes = set()
+    for recorder in recorders:
+        for alias, sql, params in recorder.queries:
+            summary = summarize(explain(alias, sql, params))
+            summary["sql"] = sql
+            summary["count"] = is_count(sql)
+            result["queries"].append(summary)
+            if summary["count"]:
+                continue
+            indexes.update(summary["indexes"])
+            rows = table_rows(alias, summary["seq_scans"])
+            for table in summary["seq_scans"]:
+                if rows.get(table, 0) >= SEQ_SCAN_MIN_ROWS:
+                    result["problems"].append(
+                        f"sequential scan on {table} ({int(rows[table])} rows)"
+                    )
+            if summary["total_cost"] > case["max_cost"]:
+                result["problems"].append(
+                    f"cost {summary['total_cost']:.1f} over {case['max_cost']}"
+                )
+
+    if not any(fnmatch(index, pattern) for index in indexes for pattern in case["indexes"]):
+        result["problems"].append(
+            f"none of {', '.join(case['indexes'])} used (used: {', '.join(sorted(indexes))})"
+        )
+    return result
+
+
+def check_plans(only=None):
+    """
+    Results of the PLAN_CASES whose name starts with one of the only
+    prefixes, or of all of them.
+    """
+    samples = plan_samples()
+    return [
+        check_case(case, samples)
+        for case in PLAN_CASES
+        if not only or any(case["name"].startswith(prefix) for prefix in only)
+    ]
@@ -0,0 +1,113 @@
+"""
+Primary/replica database routing.
+
+Writes always go to the primary ("default"). Reads go to the primary too
+unless the code asks for a replica with use_replica() or the
+read_from_replica view decorator, which the admin lists use. Even then the
+read stays on the primary when:
+
+- a transaction is open on the primary (select_for_update, read-modify-write
+  sequences), so it never mixes primary and replica state;
+- pin_primary() is active;
+- the authenticated user wrote something in the last REPLICA_PIN_SECONDS
+  (see ReplicaPinMiddleware), so they read their own writes despite the
+  replication lag.
+
+Replica aliases are listed in settings.DATABASE_REPLICAS. With no replicas
+configured every query goes to the primary.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replica_reads = ContextVar("replica_reads", default=False)
+_primary_pinned = ContextVar("primary_pinned", default=False)
+
+
+def replica_aliases():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+@contextmanager
+def use_replica():
+    """
+    Send the reads in this block to a replica.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def pin_primary():
+    """
+    Keep every query in this block on the primary, even inside use_replica().
+    """
+    token = _primary_pinned.set(True)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+def _pin_key(user_id):
+    return f"db-router:primary-pin:{user_id}"
+
+
+def pin_user_to_primary(user_id):
+    """
+    Serve the reads of this user from the primary for REPLICA_PIN_SECONDS.
+    The pin is kept in the cache, so with several processes it needs a shared
+    cache backend.
+    """
+    cache.set(_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def user_pinned_to_primary(user):
+    if user is None or not user.is_authenticated:
+        return False
+    return cache.get(_pin_key(user.pk), False)
+
+
+def read_from_replica(view):
+    """
+    Run a read-only view against a replica, unless the user just wrote.
+    Apply it below @api_view so it runs after authentication.
+    """
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not replica_aliases() or user_pinned_to_primary(request.user):
+            return view(request, *args, **kwargs)
+        with use_replica():
+            return view(request, *args, **kwargs)
+
+    return wrapped
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or _primary_pinned.get():
+            return DEFAULT_DB_ALIAS
+        replicas = replica_aliases()
+        if not replicas or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db not in replica_aliases()
@@ -0,0 +1,242 @@
+"""
+Slow-query log with call-site attribution.
+
+Every database connection gets an execute wrapper (installed when the
+connection is created) that times each query. Queries slower than
+SLOW_QUERY_THRESHOLD seconds are appended as one JSON line to
+SLOW_QUERY_LOG_PATH, with:
+
+- the SQL fingerprint (literals and placeholders replaced, IN and VALUES
+  lists collapsed), never the parameters;
+- the duration and the row count;
+- the URL name of the request being served (set by SlowQueryMiddleware);
+- the innermost project frame that ran the query, such as
+  credit_subline/api/views.py:589.
+
+Each process appends to the same file, so slow_query_report() can rank the
+fingerprints of every worker over a rolling window, as the slow_queries
+command and the staff endpoint do. The log rotates to <path>.1 once it grows
+past SLOW_QUERY_LOG_MAX_BYTES.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+_current_request = ContextVar("slow_query_request", default=None)
+
+# Modules that only wrap query execution; the call site is below them
+INSTRUMENTATION_FILES = (
+    os.path.join("core", "db", "nplusone.py"),
+    os.path.join("core", "db", "slow_queries.py"),
+    os.path.join("core", "metrics.py"),
+    os.path.join("core", "middleware.py"),
+    os.path.join("core", "tracing.py"),
+)
+
+SORT_KEYS = ("total_ms", "max_ms", "count")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bIN \((?:\?, )*\?\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"\((?:\?, )*\?\)(?:, \((?:\?, )*\?\))*")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    SQL with its literal values removed, so that the same query with other
+    arguments groups together.
+    """
+    sql = _SPACES.sub(" ", sql).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _VALUES_ROWS.sub("(...)", sql)
+
+
+def fingerprint_id(normalized_sql):
+    return hashlib.md5(normalized_sql.encode()).hexdigest()[:12]
+
+
+def call_site():
+    """
+    "path/to/file.py:line" of the innermost project frame on the stack.
+    """
+    base_dir = str(settings.BASE_DIR) + os.sep
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(base_dir)
+            and "site-packages" not in filename
+            and not filename.endswith(INSTRUMENTATION_FILES)
+        ):
+            return f"{filename[len(base_dir):]}:{frame.f_lineno}"
+        frame = frame.f_back
+    return None
+
+
+@contextmanager
+def track_request(request):
+    """
+    Attribute the slow queries of this block to the request's URL name.
+    """
+    token = _current_request.set(request)
+    try:
+        yield
+    finally:
+        _current_request.reset(token)
+
+
+def _current_view():
+    request = _current_request.get()
+    if request is None:
+        return None
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else None
+
+
+def _log_path():
+    return Path(settings.SLOW_QUERY_LOG_PATH)
+
+
+def _append(record):
+    path = _log_path()
+    try:
+        if path.stat().st_size > settings.SLOW_QUERY_LOG_MAX_BYTES:
+            os.replace(path, f"{path}.1")
+    except FileNotFoundError:
+        pass
+    # A single small append is atomic, so workers can share the file
+    with open(path, "a") as log:
+        log.write(json.dumps(record) + "\n")
+
+
+def record_slow_query(sql, seconds, rows, view, site):
+    normalized = fingerprint(sql)
+    record = {
+        "time": timezone.now().isoformat(),
+        "fingerprint": fingerprint_id(normalized),
+        "sql": normalized,
+        "duration_ms": round(seconds * 1000, 2),
+        "rows": rows,
+        "view": view,
+        "call_site": site,
+    }
+    logger.warning(
+        "Slow query (%.1f ms) from %s in %s: %s",
+        record["duration_ms"],
+        site,
+        view,
+        normalized,
+    )
+    try:
+        _append(record)
+    except OSError:
+        logger.exception("Could not write to the slow query log")
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - start
+        if seconds >= settings.SLOW_QUERY_THRESHOLD and settings.SLOW_QUERY_LOG_PATH:
+            rowcount = getattr(context["cursor"], "rowcount", -1)
+            record_slow_query(
+                sql,
+                seconds,
+                rowcount if rowcount >= 0 else None,
+                _current_view(),
+                call_site(),
+            )
+
+
+def install_wrapper(sender, connection, **kwargs):
+    """
+    connection_created receiver adding the slow query wrapper.
+    """
+    if slow_query_wrapper not in connection.execute_wrappers:
+        # First in the list, so that execute_wrapper() blocks, which pop the
+        # last wrapper on exit, never remove it.
+        connection.execute_wrappers.insert(0, slow_query_wrapper)
+
+
+def read_log(since=None):
+    """
+    Records of the log (rotated part included), oldest first, optionally only
+    those logged after the datetime since.
+    """
+    path = _log_path()
+    records = []
+    for part in (Path(f"{path}.1"), path):
+        try:
+            lines = part.read_text().splitlines()
+        except FileNotFoundError:
+            continue
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a concurrent rotation
+            if since is None or parse_datetime(record["time"]) >= since:
+                records.append(record)
+    return records
+
+
+def slow_query_report(minutes=60, top=20, sort="total_ms"):
+    """
+    The top fingerprints of the last minutes by total time, worst duration
+    or number of slow executions.
+    """
+    since = timezone.now() - timedelta(minutes=minutes)
+    groups = {}
+    for record in read_log(since):
+        group = groups.setdefault(
+            record["fingerprint"],
+            {
+                "fingerprint": record["fingerprint"],
+                "sql": record["sql"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "max_rows": None,
+                "views": Counter(),
+                "call_sites": Counter(),
+                "last_seen": record["time"],
+            },
+        )
+        group["count"] += 1
+        group["total_ms"] += record["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], record["duration_ms"])
+        if record["rows"] is not None:
+            group["max_rows"] = max(group["max_rows"] or 0, record["rows"])
+        group["views"][record["view"] or "-"] += 1
+        group["call_sites"][record["call_site"] or "-"] += 1
+        group["last_seen"] = record["time"]
+
+    report = sorted(groups.values(), key=lambda group: group[sort], reverse=True)
+    for group in report[:top]:
+        group["total_ms"] = round(group["total_ms"], 2)
+        group["mean_ms"] = round(group["total_ms"] / group["count"], 2)
+        group["views"] = dict(group["views"].most_common(5))
+        group["call_sites"] = dict(group["call_sites"].most_common(5))
+    return report[:top]
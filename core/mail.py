@@ -0,0 +1,118 @@
+"""
+Email outbox.
+
+Request handlers call queue_email(), which only inserts a QueuedEmail row.
+The send_queued_emails worker claims pending rows in batches and delivers
+each batch over a single SMTP connection.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from core.models import QueuedEmail
+
+MAX_ATTEMPTS = 5
+
+# Failed emails wait this long before they are retried
+RETRY_DELAY = timedelta(minutes=1)
+
+# Rows claimed longer ago than this belong to a worker that died mid-batch
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def queue_email(subject, body, to, from_email=None, content_subtype="plain"):
+    return QueuedEmail.objects.create(
+        subject=subject,
+        body=body,
+        to=list(to),
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        content_subtype=content_subtype,
+    )
+
+
+def build_message(queued_email, connection):
+    message = EmailMessage(
+        queued_email.subject,
+        queued_email.body,
+        queued_email.from_email,
+        to=queued_email.to,
+        connection=connection,
+    )
+    message.content_subtype = queued_email.content_subtype
+    return message
+
+
+def claim_batch(batch_size):
+    """
+    Mark the next batch of deliverable emails as being sent and return them.
+    Concurrent workers skip each other's locked rows.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status="pending", claimed_at__isnull=True)
+                | Q(status="pending", claimed_at__lt=now - RETRY_DELAY)
+                | Q(status="sending", claimed_at__lt=now - CLAIM_TIMEOUT)
+            )
+            .order_by("id")[:batch_size]
+        )
+        QueuedEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            status="sending", claimed_at=now
+        )
+    return batch
+
+
+def send_queued_emails(batch_size=100, connection=None):
+    """
+    Deliver the next batch of queued emails over one SMTP connection.
+    Returns the number of emails handled.
+
+    A failed email goes back to pending, to be retried after RETRY_DELAY,
+    until it has been tried MAX_ATTEMPTS times; then it is marked failed.
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0
+
+    connection = connection or get_connection()
+    sent, failed = [], []
+    for queued_email in batch:
+        queued_email.attempts += 1
+    try:
+        connection.open()
+    except Exception as e:
+        for queued_email in batch:
+            queued_email.last_error = str(e)
+        failed = batch
+    else:
+        try:
+            for queued_email in batch:
+                message = build_message(queued_email, connection)
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    queued_email.last_error = str(e)
+                    failed.append(queued_email)
+                else:
+                    sent.append(queued_email)
+        finally:
+            connection.close()
+
+    now = timezone.now()
+    for queued_email in sent:
+        queued_email.status = "sent"
+        queued_email.sent_at = now
+        queued_email.last_error = ""
+    for queued_email in failed:
+        queued_email.status = (
+            "failed" if queued_email.attempts >= MAX_ATTEMPTS else "pending"
+        )
+    QueuedEmail.objects.bulk_update(
+        sent + failed, ["status", "attempts", "last_error", "sent_at"]
+    )
+    return len(batch)
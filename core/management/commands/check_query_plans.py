@@ -0,0 +1,61 @@
+"""
+Django command to check the query plans of the admin API.
+"""
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from core.db.query_plans import check_plans
+
+
+class Command(BaseCommand):
+    """Django command to explain the admin list and detail queries."""
+
+    help = (
+        "Explain the queries of the admin lists and details with "
+        "EXPLAIN (ANALYZE, BUFFERS) and check their index usage and cost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only",
+            action="append",
+            help="Check only the cases starting with this prefix.",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print the results and plans as JSON."
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if connection.vendor != "postgresql":
+            raise CommandError("Query plans can only be checked on PostgreSQL.")
+
+        results = check_plans(only=options["only"])
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            for result in results:
+                self.write_result(result)
+
+        failed = [result["name"] for result in results if result["problems"]]
+        if failed:
+            raise CommandError(f"Query plan regressions in {', '.join(failed)}")
+
+    def write_result(self, result):
+        if "skipped" in result:
+            self.stdout.write(f"SKIP {result['name']} ({result['skipped']})")
+            return
+
+        style = self.style.ERROR if result["problems"] else self.style.SUCCESS
+        self.stdout.write(style(f"{'FAIL' if result['problems'] else 'OK'} {result['name']}"))
+        self.stdout.write(f"  GET {result['path']}")
+        for query in result["queries"]:
+            self.stdout.write(
+                f"  {'count' if query['count'] else 'query'}: "
+                f"cost {query['total_cost']:.1f}, {query['execution_ms'] or 0:.2f} ms, "
+                f"{query['shared_hit_blocks']} hit / {query['shared_read_blocks']} read, "
+                f"indexes {', '.join(query['indexes']) or '-'}"
+            )
+        for problem in result["problems"]:
+            self.stdout.write(self.style.WARNING(f"  {problem}"))
@@ -0,0 +1,39 @@
+"""
+Django command to prebuild the OpenAPI schema served by the API.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from core.openapi import FORMATS, generate_schema, schema_path, write_schema
+
+
+class Command(BaseCommand):
+    """Django command to write the OpenAPI schema files."""
+
+    help = "Generate the OpenAPI schema into OPENAPI_SCHEMA_DIR."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only check that the files are up to date with the API.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options["check"]:
+            stale = [
+                str(schema_path(format))
+                for format, content in generate_schema().items()
+                if not schema_path(format).exists()
+                or schema_path(format).read_bytes() != content
+            ]
+            if stale:
+                raise CommandError(f"Outdated OpenAPI schema: {', '.join(stale)}.")
+            self.stdout.write(self.style.SUCCESS("OpenAPI schema is up to date."))
+            return
+
+        for format, (path, etag) in write_schema().items():
+            self.stdout.write(f"{path} ({FORMATS[format][1]}, etag {etag})")
+        self.stdout.write(
+            self.style.SUCCESS("OpenAPI schema written, restart the server to serve it.")
+        )
@@ -0,0 +1,63 @@
+"""
+Django command to relay outbox events to a downstream sink.
+"""
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.outbox import get_sink, relay_batch, prune_delivered_events
+
+
+class Command(BaseCommand):
+    """Django command to drain the outbox in ordered batches."""
+
+    help = "Relay outbox events to a file, HTTP or stub sink."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sink",
+            default="file",
+            help="file, http, stub or a dotted path to a sink class.",
+        )
+        parser.add_argument(
+            "--target", help="File path or URL for the sink (defaults from settings)."
+        )
+        parser.add_argument("--consumer", default="relay")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--settle-seconds", type=int, default=5)
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling for new events."
+        )
+        parser.add_argument("--interval", type=float, default=1.0)
+        parser.add_argument(
+            "--prune-days",
+            type=int,
+            help="Delete events delivered to every consumer and older than this.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            sink = get_sink(options["sink"], options["target"])
+        except ImportError as e:
+            raise CommandError(f"Unknown sink {options['sink']}: {e}")
+
+        total = 0
+        while True:
+            delivered = relay_batch(
+                sink,
+                consumer=options["consumer"],
+                batch_size=options["batch_size"],
+                settle_seconds=options["settle_seconds"],
+            )
+            total += delivered
+            if delivered:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"Relayed {total} events."))
+
+        if options["prune_days"] is not None:
+            pruned = prune_delivered_events(options["prune_days"])
+            self.stdout.write(f"Pruned {pruned} delivered events.")
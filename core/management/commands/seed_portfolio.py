@@ -0,0 +1,121 @@
+"""
+Django command to generate a synthetic portfolio at production volumes.
+"""
+
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.seeding import DEFAULT_OPTIONS, parse_count, seed_portfolio
+
+
+class Command(BaseCommand):
+    """Django command to bulk load users, credit lines and their loans."""
+
+    help = (
+        "Generate users, credit requests, credit lines, sublines, adjustments, "
+        "loan terms and payments with batched bulk inserts or COPY."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=parse_count,
+            default=DEFAULT_OPTIONS["users"],
+            help="Number of users, e.g. 1e6.",
+        )
+        parser.add_argument(
+            "--lines",
+            type=parse_count,
+            help="Number of users with a credit line (default: all of them).",
+        )
+        parser.add_argument(
+            "--sublines-per-line",
+            type=float,
+            default=DEFAULT_OPTIONS["sublines_per_line"],
+            help="Mean of the Poisson distributed number of sublines per line.",
+        )
+        parser.add_argument(
+            "--adjustments-per-line",
+            type=float,
+            default=DEFAULT_OPTIONS["adjustments_per_line"],
+        )
+        parser.add_argument(
+            "--adjustments-per-subline",
+            type=float,
+            default=DEFAULT_OPTIONS["adjustments_per_subline"],
+        )
+        parser.add_argument(
+            "--approve-ratio",
+            type=float,
+            default=DEFAULT_OPTIONS["approve_ratio"],
+            help="Share of approved credit lines, adjustments and loan terms.",
+        )
+        parser.add_argument(
+            "--limit-median",
+            type=float,
+            default=DEFAULT_OPTIONS["limit_median"],
+            help="Median of the log-normal credit limits.",
+        )
+        parser.add_argument(
+            "--limit-sigma", type=float, default=DEFAULT_OPTIONS["limit_sigma"]
+        )
+        parser.add_argument(
+            "--interest-rate-min",
+            type=float,
+            default=DEFAULT_OPTIONS["interest_rate_min"],
+            help="Lower bound of the uniform annual interest rates, e.g. 0.08.",
+        )
+        parser.add_argument(
+            "--interest-rate-max",
+            type=float,
+            default=DEFAULT_OPTIONS["interest_rate_max"],
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_OPTIONS["batch_size"],
+            help="Users generated and written per transaction.",
+        )
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument(
+            "--method",
+            choices=("auto", "bulk", "copy"),
+            default="auto",
+            help="bulk_create or COPY (PostgreSQL only, where it is the default).",
+        )
+        parser.add_argument("--seed", type=int, default=DEFAULT_OPTIONS["seed"])
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if not 0 <= options["approve_ratio"] <= 1:
+            raise CommandError("--approve-ratio must be between 0 and 1.")
+        if options["batch_size"] < 1 or options["workers"] < 1:
+            raise CommandError("--batch-size and --workers must be positive.")
+
+        start = time.perf_counter()
+
+        def progress(rows):
+            users = rows["accounts.User"]
+            seconds = time.perf_counter() - start
+            self.stdout.write(
+                f"{users}/{options['users']} users, {sum(rows.values())} rows "
+                f"({sum(rows.values()) / seconds:.0f} rows/s)"
+            )
+
+        try:
+            rows = seed_portfolio(
+                progress=progress,
+                **{name: options[name] for name in DEFAULT_OPTIONS},
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        seconds = time.perf_counter() - start
+        for label, count in sorted(rows.items()):
+            self.stdout.write(f"  {label}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {sum(rows.values())} rows in {seconds:.1f}s "
+                f"({sum(rows.values()) / seconds:.0f} rows/s)."
+            )
+        )
@@ -0,0 +1,34 @@
+"""
+Django command to deliver queued emails.
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from core.mail import send_queued_emails
+
+
+class Command(BaseCommand):
+    """Django command to drain the email outbox over reused SMTP connections."""
+
+    help = "Send queued emails in batches, one SMTP connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling for new emails."
+        )
+        parser.add_argument("--interval", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        total = 0
+        while True:
+            handled = send_queued_emails(batch_size=options["batch_size"])
+            total += handled
+            if handled:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"Handled {total} queued emails."))
@@ -0,0 +1,36 @@
+"""
+Django command to print traces as trees of span durations.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from core.tracing import format_trace, read_spans
+
+
+class Command(BaseCommand):
+    """Django command to show traces of a JSON lines span file."""
+
+    help = "Print a trace, or the last traces, of the tracing JSON lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("trace_id", nargs="?", help="Trace id or a prefix of it.")
+        parser.add_argument(
+            "--path", help="Span file, TRACING_FILE_PATH by default."
+        )
+        parser.add_argument("--last", type=int, default=1)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        traces = read_spans(options["path"])
+        if options["trace_id"]:
+            selected = [
+                trace_id for trace_id in traces if trace_id.startswith(options["trace_id"])
+            ]
+            if not selected:
+                raise CommandError(f"No trace {options['trace_id']}.")
+        else:
+            selected = list(traces)[-options["last"]:]
+
+        for trace_id in selected:
+            self.stdout.write(self.style.SUCCESS(f"trace {trace_id}"))
+            for line in format_trace(traces[trace_id]):
+                self.stdout.write(line)
@@ -0,0 +1,50 @@
+"""
+Django command to report the slowest queries of the slow query log.
+"""
+
+import json
+from django.core.management.base import BaseCommand
+from core.db.slow_queries import SORT_KEYS, slow_query_report
+
+
+class Command(BaseCommand):
+    """Django command to rank slow query fingerprints."""
+
+    help = "Show the top slow query fingerprints of the last minutes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--minutes", type=int, default=60)
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--sort", choices=SORT_KEYS, default="total_ms")
+        parser.add_argument(
+            "--json", action="store_true", help="Print the report as JSON."
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        report = slow_query_report(
+            minutes=options["minutes"], top=options["top"], sort=options["sort"]
+        )
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        if not report:
+            self.stdout.write(
+                self.style.SUCCESS(f"No slow queries in the last {options['minutes']} minutes.")
+            )
+            return
+
+        for group in report:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{group['total_ms']:.1f} ms total, {group['count']} slow, "
+                    f"max {group['max_ms']:.1f} ms, mean {group['mean_ms']:.1f} ms, "
+                    f"max rows {group['max_rows']}  [{group['fingerprint']}]"
+                )
+            )
+            self.stdout.write(f"  {group['sql']}")
+            for site, count in group["call_sites"].items():
+                self.stdout.write(f"  at {site} ({count})")
+            for view, count in group["views"].items():
+                self.stdout.write(f"  in {view} ({count})")
@@ -0,0 +1,77 @@
+"""
+Django command to run a local OTLP/HTTP trace collector.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.tracing import format_trace, spans_from_otlp
+
+
+class Command(BaseCommand):
+    """Django command to collect traces sent with the otlp exporter."""
+
+    help = (
+        "Accept OTLP/HTTP JSON traces on /v1/traces and append their spans "
+        "as JSON lines, like the file exporter."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=4318)
+        parser.add_argument(
+            "--output", help="Span file, TRACING_FILE_PATH by default."
+        )
+        parser.add_argument(
+            "--print", action="store_true", help="Print each trace as it arrives."
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        output = options["output"] or settings.TRACING_FILE_PATH
+        command = self
+        # Requests are handled in threads; keep their lines apart
+        write_lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != "/v1/traces":
+                    self.send_error(404)
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    records = spans_from_otlp(json.loads(self.rfile.read(length)))
+                except (KeyError, TypeError, ValueError):
+                    self.send_error(400, "Expected an OTLP/HTTP JSON export request")
+                    return
+                with write_lock:
+                    with open(output, "a", encoding="utf-8") as outfile:
+                        for record in records:
+                            outfile.write(json.dumps(record))
+                            outfile.write("\n")
+                    if options["print"]:
+                        command.stdout.write("\n".join(format_trace(records)))
+
+                body = b"{}"
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options["host"], options["port"]), Handler)
+        self.stdout.write(
+            f"Collecting traces on http://{options['host']}:{server.server_port}/v1/traces"
+            f" into {output}"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,299 @@
+"""
+Memory profiling with tracemalloc, off unless MEMORY_PROFILING is set.
+
+MemoryProfilerMiddleware starts tracemalloc on the first request of each
+server process, never in a preloading gunicorn master, and records per URL
+name:
+
+- the peak traced allocation of every request above what was allocated when
+  it started, and the memory it left allocated once it finished;
+- for a MEMORY_SITES_SAMPLE_RATE share of the requests, the allocation sites
+  holding more memory after the request than before it, from snapshots
+  taken around it.
+
+Every MEMORY_SNAPSHOT_INTERVAL seconds a background thread, one per server
+process, snapshots the whole process and diffs it against the previous snapshot and against the
+first one, with the RSS at that time. Sites growing from one snapshot to
+the next are retained memory: caches, module-level dicts, leaks.
+
+An allocation site is the innermost project line of the allocation's
+traceback (MEMORY_TRACE_FRAMES deep), or its innermost line when no project
+code is involved. tracemalloc traces the whole process, so requests served
+concurrently by threads see each other's allocations; sync workers serve
+one at a time. Tracing slows allocations down and holding snapshots costs
+memory, so enable it on one instance when looking for a leak or a spike.
+
+The data lives in each process; the staff endpoint /api/memory/ reports the
+process that serves it.
+"""
+
+import os
+import random
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from django.conf import settings
+from django.utils import timezone
+
+_lock = threading.Lock()
+_views = {}
+_snapshots = {"first": None, "previous": None, "diffs": []}
+_process = {"pid": None, "snapshot_thread": None}
+
+# tracemalloc's own frames and import machinery are not of interest
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _after_fork():
+    # The parent may have held the lock while forking (a snapshot diffing
+    # sites); the child's copy would then stay locked forever.
+    global _lock
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _current_process():
+    # A worker forked from a preloading gunicorn master inherits neither the
+    # master's snapshot thread (threads do not survive fork) nor should it
+    # report what the master recorded. Call with the lock held.
+    pid = os.getpid()
+    if _process["pid"] != pid:
+        _views.clear()
+        _snapshots.update(first=None, previous=None, diffs=[])
+        _process.update(pid=pid, snapshot_thread=None)
+
+
+def start():
+    """
+    Start tracing allocations in this process, and the snapshot thread when
+    MEMORY_SNAPSHOT_INTERVAL is set.
+
+    Cheap once started; MemoryProfilerMiddleware calls it on every request so
+    that tracing starts in the worker serving it, not in the master it was
+    forked from, and each worker runs its own snapshot thread.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.MEMORY_TRACE_FRAMES)
+    with _lock:
+        _current_process()
+        if _process["snapshot_thread"] is None and settings.MEMORY_SNAPSHOT_INTERVAL > 0:
+            thread = threading.Thread(
+                target=_snapshot_loop, name="memory-snapshots", daemon=True
+            )
+            thread.start()
+            _process["snapshot_thread"] = thread
+
+
+def _snapshot_loop():
+    take_snapshot()
+    while True:
+        time.sleep(settings.MEMORY_SNAPSHOT_INTERVAL)
+        take_snapshot()
+
+
+def rss_bytes():
+    """
+    Resident set size of this process, None where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _is_project_file(filename):
+    return filename.startswith(str(settings.BASE_DIR) + os.sep) and (
+        "site-packages" not in filename
+    )
+
+
+def _site(traceback):
+    # Frames are ordered from the most recent call
+    for frame in traceback:
+        if _is_project_file(frame.filename):
+            break
+    else:
+        frame = traceback[0]
+    filename = frame.filename
+    if _is_project_file(filename):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[-1]
+    return f"{filename}:{frame.lineno}"
+
+
+def snapshot_sites(snapshot):
+    """
+    Bytes and blocks allocated per site in a snapshot.
+    """
+    sizes, counts = Counter(), Counter()
+    for statistic in snapshot.filter_traces(SNAPSHOT_FILTERS).statistics("traceback"):
+        site = _site(statistic.traceback)
+        sizes[site] += statistic.size
+        counts[site] += statistic.count
+    return sizes, counts
+
+
+def diff_sites(before, after, top):
+    """
+    The top sites that grew between two snapshot_sites() results.
+    """
+    sizes_before, counts_before = before
+    sizes_after, counts_after = after
+    growth = Counter(sizes_after)
+    growth.subtract(sizes_before)
+    return [
+        {
+            "site": site,
+            "size_diff": size_diff,
+            "count_diff": counts_after[site] - counts_before[site],
+            "size": sizes_after[site],
+        }
+        for site, size_diff in growth.most_common(top)
+        if size_diff > 0
+    ]
+
+
+def take_snapshot():
+    """
+    Snapshot the process and keep its diff with the previous snapshot and
+    with the first one, MEMORY_SNAPSHOT_HISTORY diffs at most.
+    """
+    if not tracemalloc.is_tracing():
+        return None
+    sites = snapshot_sites(tracemalloc.take_snapshot())
+    top = settings.MEMORY_TOP_SITES
+    with _lock:
+        first = _snapshots["first"] or sites
+        previous = _snapshots["previous"] or sites
+        diff = {
+            "taken": timezone.now().isoformat(),
+            "rss_bytes": rss_bytes(),
+            "traced_bytes": tracemalloc.get_traced_memory()[0],
+            "since_previous": diff_sites(previous, sites, top),
+            "since_first": diff_sites(first, sites, top),
+        }
+        _snapshots["first"] = first
+        _snapshots["previous"] = sites
+        _snapshots["diffs"] = (_snapshots["diffs"] + [diff])[
+            -settings.MEMORY_SNAPSHOT_HISTORY:
+        ]
+    return diff
+
+
+class RequestMemory:
+    """
+    Traced memory of one request, between start() and stop().
+    """
+
+    def __init__(self, sample_sites=False):
+        self.sample_sites = sample_sites
+        self.sites = []
+
+    def start(self):
+        self.before_sites = (
+            snapshot_sites(tracemalloc.take_snapshot()) if self.sample_sites else None
+        )
+        tracemalloc.reset_peak()
+        self.start_bytes = tracemalloc.get_traced_memory()[0]
+
+    def stop(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak_bytes = max(peak - self.start_bytes, 0)
+        self.retained_bytes = current - self.start_bytes
+        if self.sample_sites:
+            after = snapshot_sites(tracemalloc.take_snapshot())
+            self.sites = diff_sites(self.before_sites, after, settings.MEMORY_TOP_SITES)
+
+
+def _new_view():
+    return {
+        "requests": 0,
+        "peak_bytes_max": 0,
+        "peak_bytes_total": 0,
+        "retained_bytes_total": 0,
+        "sampled_requests": 0,
+        "sites": Counter(),
+        "site_blocks": Counter(),
+    }
+
+
+def record_request(request, memory):
+    match = getattr(request, "resolver_match", None)
+    view_name = match.view_name if match else "unresolved"
+    with _lock:
+        view = _views.setdefault(view_name, _new_view())
+        view["requests"] += 1
+        view["peak_bytes_max"] = max(view["peak_bytes_max"], memory.peak_bytes)
+        view["peak_bytes_total"] += memory.peak_bytes
+        view["retained_bytes_total"] += memory.retained_bytes
+        if memory.sample_sites:
+            view["sampled_requests"] += 1
+            for site in memory.sites:
+                view["sites"][site["site"]] += site["size_diff"]
+                view["site_blocks"][site["site"]] += site["count_diff"]
+
+
+def should_sample_sites():
+    return random.random() < settings.MEMORY_SITES_SAMPLE_RATE
+
+
+def memory_report():
+    """
+    Memory of this process: tracing state, per URL name request memory,
+    heaviest first, and the recent snapshot diffs.
+    """
+    # The peak is reset by every request, so only the current size is reported
+    current = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    top = settings.MEMORY_TOP_SITES
+    with _lock:
+        views = []
+        for name, view in _views.items():
+            sampled = view["sampled_requests"] or 1
+            views.append(
+                {
+                    "view": name,
+                    "requests": view["requests"],
+                    "peak_bytes_max": view["peak_bytes_max"],
+                    "peak_bytes_mean": round(view["peak_bytes_total"] / view["requests"]),
+                    "retained_bytes_total": view["retained_bytes_total"],
+                    "sampled_requests": view["sampled_requests"],
+                    # Growth per sampled request
+                    "sites": [
+                        {
+                            "site": site,
+                            "size_diff": round(size / sampled),
+                            "count_diff": round(view["site_blocks"][site] / sampled),
+                        }
+                        for site, size in view["sites"].most_common(top)
+                    ],
+                }
+            )
+        snapshots = list(_snapshots["diffs"])
+    views.sort(key=lambda view: view["peak_bytes_max"], reverse=True)
+    return {
+        "pid": os.getpid(),
+        "tracing": tracemalloc.is_tracing(),
+        "traced_bytes": current,
+        "rss_bytes": rss_bytes(),
+        "views": views,
+        "snapshots": snapshots,
+    }
+
+
+def reset_memory():
+    """
+    Forget the recorded requests and snapshots of this process.
+    """
+    with _lock:
+        _views.clear()
+        _snapshots.update(first=None, previous=None, diffs=[])
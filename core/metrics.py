@@ -0,0 +1,385 @@
+"""
+Per-request performance metrics in the Prometheus text format.
+
+RequestMetricsMiddleware observes histograms for every request, labelled
+with the URL name ("credit_line_api:credit_lines_admin_list") and the HTTP
+method:
+
+- wall time
+- number of database queries
+- time spent in the database
+- time spent in DRF serializers (is_valid() and .data)
+- response size
+
+It also counts requests per status code and core.cache lookups per
+namespace and result, and core.db.metrics observes the time taken to open
+(or take from the pool) each database connection, labelled with the
+database alias.
+
+Each process keeps its metrics in memory. With METRICS_MULTIPROC_DIR set to
+a directory shared by all the server processes, each process also writes a
+snapshot of its metrics to <pid>.json there, at most every
+METRICS_FLUSH_INTERVAL seconds. render_metrics() adds up the snapshots of
+every process, so a scrape sees the whole server whichever worker serves it.
+When a worker exits, mark_process_dead() folds its snapshot into
+archive.json, so that recycled workers neither reset the totals nor pile up
+files. gunicorn.conf.py wires both up and empties the directory on start.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from django.conf import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+ARCHIVE_FILE = "archive.json"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CONNECTION_WAIT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+HISTOGRAMS = {
+    "althea_http_request_duration_seconds": (
+        "Wall time of the request in seconds.",
+        DURATION_BUCKETS,
+    ),
+    "althea_http_db_queries": (
+        "Database queries run by the request.",
+        QUERY_BUCKETS,
+    ),
+    "althea_http_db_duration_seconds": (
+        "Time the request spent in database queries in seconds.",
+        DURATION_BUCKETS,
+    ),
+    "althea_http_serializer_duration_seconds": (
+        "Time the request spent validating and serializing data in seconds.",
+        DURATION_BUCKETS,
+    ),
+    "althea_http_response_size_bytes": (
+        "Size of the response body in bytes.",
+        SIZE_BUCKETS,
+    ),
+    "althea_db_connection_wait_seconds": (
+        "Time taken to open or check out a database connection in seconds.",
+        CONNECTION_WAIT_BUCKETS,
+    ),
+}
+COUNTERS = {
+    "althea_http_requests_total": "Requests served.",
+    "althea_cache_requests_total": (
+        "Cache lookups per namespace by result: hits, stale_hits, misses, "
+        "waits and recomputes."
+    ),
+}
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_process = {"pid": None, "flushed": 0.0, "timer": None}
+
+_request_timings = ContextVar("request_timings", default=None)
+
+
+def _current_process():
+    # A forked worker starts from zero instead of re-counting what the
+    # master recorded before the fork. Call with the lock held.
+    pid = os.getpid()
+    if _process["pid"] != pid:
+        _histograms.clear()
+        _counters.clear()
+        _process.update(pid=pid, flushed=0.0, timer=None)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, labels, value):
+    buckets = HISTOGRAMS[name][1]
+    key = _key(name, labels)
+    with _lock:
+        _current_process()
+        histogram = _histograms.get(key)
+        if histogram is None:
+            # One count per bucket plus the +Inf overflow; cumulated on render
+            histogram = {"buckets": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0}
+            _histograms[key] = histogram
+        histogram["buckets"][bisect_left(buckets, value)] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+def inc(name, labels, amount=1):
+    key = _key(name, labels)
+    with _lock:
+        _current_process()
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def snapshot():
+    """
+    JSON-serializable copy of the metrics of this process.
+    """
+    with _lock:
+        _current_process()
+        return {
+            "histograms": [
+                [name, list(labels), dict(data, buckets=list(data["buckets"]))]
+                for (name, labels), data in _histograms.items()
+            ],
+            "counters": [
+                [name, list(labels), value]
+                for (name, labels), value in _counters.items()
+            ],
+        }
+
+
+def reset_metrics():
+    with _lock:
+        if _process["timer"] is not None:
+            _process["timer"].cancel()
+        _histograms.clear()
+        _counters.clear()
+        _process.update(pid=None, flushed=0.0, timer=None)
+
+
+def _write_json(path, data):
+    # Write then rename, so readers never see a partial file
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _deferred_flush():
+    with _lock:
+        _process["timer"] = None
+    flush(force=True)
+
+
+def flush(force=False):
+    """
+    Write the snapshot of this process to METRICS_MULTIPROC_DIR, at most every
+    METRICS_FLUSH_INTERVAL seconds unless forced. A flush that comes too soon
+    is deferred rather than dropped, so an idle worker does not keep its last
+    requests to itself.
+    """
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return
+    now = time.monotonic()
+    with _lock:
+        _current_process()
+        wait = settings.METRICS_FLUSH_INTERVAL - (now - _process["flushed"])
+        if not force and wait > 0:
+            if _process["timer"] is None:
+                timer = threading.Timer(wait, _deferred_flush)
+                timer.daemon = True
+                timer.start()
+                _process["timer"] = timer
+            return
+        _process["flushed"] = now
+    _write_json(Path(directory) / f"{os.getpid()}.json", snapshot())
+
+
+def merge(snapshots):
+    histograms = {}
+    counters = {}
+    for data in snapshots:
+        for name, labels, histogram in data["histograms"]:
+            key = name, tuple(tuple(pair) for pair in labels)
+            total = histograms.setdefault(
+                key,
+                {"buckets": [0] * len(histogram["buckets"]), "sum": 0.0, "count": 0},
+            )
+            total["buckets"] = [
+                a + b for a, b in zip(total["buckets"], histogram["buckets"])
+            ]
+            total["sum"] += histogram["sum"]
+            total["count"] += histogram["count"]
+        for name, labels, value in data["counters"]:
+            key = name, tuple(tuple(pair) for pair in labels)
+            counters[key] = counters.get(key, 0) + value
+    return {
+        "histograms": [
+            [name, list(labels), data] for (name, labels), data in histograms.items()
+        ],
+        "counters": [
+            [name, list(labels), value] for (name, labels), value in counters.items()
+        ],
+    }
+
+
+def mark_process_dead(pid, directory):
+    """
+    Fold the snapshot of an exited process into the archive. Only one process
+    (the gunicorn master) may call this for a given directory.
+    """
+    path = Path(directory) / f"{pid}.json"
+    data = _read_json(path)
+    if data is None:
+        return
+    archive_path = Path(directory) / ARCHIVE_FILE
+    archive = _read_json(archive_path)
+    _write_json(archive_path, merge([archive, data] if archive else [data]))
+    path.unlink()
+
+
+def collect():
+    """
+    Metrics of every server process, or of this one without a shared directory.
+    """
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return snapshot()
+    flush(force=True)
+    snapshots = [_read_json(path) for path in Path(directory).glob("*.json")]
+    return merge([data for data in snapshots if data])
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _series_key(series):
+    name, labels, _ = series
+    return name, [tuple(pair) for pair in labels]
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def render_metrics():
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    data = collect()
+    lines = []
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for metric, labels, histogram in sorted(data["histograms"], key=_series_key):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + (float("inf"),), histogram["buckets"]):
+                cumulative += count
+                le = (("le", _format_bound(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+    for name, help_text in COUNTERS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for metric, labels, value in sorted(data["counters"], key=_series_key):
+            if metric == name:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+class QueryTimer:
+    """
+    Database execute wrapper counting queries and the time spent in them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+@contextmanager
+def track_request():
+    """
+    Collect the serializer time of the code run in this block.
+    """
+    timings = {"serializer_seconds": 0.0, "depth": 0}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def _timed_serializer_call(method):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        timings = _request_timings.get()
+        # Only time the outermost call; .data of a Serializer goes through
+        # BaseSerializer.data again.
+        if timings is None or timings["depth"]:
+            return method(*args, **kwargs)
+        timings["depth"] += 1
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings["serializer_seconds"] += time.perf_counter() - start
+            timings["depth"] -= 1
+
+    wrapper.metrics_timed = True
+    return wrapper
+
+
+def instrument_serializers():
+    """
+    Time BaseSerializer.is_valid() and .data, which every DRF serializer
+    goes through. DRF offers no hook for this, so the methods are wrapped.
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    if getattr(BaseSerializer.is_valid, "metrics_timed", False):
+        return
+    BaseSerializer.is_valid = _timed_serializer_call(BaseSerializer.is_valid)
+    BaseSerializer.data = property(_timed_serializer_call(BaseSerializer.data.fget))
+
+
+def record_request(request, response, seconds, query_timer, timings):
+    match = getattr(request, "resolver_match", None)
+    labels = {
+        "view": match.view_name if match else "unresolved",
+        "method": request.method,
+    }
+    observe("althea_http_request_duration_seconds", labels, seconds)
+    observe("althea_http_db_queries", labels, query_timer.count)
+    observe("althea_http_db_duration_seconds", labels, query_timer.seconds)
+    observe(
+        "althea_http_serializer_duration_seconds",
+        labels,
+        timings["serializer_seconds"],
+    )
+    if not response.streaming:
+        observe("althea_http_response_size_bytes", labels, len(response.content))
+    inc("althea_http_requests_total", dict(labels, status=str(response.status_code)))
+    flush()
@@ -0,0 +1,191 @@
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from accounts.api.permissions import IsSuperUser
+from core import memory, tracing
+from core.db import slow_queries
+from core.db.nplusone import detect_nplusone
+from core.db.routers import pin_user_to_primary, replica_aliases
+from core.metrics import QueryTimer, record_request, track_request
+from core.profiling import make_profiler, requested_mode, save_profile
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaPinMiddleware:
+    """
+    After a successful write, pin the user's reads to the primary for
+    REPLICA_PIN_SECONDS so they see their own changes even while the
+    replicas lag behind.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and replica_aliases()
+        ):
+            # DRF sets the token-authenticated user on the request as well
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                pin_user_to_primary(user.pk)
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, database queries and time, serializer time and
+    response size of every request in core.metrics. Place it first so the
+    wall time covers the other middleware too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_timer))
+            timings = stack.enter_context(track_request())
+            response = self.get_response(request)
+        record_request(
+            request, response, time.perf_counter() - start, query_timer, timings
+        )
+        return response
+
+
+def is_superuser_request(request):
+    """
+    Authenticate the request the way the API views do and check IsSuperUser.
+    """
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    try:
+        return IsSuperUser().has_permission(drf_request, None)
+    except APIException:
+        return False
+
+
+class ProfilerMiddleware:
+    """
+    Profile a single request of a superuser who sends the X-Profile header or
+    the profile query parameter (see core.profiling). The response carries
+    the id of the stored profile in the X-Profile-Id header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        if mode is None or not is_superuser_request(request):
+            return self.get_response(request)
+
+        profiler = make_profiler(mode)
+        try:
+            profiler.start()
+        except ValueError:
+            # Another profiler is running in this thread
+            return self.get_response(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        seconds = time.perf_counter() - start
+
+        response["X-Profile-Id"] = save_profile(profiler, request, response, seconds)
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Attribute slow queries to the URL name of the request that ran them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with slow_queries.track_request(request):
+            return self.get_response(request)
+
+
+class NPlusOneMiddleware:
+    """
+    Report the N+1 queries of each request (see core.db.nplusone). Only
+    active with NPLUSONE_DETECTION, meant for development, staging and tests.
+    """
+
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_DETECTION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with detect_nplusone(label=request.path):
+            response = self.get_response(request)
+        return response
+
+
+class MemoryProfilerMiddleware:
+    """
+    Record the traced memory of each request (see core.memory). Only active
+    with MEMORY_PROFILING.
+    """
+
+    def __init__(self, get_response):
+        if not settings.MEMORY_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Not when the middleware is built: with preload_app that happens in
+        # the gunicorn master, which would trace and snapshot forever.
+        memory.start()
+        request_memory = memory.RequestMemory(sample_sites=memory.should_sample_sites())
+        request_memory.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_memory.stop()
+        memory.record_request(request, request_memory)
+        return response
+
+
+class TracingMiddleware:
+    """
+    Run each request in a root span (see core.tracing) and return its trace
+    id in the X-Trace-Id header. Only active with TRACING. Place it first so
+    the root span covers the other middleware too.
+    """
+
+    def __init__(self, get_response):
+        if not settings.TRACING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with tracing.request_span(request) as root:
+            response = self.get_response(request)
+            match = getattr(request, "resolver_match", None)
+            if match is not None:
+                root.name = f"{request.method} {match.view_name}"
+                root.set_attribute("http.route", match.view_name)
+            root.set_attribute("http.status_code", response.status_code)
+        response["X-Trace-Id"] = root.trace_id
+        return response
@@ -1,3 +1,72 @@
-from django.db import models  # noqa
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
 
-# Create your models here.
+
+class OutboxEvent(models.Model):
+    """
+    Domain event appended by signal receivers in the same transaction as the
+    change it describes, to be relayed to downstream systems.
+    """
+
+    topic = models.CharField(max_length=100)
+    aggregate_type = models.CharField(max_length=100)
+    aggregate_id = models.PositiveBigIntegerField()
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.topic} - {self.aggregate_type} {self.aggregate_id}"
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["topic", "id"], name="outbox_topic_idx"),
+        ]
+
+
+class OutboxCursor(models.Model):
+    """
+    High-water mark of a consumer of the outbox: the id of the last event
+    it has delivered.
+    """
+
+    consumer = models.CharField(max_length=50, unique=True)
+    last_event_id = models.PositiveBigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.consumer} @ {self.last_event_id}"
+
+
+class QueuedEmail(models.Model):
+    """
+    Email waiting to be delivered by the send_queued_emails worker, so
+    request handlers never talk to the SMTP server themselves.
+    """
+
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    )
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    content_subtype = models.CharField(max_length=20, default="plain")
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.subject} - {', '.join(self.to)} - {self.status}"
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["status", "id"], name="queued_email_status_idx"),
+        ]
@@ -0,0 +1,125 @@
+"""
+The OpenAPI schema, built once instead of on every request.
+
+drf_yasg introspects every view, serializer and swagger_auto_schema
+declaration to build the schema, which costs hundreds of milliseconds of CPU
+per hit. `manage.py generate_openapi_schema` writes it to OPENAPI_SCHEMA_DIR
+as schema.json and schema.yaml. Each server process loads those files once,
+or generates the documents itself when they are missing, and serves them
+with an ETag and a Cache-Control max-age of OPENAPI_CACHE_MAX_AGE.
+
+The documents are not host specific: clients resolve the paths against the
+host they fetched them from. Regenerate them when the API changes and
+restart the server to pick them up.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from django.conf import settings
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+logger = logging.getLogger(__name__)
+
+API_INFO = openapi.Info(
+    title="Althea API",
+    default_version="v1",
+    description="""credit core / calculator for simple loans,
+                using Python, NumPy, NumPy Financial, Pandas,
+                Django, and Django Rest Framework""",
+    terms_of_service="https://www.google.com/policies/terms/",  # change later
+    contact=openapi.Contact(email="contact@snippets.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+schema_view = get_schema_view(
+    API_INFO,
+    public=True,
+    permission_classes=(
+        permissions.IsAuthenticatedOrReadOnly,
+    ),  # IsAuthenticatedOrReadOnly, AllowAny, IsAdminUser
+)
+
+# URL format suffix: file name, content type and drf_yasg codec
+FORMATS = {
+    ".json": ("schema.json", "application/json", OpenAPICodecJson),
+    ".yaml": ("schema.yaml", "application/yaml", OpenAPICodecYaml),
+}
+
+_lock = threading.Lock()
+_documents = {}
+
+
+def generate_schema():
+    """
+    The schema encoded in every format, {format: bytes}.
+    """
+    generator = schema_view.generator_class(API_INFO)
+    swagger = generator.get_schema(request=None, public=True)
+    return {
+        format: codec(validators=[]).encode(swagger)
+        for format, (_, _, codec) in FORMATS.items()
+    }
+
+
+def schema_path(format):
+    return Path(settings.OPENAPI_SCHEMA_DIR) / FORMATS[format][0]
+
+
+def schema_etag(content):
+    return hashlib.sha256(content).hexdigest()[:32]
+
+
+def write_schema():
+    """
+    Generate the schema into OPENAPI_SCHEMA_DIR. Every file is replaced
+    atomically so that a starting process never reads half of one.
+
+    Returns {format: (path, etag)}.
+    """
+    written = {}
+    for format, content in generate_schema().items():
+        path = schema_path(format)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.{os.getpid()}")
+        partial.write_bytes(content)
+        os.replace(partial, path)
+        written[format] = (path, schema_etag(content))
+    return written
+
+
+def load_schema():
+    """
+    The schema served by this process, {format: (bytes, etag)}: the files
+    of OPENAPI_SCHEMA_DIR, read once, or generated on the first call when
+    they are missing.
+    """
+    with _lock:
+        if not _documents:
+            try:
+                documents = {format: schema_path(format).read_bytes() for format in FORMATS}
+            except FileNotFoundError:
+                logger.warning(
+                    "No prebuilt OpenAPI schema in %s, generating it. "
+                    "Run `manage.py generate_openapi_schema` at build time.",
+                    settings.OPENAPI_SCHEMA_DIR,
+                )
+                documents = generate_schema()
+            _documents.update(
+                (format, (content, schema_etag(content)))
+                for format, content in documents.items()
+            )
+        return dict(_documents)
+
+
+def reset_schema():
+    """
+    Forget the loaded schema, so that the next request loads it again.
+    """
+    with _lock:
+        _documents.clear()
@@ -0,0 +1,184 @@
+"""
+Transactional outbox.
+
+Signal receivers call emit_event() inside the transaction that performs the
+change, so an event exists if and only if the change was committed. Consumers
+(the relay command, background workers) read events in id order past their own
+high-water mark stored in OutboxCursor, and only advance it after the batch has
+been handled, which gives at-least-once delivery.
+"""
+
+import json
+import urllib.request
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from core.models import OutboxEvent, OutboxCursor
+from core.tracing import traced
+
+
+def build_event(topic, instance, payload):
+    """
+    Build an unsaved event about a model instance, for callers that
+    emit events in bulk with OutboxEvent.objects.bulk_create().
+    """
+    return OutboxEvent(
+        topic=topic,
+        aggregate_type=instance._meta.label_lower,
+        aggregate_id=instance.pk,
+        payload=payload,
+    )
+
+
+@traced()
+def emit_event(topic, instance, payload):
+    """
+    Append an event about a model instance to the outbox.
+    """
+    event = build_event(topic, instance, payload)
+    event.save()
+    return event
+
+
+def serialize_event(event):
+    return {
+        "id": event.id,
+        "topic": event.topic,
+        "aggregate_type": event.aggregate_type,
+        "aggregate_id": event.aggregate_id,
+        "payload": event.payload,
+        "created": event.created,
+    }
+
+
+class FileSink:
+    """
+    Appends events as JSON lines to a local file.
+    """
+
+    def __init__(self, target=None):
+        self.path = target or settings.OUTBOX_FILE_PATH
+
+    def send(self, events):
+        with open(self.path, "a", encoding="utf-8") as outfile:
+            for event in events:
+                outfile.write(json.dumps(serialize_event(event), cls=DjangoJSONEncoder))
+                outfile.write("\n")
+
+
+class HttpSink:
+    """
+    POSTs each batch as a JSON array; any non-2xx response fails the batch.
+    """
+
+    def __init__(self, target=None, timeout=10):
+        self.url = target or settings.OUTBOX_HTTP_URL
+        self.timeout = timeout
+
+    def send(self, events):
+        body = json.dumps(
+            [serialize_event(event) for event in events], cls=DjangoJSONEncoder
+        ).encode("utf-8")
+        request = urllib.request.Request(
+            self.url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        # urlopen raises HTTPError for non-2xx responses
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class StubSink:
+    """
+    Keeps delivered events in memory; for local runs and tests.
+    """
+
+    delivered = []
+
+    def __init__(self, target=None):
+        pass
+
+    def send(self, events):
+        StubSink.delivered.extend(serialize_event(event) for event in events)
+
+
+SINKS = {
+    "file": FileSink,
+    "http": HttpSink,
+    "stub": StubSink,
+}
+
+
+def get_sink(name, target=None):
+    """
+    Instantiate a sink by short name or dotted path to a class with send(events).
+    """
+    sink_class = SINKS.get(name) or import_string(name)
+    return sink_class(target)
+
+
+def pending_events(consumer, batch_size, topics=None, settle_seconds=0):
+    """
+    Lock the consumer's cursor and return it with the next batch of events.
+    Must be called inside a transaction.
+
+    Ids are allocated before commit, so a transaction that commits late can
+    publish an id below the cursor. Events younger than settle_seconds are
+    held back to leave such transactions time to commit.
+    """
+    OutboxCursor.objects.get_or_create(consumer=consumer)
+    cursor = OutboxCursor.objects.select_for_update().get(consumer=consumer)
+
+    events = OutboxEvent.objects.filter(id__gt=cursor.last_event_id)
+    if topics:
+        events = events.filter(topic__in=topics)
+    if settle_seconds:
+        events = events.filter(
+            created__lte=timezone.now() - timedelta(seconds=settle_seconds)
+        )
+    return cursor, list(events.order_by("id")[:batch_size])
+
+
+def advance_cursor(cursor, events):
+    cursor.last_event_id = events[-1].id
+    cursor.save(update_fields=["last_event_id", "updated"])
+
+
+def relay_batch(sink, consumer="relay", batch_size=1000, settle_seconds=0):
+    """
+    Deliver the next batch of events to a sink and advance the consumer's
+    high-water mark. Returns the number of events delivered.
+
+    If the sink raises, the transaction rolls back and the same batch is
+    delivered again on the next call.
+    """
+    with transaction.atomic():
+        cursor, events = pending_events(
+            consumer, batch_size, settle_seconds=settle_seconds
+        )
+        if not events:
+            return 0
+        sink.send(events)
+        advance_cursor(cursor, events)
+    return len(events)
+
+
+def prune_delivered_events(older_than_days=7):
+    """
+    Delete events every consumer has delivered and that are older than
+    older_than_days. Returns the number of deleted events.
+    """
+    low_water_mark = OutboxCursor.objects.aggregate(low=Min("last_event_id"))["low"]
+    if not low_water_mark:
+        return 0
+    deleted, _ = OutboxEvent.objects.filter(
+        id__lte=low_water_mark,
+        created__lt=timezone.now() - timedelta(days=older_than_days),
+    ).delete()
+    return deleted
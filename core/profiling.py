@@ -0,0 +1,262 @@
+"""
+On-demand request profiling.
+
+ProfilerMiddleware runs a single request of a superuser under one of the
+profilers below when asked to with the X-Profile header or the profile
+query parameter:
+
+- "cprofile" (or any other true value): deterministic cProfile. Stores the
+  pstats dump and collapsed stacks approximated from the call graph, with
+  microseconds as weights.
+- "sample": samples the request thread's stack every
+  PROFILER_SAMPLE_INTERVAL seconds. Stores exact collapsed stacks, with
+  sample counts as weights. It has far less overhead on hot loops.
+
+Collapsed stacks ("root;caller;callee weight" per line) feed flamegraph.pl,
+speedscope or inferno directly.
+
+Profiles are kept in PROFILER_DIR as <id>.json (metadata) plus one file per
+format. It is a ring buffer: once more than PROFILER_MAX_PROFILES are stored,
+the oldest are removed.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from django.conf import settings
+from django.utils import timezone
+
+PROFILE_ID_RE = re.compile(r"^[0-9]{20}-[0-9a-f]{8}$")
+FORMATS = {"pstats": ".pstats", "collapsed": ".collapsed"}
+FALSE_VALUES = ("0", "false", "no", "off")
+
+# Deepest stack followed when collapsing the cProfile call graph
+MAX_STACK_DEPTH = 200
+
+
+def requested_mode(request):
+    """
+    "cprofile", "sample" or None when the request does not ask for a profile.
+    """
+    value = request.headers.get("X-Profile", request.GET.get("profile"))
+    if value is None or value.lower() in FALSE_VALUES:
+        return None
+    return "sample" if value.lower() == "sample" else "cprofile"
+
+
+def _short_filename(filename):
+    if "site-packages" in filename:
+        return filename.split("site-packages" + os.sep, 1)[-1]
+    base_dir = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base_dir):
+        return filename[len(base_dir):]
+    return filename
+
+
+def _label(filename, lineno, name):
+    # cProfile reports builtins with "~" as file name
+    label = name if filename == "~" else f"{name} ({_short_filename(filename)}:{lineno})"
+    # ";" separates frames in the collapsed format
+    return label.replace(";", ":")
+
+
+def _format_collapsed(weights):
+    return "".join(
+        f"{stack} {weight}\n" for stack, weight in sorted(weights.items()) if weight > 0
+    )
+
+
+class CProfiler:
+    mode = "cprofile"
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        # Raises ValueError if another profiler is already active
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def collapsed(self):
+        """
+        Collapsed stacks approximated from cProfile's caller/callee totals.
+
+        cProfile does not keep whole stacks, so the time of a function called
+        from several places is split between them in proportion to the time
+        each caller spent in it, as flameprof does.
+        """
+        stats = pstats.Stats(self.profile).stats
+        callees = defaultdict(dict)
+        for func, (_, _, _, _, callers) in stats.items():
+            for caller, (_, _, _, cumulative) in callers.items():
+                callees[caller][func] = cumulative
+
+        weights = Counter()
+
+        def walk(func, stack, seen, budget):
+            _, _, own, cumulative, _ = stats[func]
+            if cumulative <= 0 or len(stack) >= MAX_STACK_DEPTH:
+                return
+            scale = min(budget / cumulative, 1.0)
+            stack = stack + [_label(*func)]
+            weights[";".join(stack)] += round(own * scale * 1e6)
+            for callee, edge in callees[func].items():
+                # Skip recursion and branches under a microsecond
+                if callee not in seen and edge * scale >= 1e-6:
+                    walk(callee, stack, seen | {callee}, edge * scale)
+
+        # Roots were called from outside the profile: cProfile records no
+        # caller for those calls, e.g. the middleware wrapper that is called
+        # again further down the middleware chain.
+        for func, (_, calls, _, cumulative, callers) in stats.items():
+            if sum(edge[1] for edge in callers.values()) < calls:
+                walk(func, [], {func}, cumulative)
+        return _format_collapsed(weights)
+
+    def write(self, path_prefix):
+        self.profile.dump_stats(f"{path_prefix}.pstats")
+        Path(f"{path_prefix}.collapsed").write_text(self.collapsed())
+
+
+class SamplingProfiler:
+    mode = "sample"
+
+    def __init__(self, interval=None):
+        self.interval = interval or settings.PROFILER_SAMPLE_INTERVAL
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        # Leave out the frames of the server and of the code starting us
+        self.base_depth = 0
+        frame = sys._getframe(1)
+        while frame is not None:
+            self.base_depth += 1
+            frame = frame.f_back
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(_label(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            stack.reverse()
+            if len(stack) > self.base_depth:
+                self.samples[";".join(stack[self.base_depth:])] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return _format_collapsed(self.samples)
+
+    def write(self, path_prefix):
+        Path(f"{path_prefix}.collapsed").write_text(self.collapsed())
+
+
+def make_profiler(mode):
+    return SamplingProfiler() if mode == "sample" else CProfiler()
+
+
+def _profile_dir():
+    directory = Path(settings.PROFILER_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def save_profile(profiler, request, response, seconds):
+    """
+    Store the profile of a request and return its id.
+    """
+    created = timezone.now()
+    # The timestamp prefix keeps ids in chronological order
+    profile_id = f"{created.strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+    directory = _profile_dir()
+    profiler.write(directory / profile_id)
+
+    match = getattr(request, "resolver_match", None)
+    user = getattr(request, "user", None)
+    metadata = {
+        "id": profile_id,
+        "mode": profiler.mode,
+        "method": request.method,
+        "path": request.get_full_path(),
+        "view": match.view_name if match else None,
+        "status": response.status_code,
+        "duration_ms": round(seconds * 1000, 1),
+        "user_id": user.pk if user is not None else None,
+        "created": created.isoformat(),
+        "formats": [
+            name
+            for name, suffix in FORMATS.items()
+            if (directory / f"{profile_id}{suffix}").exists()
+        ],
+    }
+    # Written last: a profile is listed only once all its files exist
+    (directory / f"{profile_id}.json").write_text(json.dumps(metadata))
+    prune_profiles()
+    return profile_id
+
+
+def _profile_ids():
+    directory = Path(settings.PROFILER_DIR)
+    if not directory.is_dir():
+        return []
+    return sorted(
+        path.stem for path in directory.glob("*.json") if PROFILE_ID_RE.match(path.stem)
+    )
+
+
+def prune_profiles():
+    """
+    Remove the oldest profiles beyond PROFILER_MAX_PROFILES.
+    """
+    directory = Path(settings.PROFILER_DIR)
+    ids = _profile_ids()
+    for profile_id in ids[: max(len(ids) - settings.PROFILER_MAX_PROFILES, 0)]:
+        for suffix in (".json", *FORMATS.values()):
+            # Another process may be pruning the same profile
+            (directory / f"{profile_id}{suffix}").unlink(missing_ok=True)
+
+
+def list_profiles():
+    """
+    Metadata of the stored profiles, newest first.
+    """
+    directory = Path(settings.PROFILER_DIR)
+    profiles = []
+    for profile_id in reversed(_profile_ids()):
+        try:
+            profiles.append(json.loads((directory / f"{profile_id}.json").read_text()))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id, kind):
+    """
+    Path of a stored profile file. Raises FileNotFoundError for unknown ids
+    and formats.
+    """
+    if kind not in FORMATS or not PROFILE_ID_RE.match(profile_id):
+        raise FileNotFoundError(profile_id)
+    path = Path(settings.PROFILER_DIR) / f"{profile_id}{FORMATS[kind]}"
+    if not path.is_file():
+        raise FileNotFoundError(profile_id)
+    return path
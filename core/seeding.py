@@ -0,0 +1,608 @@
+"""
+Synthetic portfolio generator, to reproduce production volumes locally.
+
+seed_portfolio() creates users, their credit requests and credit lines, the
+sublines drawn on those lines, adjustments of all four kinds (with their
+ledger entries), loan terms for the active sublines and the payment schedule
+of the approved loan terms.
+
+Users are split into batches of batch_size, each generated and written in
+one transaction by one of the worker processes. Rows are written with
+batched bulk_create() or, on PostgreSQL, with COPY into primary keys reserved
+from the table sequences, which is several times faster. Saves, signals and
+model validation are bypassed, so the generator keeps the materialized
+amounts of the credit lines and the ledger consistent itself.
+
+Every batch draws from its own random generator seeded with the run seed and
+the batch number, so a run is reproducible whatever the number of workers.
+"""
+
+import io
+import math
+import multiprocessing
+import random
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.db.models import DateTimeField
+from django.utils import timezone
+from credit_line.models import CreditLine, CreditLineAdjustment
+from credit_origination.models import CreditRequest, CreditType
+from credit_subline.ledger import build_ledger_entry
+from credit_subline.models import (
+    AdjustmentLedgerEntry,
+    CreditAmountAdjustment,
+    CreditSubline,
+    CreditSublineStatusAdjustment,
+    InterestRateAdjustment,
+)
+from loan_management.models import LoanTerm, PeriodicPayment
+
+User = get_user_model()
+
+DEFAULT_OPTIONS = {
+    "users": 1000,
+    # The first lines users get a credit line, the others a pending or
+    # rejected credit request
+    "lines": None,
+    "sublines_per_line": 2.0,
+    "adjustments_per_line": 0.5,
+    "adjustments_per_subline": 1.0,
+    # Share of the approved decisions: credit lines, adjustments, loan terms
+    "approve_ratio": 0.7,
+    # Credit limits are log-normal around the median
+    "limit_median": 50000,
+    "limit_sigma": 0.75,
+    "interest_rate_min": 0.08,
+    "interest_rate_max": 0.45,
+    "batch_size": 2000,
+    "workers": 1,
+    "method": "auto",
+    "seed": 0,
+}
+
+MAX_CREDIT_LIMIT = Decimal("5000000.00")
+CENT = Decimal("0.01")
+
+CREDIT_TYPES = ("Personal", "Revolving", "Working Capital", "Equipment")
+FIRST_NAMES = (
+    "Ana Carlos Diego Elena Fernanda Jorge Lucia Luis Maria Miguel Paola Ricardo "
+    "Sofia Valeria"
+).split()
+LAST_NAMES = (
+    "Castillo Cruz Flores Garcia Gomez Hernandez Lopez Martinez Morales Perez "
+    "Ramirez Reyes Sanchez Torres"
+).split()
+REASONS = (
+    "Annual review",
+    "Customer request",
+    "Updated income verification",
+    "Risk reassessment",
+    "Collateral update",
+)
+
+# Repayment frequency: (weight, term lengths in periods, days or months apart)
+FREQUENCIES = {
+    "monthly": (0.6, (6, 12, 24, 36, 48, 60), ("months", 1)),
+    "biweekly": (0.2, (12, 26, 52, 78), ("days", 14)),
+    "bimonthly": (0.1, (6, 12, 18), ("months", 2)),
+    "quarterly": (0.1, (4, 8, 12, 20), ("months", 3)),
+}
+PERIODS_PER_YEAR = {"monthly": 12, "biweekly": 26, "bimonthly": 6, "quarterly": 4}
+
+SEEDED_MODELS = (
+    User,
+    CreditRequest,
+    CreditLine,
+    CreditLineAdjustment,
+    CreditSubline,
+    CreditAmountAdjustment,
+    InterestRateAdjustment,
+    CreditSublineStatusAdjustment,
+    AdjustmentLedgerEntry,
+    LoanTerm,
+    PeriodicPayment,
+)
+
+
+def parse_count(value):
+    """
+    Row count given as an integer or in scientific notation, e.g. "1e6".
+    """
+    count = float(value)
+    if count < 0 or count != int(count):
+        raise ValueError(f"Not a row count: {value}")
+    return int(count)
+
+
+def poisson(rng, mean):
+    """
+    Poisson distributed count (Knuth's method, fine for small means).
+    """
+    if mean <= 0:
+        return 0
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def money(value):
+    return Decimal(value).quantize(CENT)
+
+
+def add_months(day, months, due_day=None):
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last_day = (next_month - timedelta(days=1)).day
+    return date(year, month, min(due_day or day.day, last_day))
+
+
+def rollback_weekend(day):
+    # The holiday calendar of finance_utils is too slow for millions of rows
+    return day - timedelta(days=max(day.weekday() - 4, 0))
+
+
+def _approved(rng, options, approved=("approved",), other=("pending",)):
+    return rng.choice(approved if rng.random() < options["approve_ratio"] else other)
+
+
+def _random_date(rng, start, end):
+    return start + timedelta(days=rng.randrange(max((end - start).days, 1)))
+
+
+class BulkWriter:
+    """
+    Writes rows with batched bulk_create(), which sets their primary keys.
+    """
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+
+    def write(self, model, objs):
+        model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+
+class CopyWriter:
+    """
+    Writes rows with PostgreSQL's COPY, after setting their primary keys from
+    the table sequence.
+    """
+
+    def __init__(self):
+        self.now = timezone.now()
+
+    def _reserve_ids(self, cursor, model, count):
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [model._meta.db_table, model._meta.pk.column, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def _value(self, field, obj):
+        if isinstance(field, DateTimeField) and (field.auto_now or field.auto_now_add):
+            value = self.now
+        else:
+            value = getattr(obj, field.attname)
+        if value is None:
+            return "\\N"
+        if isinstance(value, bool):
+            return "t" if value else "f"
+        if isinstance(value, Decimal):
+            return format(value, "f")
+        if isinstance(value, (date, int, float)):
+            return str(value)
+        return (
+            str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+
+    def write(self, model, objs):
+        if not objs:
+            return
+        fields = model._meta.concrete_fields
+        with connection.cursor() as cursor:
+            for obj, pk in zip(objs, self._reserve_ids(cursor, model, len(objs))):
+                # Copies the primary keys of related objects written earlier
+                obj._prepare_related_fields_for_save(operation_name="bulk_create")
+                obj.pk = pk
+                obj._state.adding = False
+                obj._state.db = connection.alias
+            buffer = io.StringIO()
+            for obj in objs:
+                buffer.write("\t".join(self._value(field, obj) for field in fields))
+                buffer.write("\n")
+            buffer.seek(0)
+            columns = ", ".join(
+                connection.ops.quote_name(field.column) for field in fields
+            )
+            cursor.copy_expert(
+                f"COPY {connection.ops.quote_name(model._meta.db_table)} "
+                f"({columns}) FROM STDIN",
+                buffer,
+            )
+
+
+def make_writer(options):
+    if options["method"] == "copy":
+        return CopyWriter()
+    return BulkWriter(options["batch_size"])
+
+
+def build_users(rng, options, start, count):
+    run = options["run"]
+    return [
+        User(
+            username=f"seed-{run}-{index}",
+            email=f"seed-{run}-{index}@example.com",
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            second_last_name=rng.choice(LAST_NAMES),
+            phone_number=f"55{rng.randrange(10**8):08d}",
+            password=options["password"],
+            is_active=True,
+        )
+        for index in range(start, start + count)
+    ]
+
+
+def build_credit_line(rng, options, user, credit_type, today):
+    limit = rng.lognormvariate(math.log(options["limit_median"]), options["limit_sigma"])
+    credit_limit = min(money(max(limit, 1000)), MAX_CREDIT_LIMIT)
+    start_date = _random_date(rng, today - timedelta(days=3 * 365), today)
+    credit_request = CreditRequest(
+        user=user,
+        credit_type=credit_type,
+        amount=credit_limit,
+        term=rng.choice((12, 24, 36, 48, 60)),
+        status="approved",
+    )
+    credit_line = CreditLine(
+        user=user,
+        credit_limit=credit_limit,
+        currency="mxn",
+        start_date=start_date,
+        end_date=start_date + timedelta(days=365 * rng.randint(1, 5)),
+        status=_approved(rng, options, other=("pending", "rejected")),
+        committed_amount=Decimal("0"),
+        available_amount=credit_limit,
+    )
+    return credit_request, credit_line
+
+
+def build_sublines(rng, options, credit_line, credit_types):
+    count = poisson(rng, options["sublines_per_line"])
+    if not count:
+        return []
+    # Split part of the credit limit between the sublines
+    drawn = credit_line.credit_limit * Decimal(rng.uniform(0.2, 0.9))
+    weights = [rng.random() + 0.1 for _ in range(count)]
+    sublines = []
+    for weight in weights:
+        amount = max(money(drawn * Decimal(weight / sum(weights))), CENT)
+        if credit_line.status == "approved":
+            status = rng.choices(("active", "pending", "inactive"), (7, 2, 1))[0]
+        else:
+            status = "pending"
+        disbursed = amount if status == "active" else Decimal("0")
+        sublines.append(
+            CreditSubline(
+                credit_line=credit_line,
+                subline_type=rng.choice(credit_types),
+                subline_amount=amount,
+                amount_disbursed=disbursed,
+                outstanding_balance=money(disbursed * Decimal(rng.random())),
+                interest_rate=Decimal(
+                    rng.uniform(options["interest_rate_min"], options["interest_rate_max"])
+                ).quantize(Decimal("0.001")),
+                status=status,
+            )
+        )
+    committed = sum(subline.subline_amount for subline in sublines)
+    credit_line.committed_amount = committed
+    credit_line.available_amount = credit_line.credit_limit - committed
+    return sublines
+
+
+def _adjustment_status(rng, options):
+    return _approved(
+        rng,
+        options,
+        approved=("approved", "implemented"),
+        other=("pending_review", "rejected"),
+    )
+
+
+def build_line_adjustments(rng, options, credit_line, today):
+    adjustments = []
+    for _ in range(poisson(rng, options["adjustments_per_line"])):
+        new_limit = min(
+            money(credit_line.credit_limit * Decimal(rng.uniform(0.8, 1.5))),
+            MAX_CREDIT_LIMIT,
+        )
+        adjustments.append(
+            CreditLineAdjustment(
+                credit_line=credit_line,
+                previous_credit_limit=credit_line.credit_limit,
+                new_credit_limit=new_limit,
+                previous_end_date=credit_line.end_date,
+                new_end_date=credit_line.end_date + timedelta(days=365),
+                previous_status=credit_line.status,
+                new_status=credit_line.status,
+                previous_currency=credit_line.currency,
+                new_currency=credit_line.currency,
+                adjustment_date=_random_date(rng, credit_line.start_date, today),
+                adjustment_status=_adjustment_status(rng, options),
+                reason=rng.choice(REASONS),
+            )
+        )
+    return adjustments
+
+
+def build_subline_adjustments(rng, options, subline, start_date, today):
+    """
+    {ledger kind: [adjustments]} of a subline, the kind of each one drawn at
+    random.
+    """
+    adjustments = {"amount": [], "interest_rate": [], "status": []}
+    for _ in range(poisson(rng, options["adjustments_per_subline"])):
+        kind = rng.choice(tuple(adjustments))
+        common = {
+            "credit_subline": subline,
+            "effective_date": _random_date(rng, start_date, today),
+            "reason_for_adjustment": rng.choice(REASONS),
+            "adjustment_status": _adjustment_status(rng, options),
+        }
+        if kind == "amount":
+            adjustment = CreditAmountAdjustment(
+                initial_amount=subline.subline_amount,
+                adjusted_amount=money(subline.subline_amount * Decimal(rng.uniform(0.5, 1.2))),
+                **common,
+            )
+        elif kind == "interest_rate":
+            adjustment = InterestRateAdjustment(
+                # Adjustment rates are percentages, see interest_rate_by_100
+                initial_interest_rate=subline.interest_rate * 100,
+                adjusted_interest_rate=Decimal(rng.uniform(5, 50)).quantize(
+                    Decimal("0.001")
+                ),
+                **common,
+            )
+        else:
+            adjustment = CreditSublineStatusAdjustment(
+                initial_status=subline.status,
+                adjusted_status=rng.choice(
+                    [status for status, _ in CreditSubline.SUBLINE_STATUS]
+                ),
+                **common,
+            )
+        adjustments[kind].append(adjustment)
+    return adjustments
+
+
+def build_loan_term(rng, options, subline, start_date, today):
+    frequencies = list(FREQUENCIES)
+    frequency = rng.choices(frequencies, [FREQUENCIES[name][0] for name in frequencies])[0]
+    return LoanTerm(
+        credit_subline=subline,
+        term_length=rng.choice(FREQUENCIES[frequency][1]),
+        repayment_frequency=frequency,
+        payment_due_day=rng.randint(1, 28),
+        status=_approved(rng, options, other=("pending", "rejected")),
+        start_date=_random_date(rng, start_date, today),
+    )
+
+
+def build_payments(rng, loan_term, amount, annual_rate, today):
+    """
+    Level payment schedule of a loan term, paid up to today.
+    """
+    rate = float(annual_rate) / PERIODS_PER_YEAR[loan_term.repayment_frequency]
+    periods = loan_term.term_length
+    balance = float(amount)
+    if rate:
+        installment = balance * rate / (1 - (1 + rate) ** -periods)
+    else:
+        installment = balance / periods
+    unit, step = FREQUENCIES[loan_term.repayment_frequency][2]
+
+    payments = []
+    for period in range(1, periods + 1):
+        if unit == "days":
+            due_date = loan_term.start_date + timedelta(days=step * period)
+        else:
+            due_date = add_months(
+                loan_term.start_date, step * period, loan_term.payment_due_day
+            )
+        due_date = rollback_weekend(due_date)
+        interest = balance * rate
+        principal = min(installment - interest, balance)
+        balance -= principal
+        if due_date >= today:
+            status, paid_on = "pending", None
+        elif rng.random() < 0.9:
+            status, paid_on = "completed", due_date + timedelta(days=rng.randint(-3, 2))
+        else:
+            status, paid_on = "delayed", None
+        payments.append(
+            PeriodicPayment(
+                loan_term=loan_term,
+                due_date=due_date,
+                amount_due=money(principal + interest),
+                principal_component=money(principal),
+                interest_component=money(interest),
+                payment_status=status,
+                actual_payment_date=paid_on,
+            )
+        )
+    return payments
+
+
+def seed_batch(batch, start, count, options):
+    """
+    Generate and write the rows of count users, the first being number start.
+    Returns the number of rows written per model label.
+    """
+    rng = random.Random(f"{options['seed']}-{batch}")
+    writer = make_writer(options)
+    today = timezone.now().date()
+    credit_types = list(CreditType.objects.filter(pk__in=options["credit_type_ids"]))
+    rows = Counter()
+
+    def write(model, objs):
+        writer.write(model, objs)
+        rows[model._meta.label] += len(objs)
+
+    with transaction.atomic():
+        users = build_users(rng, options, start, count)
+        write(User, users)
+
+        credit_requests, credit_lines = [], []
+        for index, user in zip(range(start, start + count), users):
+            credit_type = rng.choice(credit_types)
+            if index < options["lines"]:
+                credit_request, credit_line = build_credit_line(
+                    rng, options, user, credit_type, today
+                )
+                credit_lines.append(credit_line)
+            else:
+                credit_request = CreditRequest(
+                    user=user,
+                    credit_type=credit_type,
+                    amount=min(
+                        money(rng.lognormvariate(math.log(options["limit_median"]), 1)),
+                        MAX_CREDIT_LIMIT,
+                    ),
+                    term=rng.choice((12, 24, 36, 48, 60)),
+                    status=rng.choice(("pending", "rejected")),
+                )
+            credit_requests.append(credit_request)
+
+        # Built before the lines are written: they set their committed amounts
+        sublines = [
+            (credit_line, build_sublines(rng, options, credit_line, credit_types))
+            for credit_line in credit_lines
+        ]
+        write(CreditRequest, credit_requests)
+        write(CreditLine, credit_lines)
+        write(CreditSubline, [subline for _, group in sublines for subline in group])
+
+        line_adjustments = []
+        subline_adjustments = {"amount": [], "interest_rate": [], "status": []}
+        loan_terms = []
+        for credit_line, group in sublines:
+            line_adjustments += build_line_adjustments(rng, options, credit_line, today)
+            for subline in group:
+                for kind, adjustments in build_subline_adjustments(
+                    rng, options, subline, credit_line.start_date, today
+                ).items():
+                    subline_adjustments[kind] += adjustments
+                if subline.status == "active":
+                    loan_terms.append(
+                        build_loan_term(rng, options, subline, credit_line.start_date, today)
+                    )
+
+        write(CreditLineAdjustment, line_adjustments)
+        write(CreditAmountAdjustment, subline_adjustments["amount"])
+        write(InterestRateAdjustment, subline_adjustments["interest_rate"])
+        write(CreditSublineStatusAdjustment, subline_adjustments["status"])
+        ledger = [build_ledger_entry("credit_line", adjustment) for adjustment in line_adjustments]
+        for kind, adjustments in subline_adjustments.items():
+            ledger += [build_ledger_entry(kind, adjustment) for adjustment in adjustments]
+        write(AdjustmentLedgerEntry, ledger)
+
+        write(LoanTerm, loan_terms)
+        payments = []
+        for loan_term in loan_terms:
+            if loan_term.status == "approved":
+                subline = loan_term.credit_subline
+                payments += build_payments(
+                    rng, loan_term, subline.subline_amount, subline.interest_rate, today
+                )
+        write(PeriodicPayment, payments)
+
+    return rows
+
+
+def _seed_task(task):
+    return seed_batch(*task)
+
+
+def _init_worker():
+    # Needed with the spawn start method; a no-op on forked workers
+    django.setup()
+
+
+def resolve_options(**overrides):
+    """
+    DEFAULT_OPTIONS updated with the given ones, plus what every batch
+    needs: the write method, a run tag keeping usernames unique across runs,
+    the shared password hash and the credit types.
+    """
+    options = {**DEFAULT_OPTIONS, **overrides}
+    if options["lines"] is None or options["lines"] > options["users"]:
+        options["lines"] = options["users"]
+    if options["method"] == "auto":
+        options["method"] = "copy" if connection.vendor == "postgresql" else "bulk"
+    if options["method"] == "copy" and connection.vendor != "postgresql":
+        raise ValueError("COPY is only available on PostgreSQL.")
+    if connection.vendor == "sqlite":
+        # SQLite has a single writer: more workers only wait for its lock
+        options["workers"] = 1
+
+    options["run"] = f"{options['seed']}{random.Random().getrandbits(24):06x}"
+    # Hashing a password per user would take longer than the whole load
+    options["password"] = make_password(f"seed-{options['run']}")
+    if not CreditType.objects.filter(active=True).exists():
+        CreditType.objects.bulk_create(
+            [CreditType(name=name, active=True) for name in CREDIT_TYPES]
+        )
+    options["credit_type_ids"] = list(
+        CreditType.objects.filter(active=True).values_list("pk", flat=True)
+    )
+    return options
+
+
+def seed_portfolio(progress=None, **overrides):
+    """
+    Generate a portfolio (see DEFAULT_OPTIONS) and return the number of rows
+    written per model label. progress is called with the running totals
+    after every batch.
+    """
+    options = resolve_options(**overrides)
+    batch_size = options["batch_size"]
+    tasks = [
+        (batch, start, min(batch_size, options["users"] - start), options)
+        for batch, start in enumerate(range(0, options["users"], batch_size))
+    ]
+
+    rows = Counter()
+    if options["workers"] > 1 and len(tasks) > 1:
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with multiprocessing.Pool(options["workers"], initializer=_init_worker) as pool:
+            for batch_rows in pool.imap_unordered(_seed_task, tasks):
+                rows.update(batch_rows)
+                if progress:
+                    progress(rows)
+    else:
+        for task in tasks:
+            rows.update(_seed_task(task))
+            if progress:
+                progress(rows)
+
+    if connection.vendor == "postgresql":
+        # Fresh planner statistics, so that queries are measured at scale
+        with connection.cursor() as cursor:
+            for model in SEEDED_MODELS:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+    return rows
@@ -0,0 +1,132 @@
+"""
+Test the namespaced cache helpers.
+"""
+
+import time
+from unittest.mock import patch
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from core.cache import (
+    get_or_set,
+    invalidate,
+    make_key,
+    cache_stats,
+    reset_cache_stats,
+)
+from core.metrics import render_metrics, reset_metrics
+
+
+class CacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {"value": self.calls}
+
+    def test_value_is_computed_once(self):
+        self.assertEqual(get_or_set("things", [1], self.compute), {"value": 1})
+        self.assertEqual(get_or_set("things", [1], self.compute), {"value": 1})
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cache_stats()["things"]["hits"], 1)
+        self.assertEqual(cache_stats()["things"]["misses"], 1)
+
+    @override_settings(METRICS_MULTIPROC_DIR="")
+    def test_lookups_are_exported_as_metrics(self):
+        get_or_set("credit_line:1", [1], self.compute)
+        get_or_set("credit_line:2", [1], self.compute)
+        get_or_set("credit_line:1", [1], self.compute)
+
+        output = render_metrics()
+        name = "althea_cache_requests_total"
+        self.assertIn(f"# TYPE {name} counter", output)
+        self.assertIn(f'{name}{{namespace="credit_line",result="misses"}} 2', output)
+        self.assertIn(f'{name}{{namespace="credit_line",result="hits"}} 1', output)
+
+    def test_keys_are_namespaced(self):
+        get_or_set("things", [1], self.compute)
+        get_or_set("others", [1], self.compute)
+        get_or_set("things", [2], self.compute)
+        self.assertEqual(self.calls, 3)
+        self.assertNotEqual(make_key("things", 1), make_key("others", 1))
+
+    def test_invalidate_drops_the_whole_namespace(self):
+        get_or_set("things", [1], self.compute)
+        get_or_set("things", [2], self.compute)
+        get_or_set("others", [1], self.compute)
+
+        invalidate("things")
+
+        get_or_set("things", [1], self.compute)
+        get_or_set("things", [2], self.compute)
+        get_or_set("others", [1], self.compute)
+        self.assertEqual(self.calls, 5)
+
+    def test_invalidate_survives_evicted_version(self):
+        get_or_set("things", [1], self.compute)
+        cache.delete("ns:things")
+        invalidate("things")
+        self.assertEqual(get_or_set("things", [1], self.compute), {"value": 2})
+
+    def test_invalidate_in_transaction_bumps_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                invalidate("things")
+                # Cached from the pre-commit state by a concurrent request
+                get_or_set("things", [1], self.compute)
+        self.assertEqual(get_or_set("things", [1], self.compute), {"value": 2})
+
+    def test_stale_value_served_while_refresh_is_locked(self):
+        get_or_set("things", [1], self.compute, timeout=60)
+        with patch("core.cache.time.time", return_value=time.time() + 90):
+            # Another caller holds the refresh lock
+            cache.add(f"lock:{make_key('things', 1)}", 1)
+            self.assertEqual(
+                get_or_set("things", [1], self.compute, timeout=60), {"value": 1}
+            )
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cache_stats()["things"]["stale_hits"], 1)
+
+    def test_stale_value_is_refreshed(self):
+        get_or_set("things", [1], self.compute, timeout=60)
+        with patch("core.cache.time.time", return_value=time.time() + 90):
+            self.assertEqual(
+                get_or_set("things", [1], self.compute, timeout=60), {"value": 2}
+            )
+
+    @patch("core.cache.LOCK_WAIT", 0.1)
+    def test_miss_waits_for_lock_holder(self):
+        key = make_key("things", 1)
+        cache.add(f"lock:{key}", 1)
+        original_get = cache.get
+        lookups = []
+
+        def get(k, *args, **kwargs):
+            if k == key:
+                lookups.append(k)
+                # The lock holder stores the value after our first lookup
+                if len(lookups) == 2:
+                    cache.set(key, ({"value": "winner"}, time.time() + 60))
+            return original_get(k, *args, **kwargs)
+
+        with patch.object(cache, "get", side_effect=get):
+            value = get_or_set("things", [1], self.compute)
+        self.assertEqual(value, {"value": "winner"})
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(cache_stats()["things"]["waits"], 1)
+
+    def test_shared_only_values_are_not_cached_per_process(self):
+        get_or_set("things", [1], self.compute, shared_only=True)
+        get_or_set("things", [1], self.compute, shared_only=True)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(cache_stats(), {})
+
+    def test_stats_grouped_by_namespace_family(self):
+        get_or_set("credit_line:1", [1], self.compute)
+        get_or_set("credit_line:2", [1], self.compute)
+        self.assertEqual(cache_stats()["credit_line"]["misses"], 2)
@@ -0,0 +1,64 @@
+"""
+Test the connection acquisition metrics.
+"""
+
+import os
+import tempfile
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+from core.db.metrics import (
+    ConnectionMetricsMixin,
+    connection_stats,
+    reset_connection_stats,
+)
+from core.metrics import render_metrics, reset_metrics
+
+
+class MetricsDatabaseWrapper(ConnectionMetricsMixin, DatabaseWrapper):
+    pass
+
+
+class ConnectionMetricsTests(SimpleTestCase):
+    def setUp(self):
+        reset_connection_stats()
+        self.addCleanup(reset_connection_stats)
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        # In-memory SQLite connections are never closed, so use a file
+        settings_dict = dict(
+            connection.settings_dict, NAME=os.path.join(tmpdir.name, "metrics.db")
+        )
+        self.wrapper = MetricsDatabaseWrapper(settings_dict, alias="metrics")
+        self.addCleanup(self.wrapper.close)
+
+    def test_new_connections_are_recorded(self):
+        self.wrapper.ensure_connection()
+        self.wrapper.ensure_connection()  # reused, not recorded
+        self.wrapper.close()
+        self.wrapper.ensure_connection()
+
+        stats = connection_stats()["metrics"]
+        self.assertEqual(stats["acquired"], 2)
+        self.assertGreater(stats["wait_seconds_total"], 0)
+        self.assertLessEqual(stats["wait_seconds_max"], stats["wait_seconds_total"])
+
+    @override_settings(METRICS_MULTIPROC_DIR="")
+    def test_connection_waits_are_exported(self):
+        self.wrapper.ensure_connection()
+        self.wrapper.close()
+        self.wrapper.ensure_connection()
+
+        output = render_metrics()
+        name = "althea_db_connection_wait_seconds"
+        self.assertIn(f"# TYPE {name} histogram", output)
+        self.assertIn(f'{name}_bucket{{alias="metrics",le="+Inf"}} 2', output)
+        self.assertIn(f'{name}_count{{alias="metrics"}} 2', output)
+
+    @override_settings(DB_CONNECTION_WAIT_WARNING=0)
+    def test_slow_acquisition_is_logged(self):
+        with self.assertLogs("core.db.metrics", level="WARNING") as logs:
+            self.wrapper.ensure_connection()
+        self.assertIn("metrics", logs.output[0])
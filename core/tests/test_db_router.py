@@ -0,0 +1,153 @@
+"""
+Test the primary/replica database router.
+
+The routing tests need no replica connection. ReplicaQueryTests runs the
+admin lists against a real second database and is skipped unless one is
+configured, e.g. DB_REPLICA_HOSTS=localhost python manage.py test core.
+"""
+
+import unittest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.db.routers import (
+    PrimaryReplicaRouter,
+    pin_primary,
+    pin_user_to_primary,
+    read_from_replica,
+    use_replica,
+    user_pinned_to_primary,
+)
+from core.middleware import ReplicaPinMiddleware
+from credit_line.models import CreditLine
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        cache.clear()
+
+    def test_reads_use_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(CreditLine), "default")
+
+    def test_use_replica_sends_reads_to_a_replica(self):
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(CreditLine), "replica_1")
+        self.assertEqual(self.router.db_for_read(CreditLine), "default")
+
+    def test_pin_primary_wins_over_use_replica(self):
+        with use_replica(), pin_primary():
+            self.assertEqual(self.router.db_for_read(CreditLine), "default")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_reads_use_primary(self):
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(CreditLine), "default")
+
+    def test_writes_and_select_for_update_use_primary(self):
+        with use_replica():
+            self.assertEqual(self.router.db_for_write(CreditLine), "default")
+            self.assertEqual(CreditLine.objects.select_for_update().db, "default")
+            self.assertEqual(CreditLine.objects.all().db, "replica_1")
+
+    def test_migrations_only_run_on_primary(self):
+        self.assertTrue(self.router.allow_migrate("default", "credit_line"))
+        self.assertFalse(self.router.allow_migrate("replica_1", "credit_line"))
+
+    def test_read_from_replica_view(self):
+        @read_from_replica
+        def view(request):
+            return self.router.db_for_read(CreditLine)
+
+        request = RequestFactory().get("/")
+        request.user = User(pk=1)
+        self.assertEqual(view(request), "replica_1")
+
+        pin_user_to_primary(1)
+        self.assertEqual(view(request), "default")
+
+    def test_middleware_pins_users_after_successful_writes(self):
+        user = User(pk=1)
+
+        def respond(status):
+            return ReplicaPinMiddleware(lambda request: HttpResponse(status=status))
+
+        for method, status in (("get", 200), ("post", 400)):
+            request = getattr(RequestFactory(), method)("/")
+            request.user = user
+            respond(status)(request)
+            self.assertFalse(user_pinned_to_primary(user))
+
+        request = RequestFactory().patch("/")
+        request.user = AnonymousUser()
+        respond(200)(request)
+        self.assertFalse(user_pinned_to_primary(user))
+
+        request = RequestFactory().post("/")
+        request.user = user
+        respond(201)(request)
+        self.assertTrue(user_pinned_to_primary(user))
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"])
+class PrimaryReplicaTransactionTests(TestCase):
+    def test_reads_inside_a_transaction_use_primary(self):
+        # TestCase runs every test inside a transaction on the primary
+        with use_replica():
+            self.assertEqual(PrimaryReplicaRouter().db_for_read(CreditLine), "default")
+
+
+@unittest.skipUnless(settings.DATABASE_REPLICAS, "No replica database configured")
+class ReplicaQueryTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        self.replica = settings.DATABASE_REPLICAS[0]
+        self.admin = User.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            password="Password123@",
+            first_name="Ad",
+            last_name="Min",
+        )
+        CreditLine.objects.create(
+            credit_limit=1000, start_date="2024-01-01", user=self.admin
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse("credit_line_api:credit_lines_admin_list")
+
+    def test_admin_list_reads_from_replica(self):
+        with CaptureQueriesContext(connections[self.replica]) as replica_queries:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+        self.assertTrue(
+            any("credit_line" in query["sql"] for query in replica_queries)
+        )
+
+    def test_admin_list_reads_from_primary_after_a_write(self):
+        pin_user_to_primary(self.admin.pk)
+        with CaptureQueriesContext(connections[self.replica]) as replica_queries:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(len(replica_queries), 0)
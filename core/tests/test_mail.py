@@ -0,0 +1,199 @@
+"""
+Test the email outbox and its sender.
+"""
+
+import socketserver
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.conf import settings
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from core.mail import queue_email, send_queued_emails, MAX_ATTEMPTS
+from core.models import QueuedEmail
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough of SMTP for smtplib: accepts every message and records it.
+    """
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 localhost SMTP stand-in")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(" ")[0].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline().decode()
+                    if data in (".\r\n", ".\n", ""):
+                        break
+                    lines.append(data)
+                server.messages.append("".join(lines))
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPStandInHandler)
+        self.connections = 0
+        self.messages = []
+
+
+class FailingConnection:
+    def __init__(self, fail_for=()):
+        self.fail_for = set(fail_for)
+        self.sent = []
+
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        for message in messages:
+            if message.to[0] in self.fail_for:
+                raise ConnectionError("mailbox unavailable")
+            self.sent.append(message)
+        return len(messages)
+
+
+class QueuedEmailTests(TestCase):
+    def queue(self, count):
+        return [
+            queue_email(f"Subject {i}", "<p>Hi</p>", [f"user{i}@example.com"])
+            for i in range(count)
+        ]
+
+    def test_queue_email_only_inserts_a_row(self):
+        queued = queue_email("Subject", "Body", ["user@example.com"])
+        self.assertEqual(queued.status, "pending")
+        self.assertEqual(queued.from_email, settings.DEFAULT_FROM_EMAIL)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_send_marks_emails_sent(self):
+        self.queue(3)
+        self.assertEqual(send_queued_emails(), 3)
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            set(QueuedEmail.objects.values_list("status", flat=True)), {"sent"}
+        )
+        self.assertEqual(send_queued_emails(), 0)
+
+    def test_failed_email_is_retried_then_given_up(self):
+        queued, = self.queue(1)
+        connection = FailingConnection(fail_for=["user0@example.com"])
+
+        send_queued_emails(connection=connection)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, "pending")
+        self.assertEqual(queued.attempts, 1)
+        self.assertIn("mailbox unavailable", queued.last_error)
+
+        # Not retried before the retry delay has passed
+        self.assertEqual(send_queued_emails(connection=connection), 0)
+
+        QueuedEmail.objects.update(
+            attempts=MAX_ATTEMPTS - 1, claimed_at=timezone.now() - timedelta(hours=1)
+        )
+        send_queued_emails(connection=connection)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, "failed")
+
+    def test_one_failure_does_not_block_the_batch(self):
+        self.queue(3)
+        connection = FailingConnection(fail_for=["user1@example.com"])
+        send_queued_emails(connection=connection)
+
+        self.assertEqual(len(connection.sent), 2)
+        self.assertEqual(
+            dict(QueuedEmail.objects.values_list("subject", "status")),
+            {"Subject 0": "sent", "Subject 1": "pending", "Subject 2": "sent"},
+        )
+
+    def test_abandoned_claims_are_recovered(self):
+        self.queue(1)
+        QueuedEmail.objects.update(
+            status="sending", claimed_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(send_queued_emails(), 1)
+
+    def test_command(self):
+        self.queue(2)
+        out = StringIO()
+        call_command("send_queued_emails", stdout=out)
+        self.assertIn("Handled 2 queued emails.", out.getvalue())
+        self.assertEqual(len(mail.outbox), 2)
+
+
+class SMTPDeliveryTests(TestCase):
+    def setUp(self):
+        self.server = SMTPStandIn()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_batch_is_sent_over_one_connection(self):
+        for i in range(5):
+            queue_email(f"Subject {i}", "Body", [f"user{i}@example.com"])
+
+        smtp_settings = {
+            "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+            "EMAIL_HOST": "127.0.0.1",
+            "EMAIL_PORT": self.server.server_address[1],
+            "EMAIL_HOST_USER": "",
+            "EMAIL_HOST_PASSWORD": "",
+            "EMAIL_USE_TLS": False,
+        }
+        with override_settings(**smtp_settings):
+            self.assertEqual(send_queued_emails(connection=get_connection()), 5)
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(len(self.server.messages), 5)
+        self.assertIn("Subject: Subject 0", self.server.messages[0])
+        self.assertEqual(QueuedEmail.objects.filter(status="sent").count(), 5)
+
+    @patch("core.mail.get_connection")
+    def test_unreachable_server_fails_the_batch(self, mock_get_connection):
+        mock_get_connection.return_value = get_connection(
+            "django.core.mail.backends.smtp.EmailBackend",
+            host="127.0.0.1",
+            port=1,
+            username="",
+            password="",
+            use_tls=False,
+        )
+        queue_email("Subject", "Body", ["user@example.com"])
+
+        send_queued_emails()
+
+        queued = QueuedEmail.objects.get()
+        self.assertEqual(queued.status, "pending")
+        self.assertEqual(queued.attempts, 1)
+        self.assertTrue(queued.last_error)
@@ -0,0 +1,162 @@
+"""
+Test the tracemalloc memory profiling.
+"""
+
+import os
+import tracemalloc
+from unittest.mock import patch
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.tests.base_test import BaseTest
+from core import memory
+from core.middleware import MemoryProfilerMiddleware
+
+# Allocations kept alive on purpose, as a leak would
+_retained = []
+
+
+def leak(blocks):
+    _retained.extend(bytearray(1024) for _ in range(blocks))
+
+
+def stop_tracing():
+    tracemalloc.stop()
+    memory.reset_memory()
+    # Let the next test start its own snapshot thread
+    memory._process.update(pid=None, snapshot_thread=None)
+    _retained.clear()
+
+
+@override_settings(MEMORY_SNAPSHOT_INTERVAL=0)
+class SnapshotTests(SimpleTestCase):
+    def setUp(self):
+        tracemalloc.start(10)
+        self.addCleanup(stop_tracing)
+
+    def test_retained_sites_are_reported(self):
+        memory.take_snapshot()
+        leak(500)
+        diff = memory.take_snapshot()
+
+        site = diff["since_previous"][0]
+        self.assertTrue(site["site"].startswith("core/tests/test_memory.py:"))
+        self.assertGreaterEqual(site["size_diff"], 500 * 1024)
+        self.assertGreaterEqual(site["count_diff"], 500)
+        self.assertEqual(diff["since_first"][0]["site"], site["site"])
+
+        # Nothing grew since
+        diff = memory.take_snapshot()
+        self.assertNotIn(site["site"], [s["site"] for s in diff["since_previous"]])
+        self.assertIn(site["site"], [s["site"] for s in diff["since_first"]])
+        self.assertEqual(len(memory.memory_report()["snapshots"]), 3)
+
+    @override_settings(MEMORY_SNAPSHOT_HISTORY=2)
+    def test_snapshot_history_is_bounded(self):
+        for _ in range(3):
+            memory.take_snapshot()
+        self.assertEqual(len(memory.memory_report()["snapshots"]), 2)
+
+    @override_settings(MEMORY_SNAPSHOT_INTERVAL=3600)
+    def test_forked_process_starts_its_own_snapshot_thread(self):
+        with patch("core.memory.threading.Thread") as thread:
+            memory.start()
+            memory.start()
+            self.assertEqual(thread.call_count, 1)
+            memory.take_snapshot()
+
+            # A worker forked after the master started the thread
+            with patch("core.memory.os.getpid", return_value=os.getpid() + 1):
+                memory.start()
+                self.assertEqual(thread.call_count, 2)
+                self.assertEqual(memory.memory_report()["snapshots"], [])
+                memory.start()
+                self.assertEqual(thread.call_count, 2)
+
+    def test_forked_process_gets_an_unlocked_lock(self):
+        lock = memory._lock
+        self.addCleanup(setattr, memory, "_lock", lock)
+        with lock:
+            # Forked while the parent's snapshot thread held the lock
+            memory._after_fork()
+            self.assertIsNotNone(memory.take_snapshot())
+
+    def test_request_peak_and_retained_memory(self):
+        request_memory = memory.RequestMemory(sample_sites=True)
+        request_memory.start()
+        transient = bytearray(4 * 1024 * 1024)
+        del transient
+        leak(100)
+        request_memory.stop()
+
+        self.assertGreaterEqual(request_memory.peak_bytes, 4 * 1024 * 1024)
+        self.assertGreaterEqual(request_memory.retained_bytes, 100 * 1024)
+        self.assertLess(request_memory.retained_bytes, 4 * 1024 * 1024)
+        self.assertTrue(request_memory.sites[0]["site"].startswith("core/tests/test_memory.py:"))
+
+
+class MemoryProfilerMiddlewareTests(BaseTest, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(stop_tracing)
+        self.url = reverse("core_api:memory")
+
+    def authenticate(self, user):
+        token = AccessToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    @override_settings(MEMORY_PROFILING=False)
+    def test_middleware_is_disabled_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MemoryProfilerMiddleware(lambda request: None)
+
+    @override_settings(MEMORY_PROFILING=True, MEMORY_SNAPSHOT_INTERVAL=3600)
+    def test_tracing_starts_on_the_first_request(self):
+        tracemalloc.stop()
+        with patch("core.memory.threading.Thread") as thread:
+            # Built in the preloading gunicorn master
+            middleware = MemoryProfilerMiddleware(lambda request: HttpResponse())
+            self.assertFalse(tracemalloc.is_tracing())
+            thread.assert_not_called()
+
+            middleware(RequestFactory().get("/"))
+            self.assertTrue(tracemalloc.is_tracing())
+            thread.assert_called_once()
+
+    @override_settings(
+        MEMORY_PROFILING=True, MEMORY_SITES_SAMPLE_RATE=1.0, MEMORY_SNAPSHOT_INTERVAL=0
+    )
+    def test_requests_are_recorded_per_url_name(self):
+        self.authenticate(self.admin_user)
+        list_url = reverse("credit_origination_api:credit_type_list")
+        for _ in range(2):
+            response = self.client.get(list_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["tracing"])
+        self.assertEqual(len(response.data["snapshots"]), 1)
+        [view] = [
+            view
+            for view in response.data["views"]
+            if view["view"] == "credit_origination_api:credit_type_list"
+        ]
+        self.assertEqual(view["requests"], 2)
+        self.assertEqual(view["sampled_requests"], 2)
+        self.assertGreater(view["peak_bytes_max"], 0)
+
+    def test_report_is_for_staff_only(self):
+        self.authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.authenticate(self.admin_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["tracing"])
+        self.assertEqual(response.data["views"], [])
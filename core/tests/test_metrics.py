@@ -0,0 +1,130 @@
+"""
+Test the request metrics and their Prometheus exposition.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.tests.base_test import BaseTest
+from core.metrics import (
+    inc,
+    mark_process_dead,
+    observe,
+    render_metrics,
+    reset_metrics,
+    snapshot,
+)
+
+DURATION = "althea_http_request_duration_seconds"
+REQUESTS = "althea_http_requests_total"
+
+
+class MetricsStoreTests(SimpleTestCase):
+    def setUp(self):
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+
+    def test_histograms_render_cumulative_buckets(self):
+        labels = {"view": "app:view", "method": "GET"}
+        observe(DURATION, labels, 0.003)
+        observe(DURATION, labels, 0.2)
+        observe(DURATION, labels, 60)
+
+        output = render_metrics()
+        series = 'method="GET",view="app:view"'
+        self.assertIn(f"# TYPE {DURATION} histogram", output)
+        self.assertIn(f'{DURATION}_bucket{{{series},le="0.005"}} 1', output)
+        self.assertIn(f'{DURATION}_bucket{{{series},le="0.1"}} 1', output)
+        self.assertIn(f'{DURATION}_bucket{{{series},le="0.25"}} 2', output)
+        self.assertIn(f'{DURATION}_bucket{{{series},le="+Inf"}} 3', output)
+        self.assertIn(f"{DURATION}_count{{{series}}} 3", output)
+        self.assertIn(f"{DURATION}_sum{{{series}}} 60.203", output)
+
+    def test_label_values_are_escaped(self):
+        inc(REQUESTS, {"view": 'a"b\\c'})
+        self.assertIn(f'{REQUESTS}{{view="a\\"b\\\\c"}} 1', render_metrics())
+
+    def test_forked_process_starts_empty(self):
+        inc(REQUESTS, {"view": "app:view"})
+        with patch("core.metrics.os.getpid", return_value=os.getpid() + 1):
+            self.assertEqual(snapshot()["counters"], [])
+
+
+class MultiprocessMetricsTests(SimpleTestCase):
+    def setUp(self):
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.directory = Path(tmpdir.name)
+
+    def write_process(self, pid, count):
+        data = {"histograms": [], "counters": [[REQUESTS, [["view", "a"]], count]]}
+        (self.directory / f"{pid}.json").write_text(json.dumps(data))
+
+    def test_scrape_adds_up_all_processes(self):
+        self.write_process(1, 2)
+        self.write_process(2, 3)
+        inc(REQUESTS, {"view": "a"})
+
+        with override_settings(METRICS_MULTIPROC_DIR=str(self.directory)):
+            output = render_metrics()
+
+        self.assertIn(f'{REQUESTS}{{view="a"}} 6', output)
+        self.assertTrue((self.directory / f"{os.getpid()}.json").exists())
+
+    def test_dead_processes_are_archived(self):
+        self.write_process(1, 2)
+        self.write_process(2, 3)
+        mark_process_dead(1, self.directory)
+        mark_process_dead(2, self.directory)
+        mark_process_dead(3, self.directory)  # never wrote a snapshot
+
+        self.assertEqual(
+            sorted(path.name for path in self.directory.iterdir()), ["archive.json"]
+        )
+        with override_settings(METRICS_MULTIPROC_DIR=str(self.directory)):
+            self.assertIn(f'{REQUESTS}{{view="a"}} 5', render_metrics())
+
+
+class RequestMetricsViewTests(BaseTest, APITestCase):
+    def setUp(self):
+        super().setUp()
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+        self.url = reverse("core_api:metrics")
+
+    def test_requests_are_recorded_per_url_name(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.client.get(reverse("credit_origination_api:credit_type_list"))
+
+        output = self.client.get(self.url).content.decode()
+        series = 'method="GET",view="credit_origination_api:credit_type_list"'
+        self.assertIn(f"{DURATION}_count{{{series}}} 1", output)
+        self.assertIn(f"althea_http_serializer_duration_seconds_count{{{series}}} 1", output)
+        self.assertIn(f"althea_http_response_size_bytes_count{{{series}}} 1", output)
+        self.assertIn(f'althea_http_db_queries_bucket{{{series},le="0.0"}} 0', output)
+        self.assertIn(
+            f'{REQUESTS}{{method="GET",status="200",'
+            f'view="credit_origination_api:credit_type_list"}} 1',
+            output,
+        )
+
+    def test_metrics_are_served_to_staff_only(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
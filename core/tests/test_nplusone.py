@@ -0,0 +1,105 @@
+"""
+Test the N+1 query detector.
+"""
+
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.db.nplusone import NPlusOneError, detect_nplusone
+from core.middleware import NPlusOneMiddleware
+from credit_line.models import CreditLine
+from credit_subline.models import CreditSubline
+from credit_subline.tests.base_test import BaseCreditSublineViewTests
+
+User = get_user_model()
+
+
+class NPlusOneDetectorTests(BaseCreditSublineViewTests, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # One credit line per user
+        for i in range(7):
+            user = User.objects.create_user(
+                first_name="Borrower",
+                last_name=str(i),
+                username=f"borrower{i}",
+                email=f"borrower{i}@example.com",
+                password="Password123@",
+            )
+            credit_line = CreditLine.objects.create(
+                credit_limit=Decimal("10000"),
+                currency="mxn",
+                start_date=cls.credit_line.start_date,
+                end_date=cls.credit_line.end_date,
+                status="approved",
+                user=user,
+            )
+            CreditSubline.objects.create(
+                credit_line=credit_line,
+                subline_type=cls.credit_type,
+                subline_amount=Decimal("1000"),
+                amount_disbursed=Decimal("0"),
+                outstanding_balance=Decimal("0"),
+                interest_rate=Decimal("0.05"),
+            )
+
+    def test_forward_relation_is_named(self):
+        with self.assertRaises(NPlusOneError) as raised:
+            with detect_nplusone(label="sublines", threshold=5, raise_errors=True):
+                for subline in CreditSubline.objects.all():
+                    subline.credit_line.currency
+
+        message = str(raised.exception)
+        self.assertIn("N+1 queries in sublines", message)
+        self.assertIn("7 queries loading CreditLine through CreditSubline.credit_line", message)
+        self.assertIn("from core/tests/test_nplusone.py:", message)
+
+    def test_reverse_relation_is_named(self):
+        with self.assertRaises(NPlusOneError) as raised:
+            with detect_nplusone(threshold=5, raise_errors=True):
+                for credit_line in CreditLine.objects.all():
+                    list(credit_line.creditsubline_set.all())
+
+        self.assertIn(
+            "loading CreditSubline through CreditLine.creditsubline_set",
+            str(raised.exception),
+        )
+
+    def test_findings_are_logged_unless_raising(self):
+        with self.assertLogs("core.db.nplusone", "WARNING") as logs:
+            with detect_nplusone(threshold=5, raise_errors=False) as detector:
+                for subline in CreditSubline.objects.all():
+                    subline.credit_line.currency
+
+        [finding] = detector.findings()
+        self.assertEqual(finding["count"], 7)
+        self.assertEqual(finding["model"], "CreditLine")
+        self.assertEqual(finding["attribute"], "CreditSubline.credit_line")
+        self.assertIn("CreditSubline.credit_line", logs.output[0])
+
+    def test_queries_under_the_threshold_pass(self):
+        with detect_nplusone(threshold=7, raise_errors=True) as detector:
+            for subline in CreditSubline.objects.all():
+                subline.credit_line.currency
+        self.assertEqual(detector.findings(), [])
+
+        with detect_nplusone(threshold=1, raise_errors=True) as detector:
+            for subline in CreditSubline.objects.select_related("credit_line"):
+                subline.credit_line.currency
+        self.assertEqual(detector.findings(), [])
+
+    @override_settings(NPLUSONE_DETECTION=False)
+    def test_middleware_is_disabled_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            NPlusOneMiddleware(lambda request: None)
+
+    @override_settings(NPLUSONE_DETECTION=True, NPLUSONE_RAISE=True, NPLUSONE_THRESHOLD=5)
+    def test_admin_list_has_no_nplusone(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(self.admin_list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 7)
@@ -0,0 +1,94 @@
+"""
+Test the prebuilt OpenAPI schema.
+"""
+
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from core import openapi
+
+
+class OpenAPISchemaTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(OPENAPI_SCHEMA_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        openapi.reset_schema()
+        self.addCleanup(openapi.reset_schema)
+        self.url = reverse("schema-json", kwargs={"format": ".json"})
+
+    def test_command_writes_the_schema_files(self):
+        out = StringIO()
+        call_command("generate_openapi_schema", stdout=out)
+
+        schema = json.loads((self.directory / "schema.json").read_text())
+        self.assertEqual(schema["info"]["title"], "Althea API")
+        self.assertIn("/api/loan-term/", "".join(schema["paths"]))
+        self.assertNotIn("host", schema)
+        self.assertTrue((self.directory / "schema.yaml").read_text().startswith("swagger:"))
+        etag = openapi.schema_etag((self.directory / "schema.json").read_bytes())
+        self.assertIn(etag, out.getvalue())
+
+        call_command("generate_openapi_schema", check=True, stdout=StringIO())
+        (self.directory / "schema.yaml").write_text("swagger: '2.0'\n")
+        with self.assertRaisesMessage(CommandError, "schema.yaml"):
+            call_command("generate_openapi_schema", check=True, stdout=StringIO())
+
+    def test_prebuilt_schema_is_served_with_an_etag(self):
+        call_command("generate_openapi_schema", stdout=StringIO())
+        content = (self.directory / "schema.json").read_bytes()
+
+        with patch.object(openapi, "generate_schema") as generate_schema:
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.content, content)
+            self.assertEqual(response["Content-Type"], "application/json")
+            self.assertEqual(response["ETag"], f'"{openapi.schema_etag(content)}"')
+            self.assertEqual(response["Cache-Control"], "public, max-age=86400")
+
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response.content, b"")
+            self.assertEqual(response["Cache-Control"], "public, max-age=86400")
+
+            response = self.client.get(
+                reverse("schema-json", kwargs={"format": ".yaml"}),
+                HTTP_IF_NONE_MATCH=response["ETag"],
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response["Content-Type"], "application/yaml")
+
+        generate_schema.assert_not_called()
+
+    def test_schema_is_generated_once_without_prebuilt_files(self):
+        with patch.object(
+            openapi, "generate_schema", wraps=openapi.generate_schema
+        ) as generate_schema, self.assertLogs("core.openapi", "WARNING"):
+            for _ in range(3):
+                response = self.client.get(self.url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        generate_schema.assert_called_once()
+        self.assertEqual(json.loads(response.content)["swagger"], "2.0")
+
+    def test_unknown_formats_and_methods_are_rejected(self):
+        response = self.client.get(reverse("schema-json", kwargs={"format": ".xml"}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_ui_loads_the_prebuilt_schema(self):
+        response = self.client.get(reverse("schema-swagger-ui"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, self.url)
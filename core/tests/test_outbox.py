@@ -0,0 +1,105 @@
+"""
+Test the transactional outbox and its relay.
+"""
+
+import json
+import os
+import tempfile
+from io import StringIO
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from accounts.tests.base_test import BaseTest
+from core.models import OutboxEvent, OutboxCursor
+from core.outbox import (
+    emit_event,
+    relay_batch,
+    prune_delivered_events,
+    FileSink,
+    StubSink,
+)
+
+
+class FailingSink:
+    def __init__(self, target=None):
+        pass
+
+    def send(self, events):
+        raise ConnectionError("downstream unavailable")
+
+
+class OutboxTests(BaseTest):
+    def setUp(self):
+        super().setUp()
+        StubSink.delivered = []
+
+    def emit(self, count):
+        return [
+            emit_event("test.event", self.user, {"sequence": i}) for i in range(count)
+        ]
+
+    def test_emit_event(self):
+        event = emit_event("test.event", self.user, {"value": 1})
+        self.assertEqual(event.aggregate_type, "accounts.user")
+        self.assertEqual(event.aggregate_id, self.user.pk)
+        self.assertEqual(event.payload, {"value": 1})
+
+    def test_relay_delivers_in_order_and_advances_cursor(self):
+        events = self.emit(5)
+
+        self.assertEqual(relay_batch(StubSink(), batch_size=3), 3)
+        self.assertEqual(relay_batch(StubSink(), batch_size=3), 2)
+        self.assertEqual(relay_batch(StubSink(), batch_size=3), 0)
+
+        delivered_ids = [event["id"] for event in StubSink.delivered]
+        self.assertEqual(delivered_ids, [event.id for event in events])
+        cursor = OutboxCursor.objects.get(consumer="relay")
+        self.assertEqual(cursor.last_event_id, events[-1].id)
+
+    def test_failed_delivery_is_retried(self):
+        self.emit(2)
+
+        with self.assertRaises(ConnectionError):
+            relay_batch(FailingSink())
+
+        self.assertFalse(OutboxCursor.objects.filter(last_event_id__gt=0).exists())
+        self.assertEqual(relay_batch(StubSink()), 2)
+
+    def test_consumers_keep_separate_high_water_marks(self):
+        self.emit(2)
+        relay_batch(StubSink(), consumer="accounting")
+        self.assertEqual(relay_batch(StubSink(), consumer="bi"), 2)
+
+    def test_settle_window_holds_back_recent_events(self):
+        self.emit(1)
+        self.assertEqual(relay_batch(StubSink(), settle_seconds=60), 0)
+
+    def test_prune_delivered_events(self):
+        self.emit(3)
+        relay_batch(StubSink(), batch_size=2)
+        OutboxEvent.objects.update(created=timezone.now() - timedelta(days=8))
+
+        self.assertEqual(prune_delivered_events(older_than_days=7), 2)
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+    def test_file_sink_writes_json_lines(self):
+        self.emit(2)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "events.jsonl")
+            relay_batch(FileSink(path))
+            with open(path, encoding="utf-8") as infile:
+                lines = [json.loads(line) for line in infile]
+        self.assertEqual([line["payload"]["sequence"] for line in lines], [0, 1])
+
+
+class RelayOutboxCommandTests(TestCase):
+    def setUp(self):
+        StubSink.delivered = []
+
+    def test_relay_outbox_command(self):
+        OutboxEvent.objects.create(
+            topic="test.event", aggregate_type="test", aggregate_id=1
+        )
+        call_command("relay_outbox", sink="stub", settle_seconds=0, stdout=StringIO())
+        self.assertEqual(len(StubSink.delivered), 1)
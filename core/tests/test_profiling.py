@@ -0,0 +1,164 @@
+"""
+Test the on-demand request profiler.
+"""
+
+import pstats
+import tempfile
+import time
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.tests.base_test import BaseTest
+from core.profiling import CProfiler, SamplingProfiler, list_profiles, requested_mode
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def handler(depth, profiler):
+    # Like Django's middleware wrapper: the same function on every level of
+    # the chain, with the profiler started from one of them
+    if depth == 0:
+        busy_wait(0.02)
+        return
+    if depth == 2:
+        profiler.start()
+    try:
+        handler(depth - 1, profiler)
+    finally:
+        if depth == 2:
+            profiler.stop()
+
+
+class ProfilerTests(SimpleTestCase):
+    def test_requested_mode(self):
+        factory = RequestFactory()
+        self.assertIsNone(requested_mode(factory.get("/")))
+        self.assertIsNone(requested_mode(factory.get("/?profile=0")))
+        self.assertEqual(requested_mode(factory.get("/?profile=1")), "cprofile")
+        self.assertEqual(
+            requested_mode(factory.get("/", HTTP_X_PROFILE="sample")), "sample"
+        )
+
+    def test_sampling_profiler_collapses_stacks(self):
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start()
+        busy_wait(0.05)
+        profiler.stop()
+
+        lines = profiler.collapsed().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertTrue(stack.startswith("busy_wait (core/tests/test_profiling.py:"))
+        self.assertGreater(int(count), 0)
+
+    def test_cprofiler_collapses_recursive_entry_points(self):
+        profiler = CProfiler()
+        handler(3, profiler)
+
+        stacks = dict(
+            line.rsplit(" ", 1) for line in profiler.collapsed().splitlines()
+        )
+        [busy_stack] = [stack for stack in stacks if "busy_wait" in stack.split(";")[-1]]
+        self.assertTrue(busy_stack.startswith("handler (core/tests/test_profiling.py:"))
+        # Recursion is folded into one frame
+        self.assertEqual(busy_stack.count("handler ("), 1)
+        self.assertGreater(int(stacks[busy_stack]), 0)
+
+
+class ProfilerMiddlewareTests(BaseTest, APITestCase):
+    def setUp(self):
+        super().setUp()
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        settings_override = override_settings(PROFILER_DIR=tmpdir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.url = reverse("credit_origination_api:credit_type_list")
+
+    def authenticate(self, user):
+        token = AccessToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_superuser_request_is_profiled(self):
+        self.authenticate(self.superuser)
+        response = self.client.get(self.url, HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile_id = response["X-Profile-Id"]
+
+        [profile] = list_profiles()
+        self.assertEqual(profile["id"], profile_id)
+        self.assertEqual(profile["mode"], "cprofile")
+        self.assertEqual(profile["view"], "credit_origination_api:credit_type_list")
+        self.assertEqual(profile["formats"], ["pstats", "collapsed"])
+
+        response = self.client.get(
+            reverse(
+                "core_api:profile_download",
+                kwargs={"profile_id": profile_id, "kind": "collapsed"},
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        collapsed = b"".join(response.streaming_content).decode()
+        self.assertIn("credit_type_list (credit_origination/api/views.py:", collapsed)
+
+        response = self.client.get(
+            reverse(
+                "core_api:profile_download",
+                kwargs={"profile_id": profile_id, "kind": "pstats"},
+            )
+        )
+        with tempfile.NamedTemporaryFile() as dump:
+            dump.write(b"".join(response.streaming_content))
+            dump.flush()
+            functions = {name for _, _, name in pstats.Stats(dump.name).stats}
+        self.assertIn("credit_type_list", functions)
+
+    def test_other_users_are_not_profiled(self):
+        self.authenticate(self.admin_user)
+        response = self.client.get(self.url, {"profile": "1"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Profile-Id", response)
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer invalid")
+        response = self.client.get(self.url, {"profile": "1"})
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(list_profiles(), [])
+
+    @override_settings(PROFILER_MAX_PROFILES=2)
+    def test_oldest_profiles_are_dropped(self):
+        self.authenticate(self.superuser)
+        ids = [
+            self.client.get(self.url, HTTP_X_PROFILE="sample")["X-Profile-Id"]
+            for _ in range(3)
+        ]
+        self.assertEqual([profile["id"] for profile in list_profiles()], ids[:0:-1])
+
+    def test_profiles_are_listed_to_staff_only(self):
+        self.authenticate(self.user)
+        response = self.client.get(reverse("core_api:profile_list"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.authenticate(self.admin_user)
+        response = self.client.get(reverse("core_api:profile_list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_unknown_profiles_are_not_found(self):
+        self.authenticate(self.admin_user)
+        for profile_id, kind in (
+            ("20240101000000000000-0123abcd", "collapsed"),
+            ("..", "pstats"),
+            ("20240101000000000000-0123abcd", "json"),
+        ):
+            url = reverse(
+                "core_api:profile_download",
+                kwargs={"profile_id": profile_id, "kind": kind},
+            )
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,131 @@
+"""
+Test the query plan checks of the admin API.
+"""
+
+import unittest
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from core.db.query_plans import PLAN_CASES, check_plans, is_count, summarize
+from core.seeding import seed_portfolio
+
+
+def scan(node_type, relation, index=None, cost=8.3):
+    node = {"Node Type": node_type, "Relation Name": relation, "Total Cost": cost}
+    if index:
+        node["Index Name"] = index
+    return node
+
+
+class PlanSummaryTests(SimpleTestCase):
+    def test_summary_collects_indexes_and_sequential_scans(self):
+        plan = {
+            "Node Type": "Limit",
+            "Total Cost": 42.5,
+            "Execution Time": 0.3,
+            "Shared Hit Blocks": 12,
+            "Shared Read Blocks": 2,
+            "Plans": [
+                {
+                    "Node Type": "Nested Loop",
+                    "Total Cost": 42.0,
+                    "Plans": [
+                        scan(
+                            "Index Scan Backward",
+                            "credit_subline_creditsubline",
+                            "credit_subline_created_idx",
+                        ),
+                        scan("Seq Scan", "credit_origination_credittype"),
+                    ],
+                }
+            ],
+        }
+
+        summary = summarize(plan)
+
+        self.assertEqual(summary["total_cost"], 42.5)
+        self.assertEqual(summary["shared_hit_blocks"], 12)
+        self.assertEqual(summary["indexes"], ["credit_subline_created_idx"])
+        self.assertEqual(summary["seq_scans"], ["credit_origination_credittype"])
+
+    def test_pagination_counts_are_recognized(self):
+        self.assertTrue(is_count('SELECT COUNT(*) AS "__count" FROM "credit_line_creditline"'))
+        self.assertFalse(is_count('SELECT "credit_line_creditline"."id" FROM "x" LIMIT 10'))
+
+
+class CheckPlansTests(TestCase):
+    """
+    The checks against any database, with the plans made up.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_portfolio(users=40, lines=30, seed=3)
+
+    def explain_with(self, *nodes):
+        def explain(alias, sql, params):
+            return {"Node Type": "Limit", "Total Cost": 20.0, "Plans": list(nodes)}
+
+        return mock.patch("core.db.query_plans.explain", side_effect=explain)
+
+    def test_every_case_is_requested(self):
+        indexes = [
+            scan("Index Scan", "t", pattern.replace("*", "x"))
+            for case in PLAN_CASES
+            for pattern in case["indexes"]
+        ]
+        with self.explain_with(*indexes):
+            results = check_plans()
+
+        self.assertEqual(len(results), len(PLAN_CASES))
+        for result in results:
+            with self.subTest(result["name"]):
+                self.assertNotIn("skipped", result)
+                self.assertEqual(result["status"], 200)
+                self.assertTrue(result["queries"])
+                self.assertEqual(result["problems"], [])
+
+    def test_problems_are_reported(self):
+        with self.explain_with(
+            scan("Seq Scan", "credit_line_creditline", cost=5000.0)
+        ), mock.patch(
+            "core.db.query_plans.table_rows",
+            return_value={"credit_line_creditline": 250000.0},
+        ):
+            [result] = check_plans(only=["credit_lines_admin_list?status"])
+
+        self.assertIn(
+            "sequential scan on credit_line_creditline (250000 rows)", result["problems"]
+        )
+        self.assertIn("none of credit_line_status_idx used (used: )", result["problems"])
+        # Counts are explained but not checked
+        self.assertTrue(any(query["count"] for query in result["queries"]))
+        self.assertEqual(
+            len([problem for problem in result["problems"] if problem.startswith("seq")]),
+            len([query for query in result["queries"] if not query["count"]]),
+        )
+
+    @unittest.skipIf(connection.vendor == "postgresql", "Runs the checks on PostgreSQL")
+    def test_command_needs_postgresql(self):
+        with self.assertRaisesMessage(CommandError, "only be checked on PostgreSQL"):
+            call_command("check_query_plans")
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "Query plans need PostgreSQL")
+class QueryPlanRegressionTests(TestCase):
+    """
+    The admin lists and details use their indexes on a seeded portfolio.
+    """
+
+    USERS = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_portfolio(users=cls.USERS, seed=1)
+
+    def test_admin_queries_use_their_indexes(self):
+        for result in check_plans():
+            with self.subTest(result["name"]):
+                self.assertNotIn("skipped", result)
+                self.assertEqual(result["problems"], [], result["queries"])
@@ -0,0 +1,122 @@
+"""
+Test the synthetic portfolio generator.
+"""
+
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import Count, Sum
+from django.test import SimpleTestCase, TestCase
+from credit_line.models import CreditLine, CreditLineAdjustment
+from credit_origination.models import CreditRequest
+from credit_subline.models import (
+    AdjustmentLedgerEntry,
+    CreditAmountAdjustment,
+    CreditSubline,
+    CreditSublineStatusAdjustment,
+    InterestRateAdjustment,
+)
+from core.seeding import CopyWriter, add_months, parse_count, seed_portfolio
+from loan_management.models import LoanTerm, PeriodicPayment
+
+User = get_user_model()
+
+
+class SeedingHelperTests(SimpleTestCase):
+    def test_parse_count(self):
+        self.assertEqual(parse_count("1e6"), 1000000)
+        self.assertEqual(parse_count("250"), 250)
+        for value in ("-1", "2.5", "many"):
+            with self.assertRaises(ValueError):
+                parse_count(value)
+
+    def test_add_months_keeps_the_due_day_within_the_month(self):
+        self.assertEqual(add_months(date(2024, 1, 15), 1, 31), date(2024, 2, 29))
+        self.assertEqual(add_months(date(2024, 11, 30), 3), date(2025, 2, 28))
+        self.assertEqual(add_months(date(2024, 12, 1), 12, 5), date(2025, 12, 5))
+
+    def test_copy_values_are_escaped(self):
+        writer = CopyWriter()
+        field = CreditLineAdjustment._meta.get_field("reason")
+        adjustment = CreditLineAdjustment(reason="a\tb\\c\nd")
+        self.assertEqual(writer._value(field, adjustment), "a\\tb\\\\c\\nd")
+        adjustment.new_credit_limit = Decimal("1E+3")
+        field = CreditLineAdjustment._meta.get_field("new_credit_limit")
+        self.assertEqual(writer._value(field, adjustment), "1000")
+        adjustment.new_credit_limit = None
+        self.assertEqual(writer._value(field, adjustment), "\\N")
+
+
+class SeedPortfolioTests(TestCase):
+    def test_portfolio_is_consistent(self):
+        rows = seed_portfolio(users=40, lines=30, batch_size=15, seed=7)
+
+        self.assertEqual(rows["accounts.User"], 40)
+        self.assertEqual(rows["credit_origination.CreditRequest"], 40)
+        self.assertEqual(rows["credit_line.CreditLine"], 30)
+        self.assertEqual(CreditRequest.objects.filter(status="approved").count(), 30)
+        self.assertEqual(
+            rows["loan_management.PeriodicPayment"], PeriodicPayment.objects.count()
+        )
+        self.assertGreater(rows["credit_subline.CreditSubline"], 0)
+
+        for credit_line in CreditLine.objects.annotate(
+            drawn=Sum("creditsubline__subline_amount")
+        ):
+            self.assertEqual(credit_line.committed_amount, credit_line.drawn or 0)
+            self.assertEqual(
+                credit_line.available_amount,
+                credit_line.credit_limit - credit_line.committed_amount,
+            )
+        self.assertFalse(
+            CreditSubline.objects.filter(status="active")
+            .exclude(credit_line__status="approved")
+            .exists()
+        )
+
+        # One current ledger entry per adjustment
+        adjustments = (
+            CreditLineAdjustment.objects.count()
+            + CreditAmountAdjustment.objects.count()
+            + InterestRateAdjustment.objects.count()
+            + CreditSublineStatusAdjustment.objects.count()
+        )
+        self.assertEqual(AdjustmentLedgerEntry.objects.count(), adjustments)
+
+        # Full schedules for the approved loan terms only
+        for loan_term in LoanTerm.objects.annotate(payment_count=Count("payments")):
+            expected = loan_term.term_length if loan_term.status == "approved" else 0
+            self.assertEqual(loan_term.payment_count, expected)
+
+    def test_runs_are_reproducible(self):
+        first = seed_portfolio(users=20, batch_size=10, seed=3)
+        second = seed_portfolio(users=20, batch_size=10, seed=3)
+        self.assertEqual(first, second)
+        self.assertEqual(User.objects.count(), 40)
+        self.assertNotEqual(seed_portfolio(users=20, batch_size=10, seed=4), first)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            "seed_portfolio",
+            "--users",
+            "2e1",
+            "--sublines-per-line",
+            "0",
+            "--adjustments-per-line",
+            "0",
+            "--batch-size",
+            "10",
+            stdout=out,
+        )
+        self.assertIn("20/20 users", out.getvalue())
+        # Users, credit requests and credit lines
+        self.assertIn("Seeded 60 rows", out.getvalue())
+        self.assertFalse(CreditSubline.objects.exists())
+
+        with self.assertRaises(CommandError):
+            call_command("seed_portfolio", "--approve-ratio", "2")
+        with self.assertRaises(CommandError):
+            call_command("seed_portfolio", "--method", "copy")
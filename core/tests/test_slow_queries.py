@@ -0,0 +1,158 @@
+"""
+Test the slow query log.
+"""
+
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.tests.base_test import BaseTest
+from core.db.slow_queries import (
+    fingerprint,
+    read_log,
+    record_slow_query,
+    slow_query_report,
+    slow_query_wrapper,
+)
+
+
+class SlowQueryLogMixin:
+    def setUp(self):
+        super().setUp()
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.log_path = Path(tmpdir.name) / "slow.jsonl"
+        settings_override = override_settings(
+            SLOW_QUERY_LOG_PATH=str(self.log_path), SLOW_QUERY_THRESHOLD=0
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class SlowQueryReportTests(SlowQueryLogMixin, SimpleTestCase):
+    def test_fingerprint_removes_literals(self):
+        self.assertEqual(
+            fingerprint(
+                "SELECT *  FROM t\\n WHERE a = 'x''y' AND b = 42 AND c IN (%s, %s, %s)"
+            ),
+            "SELECT * FROM t\\n WHERE a = ? AND b = ? AND c IN (...)",
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO "t" ("a", "b") VALUES (...)',
+        )
+        self.assertEqual(
+            fingerprint('SELECT "t1"."id" FROM "t1" LIMIT 21'),
+            'SELECT "t1"."id" FROM "t1" LIMIT ?',
+        )
+
+    def test_report_ranks_fingerprints(self):
+        record_slow_query("SELECT 1 FROM a WHERE id = %s", 0.3, 1, "app:a", "a.py:1")
+        record_slow_query("SELECT 1 FROM a WHERE id = %s", 0.2, 3, "app:b", "a.py:1")
+        record_slow_query("SELECT 1 FROM b", 0.4, None, None, "b.py:9")
+
+        report = slow_query_report()
+        self.assertEqual(
+            [group["sql"] for group in report],
+            ["SELECT ? FROM a WHERE id = ?", "SELECT ? FROM b"],
+        )
+        self.assertEqual(report[0]["count"], 2)
+        self.assertEqual(report[0]["total_ms"], 500.0)
+        self.assertEqual(report[0]["max_ms"], 300.0)
+        self.assertEqual(report[0]["mean_ms"], 250.0)
+        self.assertEqual(report[0]["max_rows"], 3)
+        self.assertEqual(report[0]["views"], {"app:a": 1, "app:b": 1})
+        self.assertEqual(report[0]["call_sites"], {"a.py:1": 2})
+        self.assertEqual(report[1]["views"], {"-": 1})
+
+        self.assertEqual(slow_query_report(sort="max_ms")[0]["sql"], "SELECT ? FROM b")
+        self.assertEqual(len(slow_query_report(top=1)), 1)
+
+    def test_report_covers_a_rolling_window(self):
+        old = {
+            "time": (timezone.now() - timedelta(hours=2)).isoformat(),
+            "fingerprint": "old",
+            "sql": "SELECT ?",
+            "duration_ms": 900.0,
+            "rows": None,
+            "view": None,
+            "call_site": None,
+        }
+        self.log_path.write_text(json.dumps(old) + "\n")
+        record_slow_query("SELECT 2", 0.2, None, None, None)
+
+        self.assertEqual(len(read_log()), 2)
+        self.assertEqual(len(slow_query_report(minutes=60)), 1)
+        self.assertEqual(len(slow_query_report(minutes=180)), 2)
+
+    @override_settings(SLOW_QUERY_LOG_MAX_BYTES=100)
+    def test_log_rotates(self):
+        for _ in range(3):
+            record_slow_query("SELECT 1", 0.2, None, None, None)
+
+        # Only the last rotated part is kept
+        self.assertTrue(Path(f"{self.log_path}.1").exists())
+        self.assertEqual(len(read_log()), 2)
+
+    def test_command_prints_report(self):
+        out = StringIO()
+        call_command("slow_queries", stdout=out)
+        self.assertIn("No slow queries in the last 60 minutes.", out.getvalue())
+
+        record_slow_query("SELECT 1 FROM a", 0.2, None, "app:a", "a.py:1")
+        out = StringIO()
+        call_command("slow_queries", "--top", "5", stdout=out)
+        self.assertIn("SELECT ? FROM a", out.getvalue())
+        self.assertIn("at a.py:1 (1)", out.getvalue())
+
+        out = StringIO()
+        call_command("slow_queries", "--json", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())[0]["count"], 1)
+
+
+class SlowQueryWrapperTests(SlowQueryLogMixin, BaseTest, APITestCase):
+    def test_queries_are_attributed_to_view_and_call_site(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(
+            reverse("credit_origination_api:credit_type_list")
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # The count and the page of the paginated list
+        records = [
+            record for record in read_log() if "credit_origination_credittype" in record["sql"]
+        ]
+        self.assertEqual(len(records), 2)
+        for record in records:
+            self.assertEqual(record["view"], "credit_origination_api:credit_type_list")
+            self.assertTrue(
+                record["call_site"].startswith("credit_origination/api/views.py:")
+            )
+
+    def test_wrapper_outlives_other_execute_wrappers(self):
+        connection.ensure_connection()
+        with connection.execute_wrapper(lambda execute, *args: execute(*args)):
+            pass
+        self.assertIn(slow_query_wrapper, connection.execute_wrappers)
+
+    def test_report_is_served_to_staff_only(self):
+        url = reverse("core_api:slow_query_list")
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin_user)
+        self.client.get(reverse("credit_origination_api:credit_type_list"))
+        response = self.client.get(url, {"top": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+        response = self.client.get(url, {"sort": "rows"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,293 @@
+"""
+Test the tracing spans and exporters.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core import tracing
+from core.middleware import TracingMiddleware
+from credit_subline.models import CreditSubline
+from credit_subline.tests.base_test import BaseCreditSublineViewTests
+from loan_management.models import LoanTerm
+
+
+class SpanCapture:
+    """
+    Exporter keeping the Span objects, for the OTLP encoding tests.
+    """
+
+    exported = []
+
+    def __init__(self, target=None):
+        pass
+
+    def export(self, spans):
+        SpanCapture.exported.extend(spans)
+
+
+class BlockingExporter:
+    """
+    Exporter stuck until released, like one posting to a slow collector.
+    """
+
+    started = threading.Event()
+    release = threading.Event()
+    exported = []
+
+    def __init__(self, target=None):
+        pass
+
+    def export(self, spans):
+        BlockingExporter.started.set()
+        BlockingExporter.release.wait(10)
+        BlockingExporter.exported.append([finished.name for finished in spans])
+
+
+def stub_spans():
+    spans = list(tracing.StubExporter.exported)
+    tracing.StubExporter.exported.clear()
+    return spans
+
+
+@override_settings(TRACING=True, TRACING_EXPORTER="stub")
+class SpanTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(tracing.StubExporter.exported.clear)
+
+    def test_nested_spans_form_one_trace(self):
+        with tracing.span("outer", kind="test") as outer:
+            with tracing.span("inner") as inner:
+                self.assertEqual(tracing.current_trace_id(), outer.trace_id)
+            with self.assertRaises(ValueError):
+                with tracing.span("failing"):
+                    raise ValueError("boom")
+
+        spans = {span["name"]: span for span in stub_spans()}
+        self.assertEqual(set(spans), {"outer", "inner", "failing"})
+        self.assertEqual({span["trace_id"] for span in spans.values()}, {outer.trace_id})
+        self.assertIsNone(spans["outer"]["parent_id"])
+        self.assertEqual(spans["inner"]["parent_id"], outer.span_id)
+        self.assertEqual(spans["inner"]["span_id"], inner.span_id)
+        self.assertEqual(spans["outer"]["attributes"], {"kind": "test"})
+        self.assertEqual(spans["failing"]["status"], "error")
+        self.assertEqual(spans["failing"]["error"], "ValueError: boom")
+        self.assertGreaterEqual(spans["outer"]["duration_ms"], spans["inner"]["duration_ms"])
+        self.assertIsNone(tracing.current_span())
+
+    def test_traced_functions_are_named_after_them(self):
+        @tracing.traced()
+        def schedule():
+            return 42
+
+        self.assertEqual(schedule(), 42)
+        [span] = stub_spans()
+        self.assertEqual(span["name"], f"{__name__}.{schedule.__qualname__}")
+
+    @override_settings(TRACING=False)
+    def test_nothing_is_traced_when_off(self):
+        with tracing.span("off") as span:
+            self.assertIsNone(span)
+        self.assertEqual(stub_spans(), [])
+        with self.assertRaises(MiddlewareNotUsed):
+            TracingMiddleware(lambda request: None)
+
+    @override_settings(TRACING_EXPORTER="core.tests.test_tracing.SpanCapture")
+    def test_otlp_encoding_round_trips(self):
+        self.addCleanup(SpanCapture.exported.clear)
+        with tracing.span("outer"):
+            with tracing.span("inner", rows=3, ratio=0.5, cached=False, table="x"):
+                pass
+        tracing.flush()
+        expected = [span.as_dict() for span in SpanCapture.exported]
+
+        payload = tracing.otlp_payload(SpanCapture.exported)
+
+        [resource_spans] = payload["resourceSpans"]
+        [scope_spans] = resource_spans["scopeSpans"]
+        inner = scope_spans["spans"][0]
+        self.assertEqual(len(inner["traceId"]), 32)
+        self.assertIn({"key": "rows", "value": {"intValue": "3"}}, inner["attributes"])
+        self.assertEqual(tracing.spans_from_otlp(payload), expected)
+
+    def test_traces_are_formatted_as_trees(self):
+        with tracing.span("request"):
+            with tracing.span("validate", serializer="LoanTermSerializer"):
+                pass
+            with tracing.span("save"):
+                with tracing.span("bulk_create"):
+                    pass
+
+        lines = tracing.format_trace(stub_spans())
+
+        self.assertEqual(
+            [line.split(" ms  ")[1] for line in lines],
+            ["request", "validate  [serializer=LoanTermSerializer]", "save", "bulk_create"],
+        )
+        # Durations are right-aligned in 9 characters, after two spaces per level
+        self.assertEqual([line.index(" ms  ") for line in lines], [9, 11, 11, 13])
+
+    def test_show_trace_reads_the_span_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "traces.jsonl"
+            with override_settings(TRACING_EXPORTER="file", TRACING_FILE_PATH=str(path)):
+                for name in ("first", "second"):
+                    with tracing.span(name) as root:
+                        with tracing.span(f"{name}.child"):
+                            pass
+                tracing.flush()
+
+            out = StringIO()
+            call_command("show_trace", root.trace_id[:8], path=str(path), stdout=out)
+            self.assertIn(f"trace {root.trace_id}", out.getvalue())
+            self.assertIn("second.child", out.getvalue())
+            self.assertNotIn("first", out.getvalue())
+
+            out = StringIO()
+            call_command("show_trace", path=str(path), last=2, stdout=out)
+            self.assertEqual(out.getvalue().count("trace "), 2)
+
+
+@override_settings(
+    TRACING=True,
+    TRACING_EXPORTER="core.tests.test_tracing.BlockingExporter",
+    TRACING_QUEUE_SIZE=2,
+)
+class ExportQueueTests(SimpleTestCase):
+    def setUp(self):
+        BlockingExporter.started.clear()
+        BlockingExporter.release.clear()
+        BlockingExporter.exported.clear()
+        # Never leave the export thread stuck for the following tests
+        self.addCleanup(tracing.flush)
+        self.addCleanup(BlockingExporter.release.set)
+
+    def test_traces_are_exported_off_the_traced_thread(self):
+        start = time.monotonic()
+        with tracing.span("first"):
+            pass
+        self.assertTrue(BlockingExporter.started.wait(5))
+        # Two traces fit in the queue while the first one is being exported
+        for name in ("second", "third", "dropped"):
+            with tracing.span(name):
+                with tracing.span(f"{name}.child"):
+                    pass
+        self.assertLess(time.monotonic() - start, 1)
+
+        with self.assertLogs("core.tracing", "WARNING") as logs:
+            BlockingExporter.release.set()
+            tracing.flush()
+
+        self.assertEqual(
+            BlockingExporter.exported,
+            [["first"], ["second.child", "second", "third.child", "third"]],
+        )
+        self.assertIn("Dropped 1 traces", logs.output[0])
+
+    def test_flush_gives_up_after_its_timeout(self):
+        with tracing.span("first"):
+            pass
+        self.assertTrue(BlockingExporter.started.wait(5))
+        with tracing.span("second"):
+            pass
+
+        start = time.monotonic()
+        with self.assertLogs("core.tracing", "WARNING") as logs:
+            tracing.flush(timeout=0.1)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertIn("Dropped 1 traces not exported within 0.1 seconds", logs.output[0])
+
+        BlockingExporter.release.set()
+        tracing.flush()
+        self.assertEqual(BlockingExporter.exported, [["first"]])
+
+    def test_forked_process_starts_its_own_export_thread(self):
+        BlockingExporter.release.set()
+        with tracing.span("parent"):
+            pass
+        tracing.flush()
+        parent_thread = tracing._exporting["thread"]
+
+        with patch("core.tracing.os.getpid", return_value=os.getpid() + 1):
+            with tracing.span("child"):
+                pass
+            tracing.flush()
+            self.assertIsNot(tracing._exporting["thread"], parent_thread)
+            self.assertTrue(tracing._exporting["thread"].is_alive())
+        self.assertEqual(BlockingExporter.exported, [["parent"], ["child"]])
+
+
+@override_settings(TRACING=True, TRACING_EXPORTER="stub")
+class RequestTracingTests(BaseCreditSublineViewTests, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        credit_subline = CreditSubline.objects.create(
+            credit_line=cls.credit_line,
+            subline_type=cls.credit_type,
+            subline_amount=Decimal("1000"),
+            interest_rate=Decimal("0.05"),
+        )
+        cls.loan_term = LoanTerm.objects.create(
+            credit_subline=credit_subline,
+            term_length=12,
+            repayment_frequency="monthly",
+            payment_due_day=15,
+            start_date=timezone.now().date(),
+        )
+        cls.url = reverse(
+            "loan_management_api:loan_term_status_update",
+            kwargs={"loan_term_pk": cls.loan_term.pk},
+        )
+
+    def setUp(self):
+        super().setUp()
+        # Spans of the fixtures created with tracing on
+        tracing.StubExporter.exported.clear()
+        self.addCleanup(tracing.StubExporter.exported.clear)
+        self.client.force_authenticate(user=self.superuser)
+
+    def test_loan_term_approval_is_traced(self):
+        traceparent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        response = self.client.patch(
+            self.url, {"status": "approved"}, format="json", HTTP_TRACEPARENT=traceparent
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Trace-Id"], "4bf92f3577b34da6a3ce929d0e0e4736")
+
+        spans = stub_spans()
+        by_name = {span["name"]: span for span in spans}
+        self.assertEqual({span["trace_id"] for span in spans}, {response["X-Trace-Id"]})
+
+        root = by_name["PATCH loan_management_api:loan_term_status_update"]
+        self.assertEqual(root["parent_id"], "00f067aa0ba902b7")
+        self.assertEqual(root["kind"], "server")
+        self.assertEqual(root["attributes"]["http.status_code"], 200)
+
+        validate = by_name["serializer.is_valid"]
+        self.assertEqual(validate["attributes"]["serializer"], "UpdateLoanTermStatusSerializer")
+        save = by_name["serializer.save"]
+        pre_save = by_name["loan_management.signals.capture_previous_loan_term_status"]
+        self.assertEqual(pre_save["parent_id"], save["span_id"])
+        self.assertEqual(pre_save["attributes"]["db.queries"], 1)
+        post_save = by_name["loan_management.signals.generate_periodic_payments"]
+        schedule = by_name["loan_management.finance_utils.generate_amortization_schedule"]
+        bulk_create = by_name["loan_management.periodic_payments.bulk_create"]
+        self.assertEqual(schedule["parent_id"], post_save["span_id"])
+        self.assertEqual(bulk_create["parent_id"], post_save["span_id"])
+        self.assertEqual(
+            bulk_create["attributes"]["payments"], self.loan_term.payments.count()
+        )
+        self.assertIn("core.outbox.emit_event", by_name)
@@ -0,0 +1,586 @@
+"""
+Lightweight tracing, off unless TRACING is set.
+
+Code opens spans with the span() context manager or the traced() decorator;
+spans opened inside another one become its children, in the same trace.
+TracingMiddleware opens the root span of every request, under the trace id
+of an incoming W3C traceparent header or a new one, and returns the trace id
+in the X-Trace-Id header. Outside of requests, e.g. in management commands,
+the outermost span starts a trace.
+
+Besides the spans opened in the code:
+
+- DRF serializers' is_valid() and save() get a span each;
+- each span counts the queries it ran itself, and their time, in the
+  db.queries and db.duration_ms attributes.
+
+A trace is exported once its root span ends, with the TRACING_EXPORTER:
+
+- "file": one JSON line per span appended to TRACING_FILE_PATH;
+- "otlp": POSTed to TRACING_OTLP_URL in the OTLP/HTTP JSON encoding, for an
+  OpenTelemetry collector or `manage.py trace_collector`;
+- "stub": kept in memory, for tests;
+- or the dotted path to a class with export(spans).
+
+Ended traces go to a queue of at most TRACING_QUEUE_SIZE traces, so that
+exporting never delays the request that was traced. A daemon thread per
+process, started on the first trace of a process so that forked workers get
+their own, exports them in batches of up to TRACING_EXPORT_BATCH_SIZE traces.
+While the queue is full, e.g. with an unreachable collector, new traces are
+dropped and their number is logged. At exit, flush() exports what is queued
+for at most TRACING_FLUSH_TIMEOUT seconds and drops the rest. The "stub"
+exporter runs synchronously.
+
+Export errors are logged and never fail the traced code. `manage.py
+show_trace` prints traces of a JSON lines file as trees of durations.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_current_span = ContextVar("tracing_span", default=None)
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, attributes=None, kind="internal"):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.error = None
+        self.queries = 0
+        self.query_seconds = 0.0
+        # Spans of the trace that ended, shared by all its spans
+        self.finished = None
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self):
+        self.end_ns = self.start_ns + time.perf_counter_ns() - self._start
+        if self.queries:
+            self.attributes["db.queries"] = self.queries
+            self.attributes["db.duration_ms"] = round(self.query_seconds * 1000, 3)
+
+    @property
+    def duration_ms(self):
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def as_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": datetime.fromtimestamp(self.start_ns / 1e9, timezone.utc).isoformat(),
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "service": settings.TRACING_SERVICE_NAME,
+        }
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_trace_id():
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time the block as a span, child of the current span if there is one.
+    Yields the span, or None when tracing is off.
+    """
+    if not settings.TRACING:
+        yield None
+        return
+    parent = _current_span.get()
+    if parent is None:
+        with _root_span(name, attributes) as root:
+            yield root
+        return
+
+    child = Span(name, parent.trace_id, parent.span_id, attributes)
+    child.finished = parent.finished
+    with _activate(child):
+        yield child
+
+
+@contextmanager
+def _root_span(name, attributes, traceparent=None, kind="internal"):
+    trace_id, parent_id = secrets.token_hex(16), None
+    match = TRACEPARENT_RE.match(traceparent or "")
+    if match and match.group(1) != "0" * 32:
+        trace_id, parent_id = match.groups()
+    root = Span(name, trace_id, parent_id, attributes, kind=kind)
+    root.finished = []
+    try:
+        with _activate(root):
+            yield root
+    finally:
+        export(root.finished)
+
+
+@contextmanager
+def _activate(current):
+    token = _current_span.set(current)
+    try:
+        yield
+    except BaseException as exc:
+        current.status = "error"
+        current.error = f"{type(exc).__name__}: {exc}"[:500]
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+        current.finished.append(current)
+
+
+@contextmanager
+def request_span(request):
+    """
+    Root span of a request, continuing the trace of its traceparent header.
+    """
+    with _root_span(
+        f"{request.method} {request.path}",
+        {"http.method": request.method, "http.target": request.get_full_path()},
+        traceparent=request.headers.get("traceparent"),
+        kind="server",
+    ) as root:
+        yield root
+
+
+def traced(name=None):
+    """
+    Decorator running each call of the function in a span named after the
+    function unless name is given.
+    """
+
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not settings.TRACING:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def tracing_query_wrapper(execute, sql, params, many, context):
+    """
+    Count the queries run by the innermost span and their time.
+    """
+    current = _current_span.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.queries += 1
+        current.query_seconds += time.perf_counter() - start
+
+
+def install_wrapper(sender, connection, **kwargs):
+    """
+    connection_created receiver adding the tracing query wrapper.
+    """
+    if tracing_query_wrapper not in connection.execute_wrappers:
+        # First in the list, like the slow query wrapper, so execute_wrapper()
+        # blocks never remove it.
+        connection.execute_wrappers.insert(0, tracing_query_wrapper)
+
+
+def _traced_serializer_call(method, operation):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if _current_span.get() is None:
+            return method(self, *args, **kwargs)
+        with span(f"serializer.{operation}", serializer=type(self).__name__):
+            return method(self, *args, **kwargs)
+
+    wrapper.tracing_traced = True
+    return wrapper
+
+
+def instrument_serializers():
+    """
+    Trace BaseSerializer.is_valid() and save(), which every DRF serializer
+    goes through.
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    if getattr(BaseSerializer.save, "tracing_traced", False):
+        return
+    BaseSerializer.is_valid = _traced_serializer_call(BaseSerializer.is_valid, "is_valid")
+    BaseSerializer.save = _traced_serializer_call(BaseSerializer.save, "save")
+
+
+class FileExporter:
+    """
+    Appends spans as JSON lines to a local file.
+    """
+
+    def __init__(self, target=None):
+        self.path = target or settings.TRACING_FILE_PATH
+
+    def export(self, spans):
+        with open(self.path, "a", encoding="utf-8") as outfile:
+            for finished in spans:
+                outfile.write(json.dumps(finished.as_dict(), cls=DjangoJSONEncoder))
+                outfile.write("\n")
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # 64-bit integers are strings in the JSON encoding
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes):
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+# OTLP span kinds and status codes
+OTLP_KINDS = {"internal": 1, "server": 2}
+OTLP_STATUS = {"ok": 1, "error": 2}
+
+
+def otlp_payload(spans):
+    """
+    Spans in the OTLP/HTTP JSON encoding of an ExportTraceServiceRequest.
+    """
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": _otlp_attributes(
+                        {"service.name": settings.TRACING_SERVICE_NAME}
+                    )
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [
+                            {
+                                "traceId": finished.trace_id,
+                                "spanId": finished.span_id,
+                                "parentSpanId": finished.parent_id or "",
+                                "name": finished.name,
+                                "kind": OTLP_KINDS[finished.kind],
+                                "startTimeUnixNano": str(finished.start_ns),
+                                "endTimeUnixNano": str(finished.end_ns),
+                                "attributes": _otlp_attributes(finished.attributes),
+                                "status": {
+                                    "code": OTLP_STATUS[finished.status],
+                                    "message": finished.error or "",
+                                },
+                            }
+                            for finished in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def _from_otlp_value(value):
+    if "intValue" in value:
+        return int(value["intValue"])
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    return json.dumps(value)
+
+
+def spans_from_otlp(payload):
+    """
+    Span records, as FileExporter writes them, of an OTLP/HTTP JSON export
+    request.
+    """
+    kinds = {code: kind for kind, code in OTLP_KINDS.items()}
+    records = []
+    for resource_spans in payload.get("resourceSpans", ()):
+        resource = {
+            attribute["key"]: _from_otlp_value(attribute["value"])
+            for attribute in resource_spans.get("resource", {}).get("attributes", ())
+        }
+        for scope_spans in resource_spans.get("scopeSpans", ()):
+            for otlp_span in scope_spans.get("spans", ()):
+                start_ns = int(otlp_span["startTimeUnixNano"])
+                status = otlp_span.get("status", {})
+                records.append(
+                    {
+                        "trace_id": otlp_span["traceId"],
+                        "span_id": otlp_span["spanId"],
+                        "parent_id": otlp_span.get("parentSpanId") or None,
+                        "name": otlp_span["name"],
+                        "kind": kinds.get(otlp_span.get("kind"), "internal"),
+                        "start": datetime.fromtimestamp(
+                            start_ns / 1e9, timezone.utc
+                        ).isoformat(),
+                        "duration_ms": round(
+                            (int(otlp_span["endTimeUnixNano"]) - start_ns) / 1e6, 3
+                        ),
+                        "status": "error" if status.get("code") == 2 else "ok",
+                        "error": status.get("message") or None,
+                        "attributes": {
+                            attribute["key"]: _from_otlp_value(attribute["value"])
+                            for attribute in otlp_span.get("attributes", ())
+                        },
+                        "service": resource.get("service.name"),
+                    }
+                )
+    return records
+
+
+class OtlpExporter:
+    """
+    POSTs each trace to an OTLP/HTTP collector; any non-2xx response fails
+    the export.
+    """
+
+    def __init__(self, target=None, timeout=None):
+        self.url = target or settings.TRACING_OTLP_URL
+        self.timeout = timeout or settings.TRACING_OTLP_TIMEOUT
+
+    def export(self, spans):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(otlp_payload(spans), cls=DjangoJSONEncoder).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class StubExporter:
+    """
+    Keeps exported spans in memory, as dicts; for local runs and tests.
+    """
+
+    # Exported in the traced thread, so that tests see the spans at once
+    synchronous = True
+    exported = []
+
+    def __init__(self, target=None):
+        pass
+
+    def export(self, spans):
+        StubExporter.exported.extend(finished.as_dict() for finished in spans)
+
+
+EXPORTERS = {
+    "file": FileExporter,
+    "otlp": OtlpExporter,
+    "stub": StubExporter,
+}
+
+
+def get_exporter(name, target=None):
+    """
+    Instantiate an exporter by short name or dotted path to a class with
+    export(spans).
+    """
+    return _exporter_class(name)(target)
+
+
+def _exporter_class(name):
+    return EXPORTERS.get(name) or import_string(name)
+
+
+_export_lock = threading.Lock()
+_exporting = {"pid": None, "queue": None, "thread": None, "dropped": 0}
+
+
+def _export_queue():
+    # Threads do not survive fork: a worker forked from a preloading gunicorn
+    # master starts its own export thread and queue.
+    with _export_lock:
+        if _exporting["pid"] != os.getpid():
+            traces = queue.Queue()
+            thread = threading.Thread(
+                target=_export_loop, args=(traces,), name="trace-export", daemon=True
+            )
+            thread.start()
+            _exporting.update(pid=os.getpid(), queue=traces, thread=thread, dropped=0)
+        return _exporting["queue"]
+
+
+def _export_loop(traces):
+    while True:
+        batch = [traces.get()]
+        while len(batch) < settings.TRACING_EXPORT_BATCH_SIZE:
+            try:
+                batch.append(traces.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _export_now([finished for trace in batch for finished in trace])
+        finally:
+            for _ in batch:
+                traces.task_done()
+
+
+def _export_now(spans):
+    try:
+        get_exporter(settings.TRACING_EXPORTER).export(spans)
+    except Exception:
+        logger.exception("Could not export %d spans", len(spans))
+    with _export_lock:
+        dropped, _exporting["dropped"] = _exporting["dropped"], 0
+    if dropped:
+        logger.warning("Dropped %d traces while the export queue was full", dropped)
+
+
+def export(spans):
+    """
+    Queue the spans of an ended trace for export, or export them right away
+    with a synchronous exporter.
+    """
+    if not spans:
+        return
+    try:
+        synchronous = getattr(_exporter_class(settings.TRACING_EXPORTER), "synchronous", False)
+    except ImportError:
+        # Logged by the export thread
+        synchronous = False
+    if synchronous:
+        _export_now(spans)
+        return
+    traces = _export_queue()
+    # Checked rather than a bounded Queue, so that the size follows settings
+    if traces.qsize() >= settings.TRACING_QUEUE_SIZE:
+        with _export_lock:
+            _exporting["dropped"] += 1
+        return
+    traces.put(spans)
+
+
+def flush(timeout=None):
+    """
+    Wait until the traces queued by this process are exported, for at most
+    timeout seconds (TRACING_FLUSH_TIMEOUT by default). The traces still
+    queued then are dropped and counted in the log.
+    """
+    if timeout is None:
+        timeout = settings.TRACING_FLUSH_TIMEOUT
+    with _export_lock:
+        traces = _exporting["queue"] if _exporting["pid"] == os.getpid() else None
+    if traces is None:
+        return
+    deadline = time.monotonic() + timeout
+    with traces.all_tasks_done:
+        while traces.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            traces.all_tasks_done.wait(remaining)
+        else:
+            return
+    dropped = 0
+    while True:
+        try:
+            traces.get_nowait()
+        except queue.Empty:
+            break
+        traces.task_done()
+        dropped += 1
+    logger.warning(
+        "Dropped %d traces not exported within %s seconds", dropped, timeout
+    )
+
+
+# Export what is left when a management command or worker exits, within the
+# flush timeout so that a worker never outlives gunicorn's graceful_timeout
+atexit.register(flush)
+
+
+def read_spans(path=None):
+    """
+    Spans of a JSON lines file written by FileExporter or trace_collector,
+    grouped by trace id in the order of their first span.
+    """
+    traces = {}
+    try:
+        with open(path or settings.TRACING_FILE_PATH, encoding="utf-8") as infile:
+            for line in infile:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                traces.setdefault(record["trace_id"], []).append(record)
+    except FileNotFoundError:
+        pass
+    return traces
+
+
+def format_trace(spans):
+    """
+    Lines of a trace as an indented tree of span durations.
+    """
+    children = {}
+    ids = {record["span_id"] for record in spans}
+    for record in sorted(spans, key=lambda record: record["start"]):
+        parent = record["parent_id"] if record["parent_id"] in ids else None
+        children.setdefault(parent, []).append(record)
+
+    lines = []
+
+    def walk(parent, depth):
+        for record in children.get(parent, ()):
+            attributes = ", ".join(
+                f"{key}={value}" for key, value in record["attributes"].items()
+            )
+            error = f" ERROR {record['error']}" if record["status"] == "error" else ""
+            lines.append(
+                f"{'  ' * depth}{record['duration_ms']:9.3f} ms  {record['name']}"
+                f"{f'  [{attributes}]' if attributes else ''}{error}"
+            )
+            walk(record["span_id"], depth + 1)
+
+    walk(None, 0)
+    return lines
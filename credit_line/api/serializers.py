@@ -22,8 +22,16 @@ class CreditLineSerializer(serializers.ModelSerializer):
             "status",
             "user",
             "created",
+            "committed_amount",
+            "available_amount",
         ]
-        read_only_fields = ("id", "created", "status")
+        read_only_fields = (
+            "id",
+            "created",
+            "status",
+            "committed_amount",
+            "available_amount",
+        )
 
     def validate_credit_limit(self, value):
         """
@@ -6,7 +6,11 @@ from rest_framework.response import Response
 from rest_framework import status
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from credit_line.models import CreditLine, CreditLineAdjustment
+from credit_line.models import (
+    CreditLine,
+    CreditLineAdjustment,
+    credit_line_cache_namespace,
+)
 from credit_line.api.serializers import (
     CreditLineSerializer,
     CreditLineAdjustmentSerializer,
@@ -16,6 +20,8 @@ from credit_origination.api.views import page_param, page_size_param, status_par
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 from accounts.api.permissions import IsSuperUser
+from core.cache import get_or_set
+from core.db.routers import read_from_replica
 
 
 class CreditLinesPagination(PageNumberPagination):
@@ -52,15 +58,25 @@ def get_credit_line(request, pk):
     """
     user = request.user
 
-    try:
+    def serialize_credit_line():
         credit_line = CreditLine.objects.get(pk=pk, user=user.id)
+        return CreditLineSerializer(credit_line).data
+
+    try:
+        # Invalidated by CreditLine saves and credit reservations; never served
+        # from another worker's stale locmem copy after an adjustment
+        data = get_or_set(
+            credit_line_cache_namespace(pk),
+            [user.id],
+            serialize_credit_line,
+            shared_only=True,
+        )
     except CreditLine.DoesNotExist:
         return Response(
             {"error": "Credit line not found."}, status=status.HTTP_404_NOT_FOUND
         )
 
-    serializer = CreditLineSerializer(credit_line)
-    return Response(serializer.data)
+    return Response(data)
 
 
 @swagger_auto_schema(
@@ -70,6 +86,7 @@ def get_credit_line(request, pk):
 )
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
+@read_from_replica
 def credit_lines_admin_list(request):
     """
     Credit Lines Admin List.
@@ -165,6 +182,22 @@ def credit_line_adjustment_status_update(request, pk):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    # Check that an approved new limit still covers the committed credit
+    if (
+        request.data.get("adjustment_status") == "approved"
+        and adjustment.new_credit_limit is not None
+        and adjustment.new_credit_limit < adjustment.credit_line.committed_amount
+    ):
+        return Response(
+            {
+                "error": (
+                    "The new credit limit is lower than the amount committed "
+                    "to the credit line's sublines."
+                )
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
     serializer = CreditLineAdjustmentStatusSerializer(
         adjustment, data=request.data, partial=True
     )
@@ -194,6 +227,7 @@ def credit_line_adjustment_status_update(request, pk):
 )
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
+@read_from_replica
 def credit_line_adjustments_admin_list(request):
     """
     Retrieves the list of all credit line adjustments with pagination support.
@@ -201,7 +235,9 @@ def credit_line_adjustments_admin_list(request):
     Access is restricted to staff members only.
     """
     paginator = CreditLineAdjustmentsPagination()
-    query_set = CreditLineAdjustment.objects.all().order_by("-adjustment_date")
+    query_set = CreditLineAdjustment.objects.select_related("credit_line").order_by(
+        "-adjustment_date"
+    )
 
     page = paginator.paginate_queryset(query_set, request)
     if page is not None:
@@ -0,0 +1,40 @@
+"""
+Django command to create credit lines for approved credit requests.
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from credit_line.provisioning import provision_credit_lines
+
+
+class Command(BaseCommand):
+    """Django command to consume credit request approvals from the outbox."""
+
+    help = "Create credit lines for approved credit requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--settle-seconds", type=int, default=5)
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling for new approvals."
+        )
+        parser.add_argument("--interval", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        total = 0
+        while True:
+            consumed = provision_credit_lines(
+                batch_size=options["batch_size"],
+                settle_seconds=options["settle_seconds"],
+            )
+            total += consumed
+            if consumed:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Processed {total} credit request approvals.")
+        )
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.6 on 2026-10-19 07:42
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_committed_and_available(apps, schema_editor):
+    CreditLine = apps.get_model("credit_line", "CreditLine")
+    CreditSubline = apps.get_model("credit_subline", "CreditSubline")
+
+    committed = (
+        CreditSubline.objects.filter(credit_line=OuterRef("pk"))
+        .values("credit_line")
+        .annotate(total=Sum("subline_amount"))
+        .values("total")
+    )
+    CreditLine.objects.update(
+        committed_amount=Coalesce(
+            Subquery(committed, output_field=models.DecimalField()),
+            Value(0, output_field=models.DecimalField()),
+        )
+    )
+    CreditLine.objects.update(
+        available_amount=F("credit_limit") - F("committed_amount")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_line', '0003_alter_creditlineadjustment_previous_end_date'),
+        ('credit_subline', '0006_backfill_adjustment_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='creditline',
+            name='available_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='creditline',
+            name='committed_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_committed_and_available, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-19 09:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_line', '0004_creditline_committed_available_amount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='creditline',
+            index=models.Index(fields=['-created'], name='credit_line_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditline',
+            index=models.Index(fields=['status', '-created'], name='credit_line_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditlineadjustment',
+            index=models.Index(fields=['-adjustment_date'], name='line_adjustment_date_idx'),
+        ),
+    ]
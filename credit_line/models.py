@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from core.cache import invalidate
 
 User = get_user_model()
 
@@ -10,6 +12,47 @@ def current_date():
     return timezone.now().date()
 
 
+def credit_line_cache_namespace(pk):
+    return f"credit_line:{pk}"
+
+
+class CreditLineManager(models.Manager):
+    def reserve_credit(self, pk, amount):
+        """
+        Commit an amount against a credit line's available credit.
+
+        The limit check and the update happen in one conditional UPDATE, so
+        concurrent reservations can never overdraw the line. Returns False,
+        leaving the line untouched, when the amount does not fit.
+        """
+        reserved = self.filter(pk=pk, available_amount__gte=amount).update(
+            committed_amount=F("committed_amount") + amount,
+            available_amount=F("available_amount") - amount,
+        )
+        if reserved:
+            invalidate(credit_line_cache_namespace(pk))
+        return reserved == 1
+
+    def adjust_committed_credit(self, pk, delta):
+        """
+        Shift a credit line's committed amount by delta, e.g. for approved
+        amount adjustments. Increases are checked against the available
+        credit in the same conditional UPDATE as reserve_credit(); releases
+        (a negative delta) always apply. Returns False, leaving the line
+        untouched, when an increase does not fit.
+        """
+        lines = self.filter(pk=pk)
+        if delta > 0:
+            lines = lines.filter(available_amount__gte=delta)
+        adjusted = lines.update(
+            committed_amount=F("committed_amount") + delta,
+            available_amount=F("available_amount") - delta,
+        )
+        if adjusted:
+            invalidate(credit_line_cache_namespace(pk))
+        return adjusted == 1 or delta <= 0
+
+
 class CreditLine(models.Model):
     CREDIT_LINE_STATUS = (
         ("pending", "Pending"),
@@ -32,6 +75,15 @@ class CreditLine(models.Model):
         User,
         on_delete=models.CASCADE,
     )
+    # Sum of the subline amounts drawn from this line and what is left of the
+    # credit limit. Both are maintained with F() expressions by CreditLineManager,
+    # so regular saves never write them back from (possibly stale) instances.
+    committed_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    available_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    MATERIALIZED_FIELDS = ("committed_amount", "available_amount")
+
+    objects = CreditLineManager()
 
     def clean(self):
         # Custom validation for the credit limit
@@ -46,13 +98,56 @@ class CreditLine(models.Model):
                 {"credit_limit": "Credit limit must not exceed 12 digits."}
             )
 
+        # The limit cannot drop below what the sublines already draw from it
+        if self.credit_limit is not None and self.credit_limit < self.committed_amount:
+            raise ValidationError(
+                {
+                    "credit_limit": (
+                        "Credit limit cannot be lower than the committed amount."
+                    )
+                }
+            )
+
         # Validate start_date and end_date if both are present
         if self.end_date and self.start_date >= self.end_date:
             raise ValidationError({"period": "Start date must be before the end date."})
 
     def save(self, *args, **kwargs):
         self.full_clean()  # Ensures clean() is called before saving
-        super().save(*args, **kwargs)
+
+        if self._state.adding:
+            self.available_amount = self.credit_limit - self.committed_amount
+            super().save(*args, **kwargs)
+            return
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MATERIALIZED_FIELDS
+            ]
+        else:
+            update_fields = [
+                name for name in update_fields if name not in self.MATERIALIZED_FIELDS
+            ]
+        kwargs["update_fields"] = update_fields
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Checked again in the UPDATE: this instance's committed amount
+            # may be stale
+            if "credit_limit" in update_fields and not CreditLine.objects.filter(
+                pk=self.pk, committed_amount__lte=F("credit_limit")
+            ).update(available_amount=F("credit_limit") - F("committed_amount")):
+                raise ValidationError(
+                    {
+                        "credit_limit": (
+                            "Credit limit cannot be lower than the committed amount."
+                        )
+                    }
+                )
+        invalidate(credit_line_cache_namespace(self.pk))
 
     def __str__(self):
         return f"{self.user} - {self.credit_limit}"
@@ -87,6 +182,11 @@ class CreditLine(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        # The admin list pages through the newest lines, optionally by status
+        indexes = [
+            models.Index(fields=["-created"], name="credit_line_created_idx"),
+            models.Index(fields=["status", "-created"], name="credit_line_status_idx"),
+        ]
 
 
 class CreditLineAdjustment(models.Model):
@@ -158,3 +258,6 @@ class CreditLineAdjustment(models.Model):
 
     class Meta:
         ordering = ["-adjustment_date"]
+        indexes = [
+            models.Index(fields=["-adjustment_date"], name="line_adjustment_date_idx"),
+        ]
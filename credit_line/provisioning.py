@@ -0,0 +1,60 @@
+"""
+Credit line provisioning worker.
+
+Approving a credit request only appends a "credit_request.approved" event
+to the outbox. This worker consumes those events in batches and creates the
+missing credit lines with a single bulk INSERT, so approval latency does not
+depend on credit line creation.
+"""
+
+from decimal import Decimal
+from django.db import transaction
+from credit_line.models import CreditLine
+from core.outbox import pending_events, advance_cursor
+
+PROVISIONING_CONSUMER = "credit_line_provisioning"
+APPROVED_TOPIC = "credit_request.approved"
+
+
+def build_credit_line(event):
+    amount = Decimal(event.payload["amount"])
+    return CreditLine(
+        user_id=event.payload["user_id"],
+        credit_limit=amount,
+        available_amount=amount,
+        start_date=event.created.date(),
+        status="pending",
+    )
+
+
+def provision_credit_lines(batch_size=1000, settle_seconds=0):
+    """
+    Create credit lines for the next batch of approved credit requests.
+    Returns the number of events consumed.
+
+    Users who already have a credit line keep it: the unique user key makes
+    the INSERT skip them (ignore_conflicts), and within a batch the earliest
+    approval wins, as it did when lines were created on approval.
+    """
+    with transaction.atomic():
+        cursor, events = pending_events(
+            PROVISIONING_CONSUMER,
+            batch_size,
+            topics=[APPROVED_TOPIC],
+            settle_seconds=settle_seconds,
+        )
+        if not events:
+            return 0
+
+        credit_lines = {}
+        for event in events:
+            user_id = event.payload["user_id"]
+            if user_id not in credit_lines:
+                credit_lines[user_id] = build_credit_line(event)
+
+        # bulk_create skips save() and full_clean(); the amounts were already
+        # validated on the credit request and the user key is enforced by the
+        # database.
+        CreditLine.objects.bulk_create(credit_lines.values(), ignore_conflicts=True)
+        advance_cursor(cursor, events)
+    return len(events)
@@ -1,7 +1,16 @@
+from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from credit_line.models import CreditLineAdjustment
+from core.tracing import traced
+from credit_line.models import (
+    CreditLine,
+    CreditLineAdjustment,
+    credit_line_cache_namespace,
+)
+from credit_subline.ledger import record_adjustment, record_deletion
+from core.outbox import emit_event
+from core.cache import invalidate
 from django.utils import timezone
 
 # This dictionary will hold the previous status values temporarily
@@ -9,6 +18,7 @@ _previous__adjustment_statuses = {}
 
 
 @receiver(pre_save, sender=CreditLineAdjustment)
+@traced()
 def capture_previous_adjustment_status(sender, instance, **kwargs):
     if instance.pk:
         try:
@@ -21,40 +31,76 @@ def capture_previous_adjustment_status(sender, instance, **kwargs):
 
 
 @receiver(post_save, sender=CreditLineAdjustment)
+@traced()
 def update_credit_line_on_approval(sender, instance, **kwargs):
     previous_status = _previous__adjustment_statuses.pop(instance.pk, None)
 
     if instance.adjustment_status == "approved" and previous_status != "approved":
 
         def process_adjustment():
-            with transaction.atomic():
-                adjustment_data = {}
-
-                # Check each field for changes and add them to the adjustment_data if not None
-                if instance.new_credit_limit is not None:
-                    adjustment_data["credit_limit"] = instance.new_credit_limit
-                if instance.new_end_date is not None:
-                    adjustment_data["end_date"] = instance.new_end_date
-                if instance.new_status is not None:
-                    adjustment_data["status"] = instance.new_status
-                if instance.new_currency is not None:
-                    adjustment_data["currency"] = instance.new_currency
-
-                # Only make adjustments if there's actually something to adjust
-                if adjustment_data:
-                    # Use update_only=True to directly update the CreditLine
-                    instance.credit_line.make_adjustment(
-                        adjustment_data,
-                        "Automatic adjustment on approval",
-                        update_only=True,
-                    )
+            try:
+                with transaction.atomic():
+                    adjustment_data = {}
 
-                    # Now update the adjustment_date on the CreditLineAdjustment instance
-                    # to the current date, since all adjustments are implemented
-                    instance.adjustment_status = "implemented"
-                    instance.adjustment_date = timezone.now().date()
-                    instance.save()
+                    # Check each field for changes and add them to the adjustment_data if not None
+                    if instance.new_credit_limit is not None:
+                        adjustment_data["credit_limit"] = instance.new_credit_limit
+                    if instance.new_end_date is not None:
+                        adjustment_data["end_date"] = instance.new_end_date
+                    if instance.new_status is not None:
+                        adjustment_data["status"] = instance.new_status
+                    if instance.new_currency is not None:
+                        adjustment_data["currency"] = instance.new_currency
 
-            # Schedule the adjustment to be processed after the transaction commits
+                    # Only make adjustments if there's actually something to adjust
+                    if adjustment_data:
+                        # Use update_only=True to directly update the CreditLine
+                        instance.credit_line.make_adjustment(
+                            adjustment_data,
+                            "Automatic adjustment on approval",
+                            update_only=True,
+                        )
 
+                        # Now update the adjustment_date on the CreditLineAdjustment instance
+                        # to the current date, since all adjustments are implemented
+                        instance.adjustment_status = "implemented"
+                        instance.adjustment_date = timezone.now().date()
+                        instance.save()
+
+                        emit_event(
+                            "credit_line.adjustment_implemented",
+                            instance,
+                            {"credit_line_id": instance.credit_line_id, **adjustment_data},
+                        )
+            except ValidationError as error:
+                # A credit limit lowered below what sublines reserved since the
+                # approval was checked; the approval committed, so reject it.
+                with transaction.atomic():
+                    instance.adjustment_status = "rejected"
+                    instance.save()
+                    emit_event(
+                        "credit_line.adjustment_rejected",
+                        instance,
+                        {"credit_line_id": instance.credit_line_id, "errors": error.messages},
+                    )
+
+        # Schedule the adjustment to be processed after the transaction commits
         transaction.on_commit(process_adjustment)
+
+
+@receiver(post_save, sender=CreditLineAdjustment)
+@traced()
+def record_credit_line_adjustment(sender, instance, created, **kwargs):
+    record_adjustment("credit_line", instance, created)
+
+
+@receiver(post_delete, sender=CreditLineAdjustment)
+@traced()
+def record_credit_line_adjustment_deletion(sender, instance, **kwargs):
+    record_deletion("credit_line", instance, kwargs.get("origin"))
+
+
+@receiver(post_delete, sender=CreditLine)
+@traced()
+def invalidate_deleted_credit_line_cache(sender, instance, **kwargs):
+    invalidate(credit_line_cache_namespace(instance.pk))
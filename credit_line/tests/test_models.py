@@ -1,5 +1,6 @@
 from accounts.tests.base_test import BaseTest
 from credit_line.models import CreditLine, CreditLineAdjustment
+from core.models import OutboxEvent
 from decimal import Decimal
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
@@ -217,3 +218,118 @@ class CreditLineAdjustmentTest(BaseTest):
         adjustment.adjustment_status = "approved"
         adjustment.save()
         self.assertEqual(adjustment.adjustment_status, "approved")
+
+
+class CreditLineAvailableCreditTest(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.credit_line = CreditLine.objects.create(
+            credit_limit=Decimal("10000.00"),
+            start_date=timezone.now().date(),
+            user=self.user,
+        )
+
+    def test_new_credit_line_is_fully_available(self):
+        self.assertEqual(self.credit_line.committed_amount, Decimal("0"))
+        self.assertEqual(self.credit_line.available_amount, Decimal("10000.00"))
+
+    def test_reserve_credit_within_limit(self):
+        self.assertTrue(
+            CreditLine.objects.reserve_credit(self.credit_line.pk, Decimal("4000"))
+        )
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.committed_amount, Decimal("4000.00"))
+        self.assertEqual(self.credit_line.available_amount, Decimal("6000.00"))
+
+    def test_reserve_credit_over_limit_leaves_line_untouched(self):
+        self.assertFalse(
+            CreditLine.objects.reserve_credit(self.credit_line.pk, Decimal("10000.01"))
+        )
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.committed_amount, Decimal("0"))
+        self.assertEqual(self.credit_line.available_amount, Decimal("10000.00"))
+
+    def test_save_does_not_overwrite_committed_amount(self):
+        stale = CreditLine.objects.get(pk=self.credit_line.pk)
+        CreditLine.objects.reserve_credit(self.credit_line.pk, Decimal("4000"))
+
+        stale.status = "approved"
+        stale.save()
+
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.status, "approved")
+        self.assertEqual(self.credit_line.committed_amount, Decimal("4000.00"))
+
+    def test_credit_limit_change_recomputes_available_amount(self):
+        CreditLine.objects.reserve_credit(self.credit_line.pk, Decimal("4000"))
+        self.credit_line.make_adjustment(
+            {"credit_limit": Decimal("15000.00")}, "Increase", update_only=True
+        )
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.available_amount, Decimal("11000.00"))
+
+    def test_credit_limit_below_committed_amount_is_rejected(self):
+        CreditLine.objects.reserve_credit(self.credit_line.pk, Decimal("4000"))
+        self.credit_line.refresh_from_db()
+        with self.assertRaises(ValidationError) as context:
+            self.credit_line.make_adjustment(
+                {"credit_limit": Decimal("3999.99")}, "Decrease", update_only=True
+            )
+        self.assertIn("credit_limit", context.exception.message_dict)
+
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.credit_limit, Decimal("10000.00"))
+        self.assertEqual(self.credit_line.available_amount, Decimal("6000.00"))
+
+    def test_stale_instance_cannot_lower_limit_below_committed_amount(self):
+        stale = CreditLine.objects.get(pk=self.credit_line.pk)
+        CreditLine.objects.reserve_credit(self.credit_line.pk, Decimal("4000"))
+
+        stale.credit_limit = Decimal("3000.00")
+        with self.assertRaises(ValidationError):
+            stale.save()
+
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.credit_limit, Decimal("10000.00"))
+        self.assertEqual(self.credit_line.available_amount, Decimal("6000.00"))
+
+    def test_approved_limit_below_committed_amount_is_rejected(self):
+        adjustment = CreditLineAdjustment.objects.create(
+            credit_line=self.credit_line,
+            new_credit_limit=Decimal("5000.00"),
+            reason="Decrease",
+        )
+        # Reserved by a subline after the approval was checked
+        CreditLine.objects.reserve_credit(self.credit_line.pk, Decimal("6000"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            adjustment.adjustment_status = "approved"
+            adjustment.save()
+
+        adjustment.refresh_from_db()
+        self.assertEqual(adjustment.adjustment_status, "rejected")
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.credit_limit, Decimal("10000.00"))
+        event = OutboxEvent.objects.get(topic="credit_line.adjustment_rejected")
+        self.assertEqual(event.payload["credit_line_id"], self.credit_line.pk)
+
+    def test_adjust_committed_credit_checks_increases_only(self):
+        CreditLine.objects.reserve_credit(self.credit_line.pk, Decimal("4000"))
+
+        self.assertFalse(
+            CreditLine.objects.adjust_committed_credit(
+                self.credit_line.pk, Decimal("6000.01")
+            )
+        )
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.available_amount, Decimal("6000.00"))
+
+        self.assertTrue(
+            CreditLine.objects.adjust_committed_credit(self.credit_line.pk, Decimal("6000"))
+        )
+        self.assertTrue(
+            CreditLine.objects.adjust_committed_credit(self.credit_line.pk, Decimal("-2000"))
+        )
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.committed_amount, Decimal("8000.00"))
+        self.assertEqual(self.credit_line.available_amount, Decimal("2000.00"))
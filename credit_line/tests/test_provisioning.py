@@ -0,0 +1,78 @@
+from accounts.tests.base_test import BaseTest
+from core.models import OutboxCursor
+from credit_line.models import CreditLine
+from credit_line.provisioning import provision_credit_lines, PROVISIONING_CONSUMER
+from credit_origination.models import CreditRequest
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+
+
+class CreditLineProvisioningTests(BaseTest):
+    def approve(self, user, amount):
+        credit_request = CreditRequest.objects.create(
+            user=user,
+            credit_type=self.credit_type,
+            amount=amount,
+            term=12,
+            status="pending",
+        )
+        credit_request.status = "approved"
+        credit_request.save()
+        return credit_request
+
+    def test_creates_lines_for_a_batch_of_approvals(self):
+        self.approve(self.user, Decimal("10000"))
+        self.approve(self.admin_user, Decimal("25000"))
+
+        self.assertEqual(provision_credit_lines(), 2)
+
+        lines = {line.user_id: line for line in CreditLine.objects.all()}
+        self.assertEqual(set(lines), {self.user.pk, self.admin_user.pk})
+        admin_line = lines[self.admin_user.pk]
+        self.assertEqual(admin_line.credit_limit, Decimal("25000"))
+        self.assertEqual(admin_line.available_amount, Decimal("25000"))
+        self.assertEqual(admin_line.committed_amount, Decimal("0"))
+        self.assertEqual(admin_line.status, "pending")
+        self.assertEqual(admin_line.start_date, timezone.now().date())
+
+    def test_existing_line_is_kept(self):
+        CreditLine.objects.create(
+            user=self.user,
+            credit_limit=Decimal("5000"),
+            start_date=timezone.now().date(),
+        )
+        self.approve(self.user, Decimal("10000"))
+
+        self.assertEqual(provision_credit_lines(), 1)
+
+        line = CreditLine.objects.get(user=self.user)
+        self.assertEqual(line.credit_limit, Decimal("5000"))
+
+    def test_first_approval_in_batch_wins(self):
+        self.approve(self.user, Decimal("10000"))
+        self.approve(self.user, Decimal("20000"))
+
+        provision_credit_lines()
+
+        line = CreditLine.objects.get(user=self.user)
+        self.assertEqual(line.credit_limit, Decimal("10000"))
+
+    def test_events_are_consumed_once(self):
+        self.approve(self.user, Decimal("10000"))
+
+        self.assertEqual(provision_credit_lines(batch_size=10), 1)
+        self.assertEqual(provision_credit_lines(batch_size=10), 0)
+        self.assertGreater(
+            OutboxCursor.objects.get(consumer=PROVISIONING_CONSUMER).last_event_id, 0
+        )
+
+    def test_command(self):
+        self.approve(self.user, Decimal("10000"))
+        out = StringIO()
+
+        call_command("provision_credit_lines", settle_seconds=0, stdout=out)
+
+        self.assertIn("Processed 1 credit request approvals.", out.getvalue())
+        self.assertTrue(CreditLine.objects.filter(user=self.user).exists())
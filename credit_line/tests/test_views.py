@@ -1,5 +1,7 @@
+import tempfile
 from rest_framework.test import APITestCase
 from rest_framework import status
+from django.test import override_settings
 from django.urls import reverse
 from accounts.tests.base_test import BaseTest
 from credit_line.models import CreditLine, CreditLineAdjustment
@@ -8,6 +10,9 @@ from decimal import Decimal
 from django.utils import timezone
 from datetime import timedelta
 
+# Shared by every process, like redis
+SHARED_CACHE = "django.core.cache.backends.filebased.FileBasedCache"
+
 
 class CreditLineViewsTest(BaseTest, APITestCase):
     def setUp(self):
@@ -32,6 +37,44 @@ class CreditLineViewsTest(BaseTest, APITestCase):
         serializer = CreditLineSerializer(self.credit_line)
         self.assertEqual(response.data, serializer.data)
 
+    def test_get_credit_line_reflects_reservations(self):
+        url = reverse(
+            "credit_line_api:get_credit_line", kwargs={"pk": self.credit_line.id}
+        )
+        self.assertEqual(self.client.get(url).data["available_amount"], "50000.00")
+
+        CreditLine.objects.reserve_credit(self.credit_line.pk, Decimal("20000"))
+        self.assertEqual(self.client.get(url).data["available_amount"], "30000.00")
+
+        self.credit_line.status = "approved"
+        self.credit_line.save()
+        self.assertEqual(self.client.get(url).data["status"], "approved")
+
+    def test_get_credit_line_is_cached_per_user(self):
+        url = reverse(
+            "credit_line_api:get_credit_line", kwargs={"pk": self.credit_line.id}
+        )
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CACHES={"default": {"BACKEND": SHARED_CACHE, "LOCATION": directory}}
+        ):
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            self.client.force_authenticate(user=self.regular_user)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_credit_line_is_not_cached_per_process(self):
+        # Another worker's locmem copy would survive the invalidation
+        url = reverse(
+            "credit_line_api:get_credit_line", kwargs={"pk": self.credit_line.id}
+        )
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
     def test_get_credit_line_not_found(self):
         url = reverse("credit_line_api:get_credit_line", kwargs={"pk": 999})
         response = self.client.get(url)
@@ -275,6 +318,19 @@ class CreditLineAdjustmentStatusUpdateTests(BaseTest, APITestCase):
         self.adjustment.refresh_from_db()
         self.assertEqual(self.adjustment.adjustment_status, "approved")
 
+    def test_update_adjustment_status_below_committed_amount(self):
+        CreditLine.objects.reserve_credit(self.credit_line.pk, Decimal("4000.01"))
+        self.client.force_authenticate(user=self.superuser)
+        url = reverse(
+            "credit_line_api:credit_line_adjustment_status_update",
+            kwargs={"pk": self.adjustment.pk},
+        )
+        data = {"adjustment_status": "approved"}
+        response = self.client.patch(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.adjustment.refresh_from_db()
+        self.assertEqual(self.adjustment.adjustment_status, "pending_review")
+
     def test_update_adjustment_status_as_admin_invalid(self):
         self.client.force_authenticate(user=self.admin_user)
         url = reverse(
@@ -54,4 +54,9 @@ urlpatterns = [
         views.credit_request_status_update,
         name="credit_request_status_update",
     ),
+    path(
+        "credit-requests/status/decisions/",
+        views.credit_request_bulk_decision,
+        name="credit_request_bulk_decision",
+    ),
 ]
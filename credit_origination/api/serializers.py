@@ -51,3 +51,26 @@ class CreditRequestStatusUpdateSerializer(serializers.ModelSerializer):
         if value not in dict(CreditRequest.CREDIT_REQUEST_STATUS).keys():
             raise serializers.ValidationError("Invalid status.")
         return value
+
+
+class CreditRequestDecisionSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    status = serializers.ChoiceField(choices=CreditRequest.CREDIT_REQUEST_STATUS)
+
+
+class CreditRequestBulkDecisionSerializer(serializers.Serializer):
+    MAX_DECISIONS = 5000
+
+    decisions = CreditRequestDecisionSerializer(many=True, allow_empty=False)
+
+    def validate_decisions(self, value):
+        if len(value) > self.MAX_DECISIONS:
+            raise serializers.ValidationError(
+                f"At most {self.MAX_DECISIONS} decisions can be sent at once."
+            )
+        ids = [decision["id"] for decision in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                "Each credit request can only appear once."
+            )
+        return value
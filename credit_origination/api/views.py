@@ -13,11 +13,15 @@ from credit_origination.api.serializers import (
     CreditTypeAdminSerializer,
     CreditRequestSerializer,
     CreditRequestStatusUpdateSerializer,
+    CreditRequestBulkDecisionSerializer,
 )
 from datetime import timedelta
 from django.utils.timezone import now
 from django.db import transaction
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.shortcuts import get_object_or_404
+from core.cache import get_or_set
+from core.db.routers import read_from_replica
 
 
 class CreditTypePagination(PageNumberPagination):
@@ -123,14 +127,23 @@ def credit_type_list(request):
 
     Accessible for all users.
     """
-    credit_types = CreditType.objects.all()
+
+    def list_credit_types():
+        paginator = CreditTypePagination()
+        page = paginator.paginate_queryset(CreditType.objects.all(), request)
+        return {
+            "count": paginator.page.paginator.count,
+            "results": CreditTypeSerializer(page, many=True).data,
+        }
+
+    # Keyed on the path and query (page, page_size), so every host and
+    # scheme shares one copy; invalidated by the CreditType signals. Only the
+    # page is cached: the next/previous links are absolute URLs built from
+    # the host and scheme of each request.
+    data = get_or_set("credit_types", [request.get_full_path()], list_credit_types)
     paginator = CreditTypePagination()
-    page = paginator.paginate_queryset(credit_types, request)
-    if page is not None:
-        serializer = CreditTypeSerializer(page, many=True)
-        return paginator.get_paginated_response(serializer.data)
-    serializer = CreditTypeSerializer(credit_types, many=True)
-    return Response(serializer.data)
+    paginator.paginate_queryset(range(data["count"]), request)
+    return paginator.get_paginated_response(data["results"])
 
 
 @swagger_auto_schema(
@@ -258,6 +271,7 @@ def update_user_credit_request(request, pk):
 )
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
+@read_from_replica
 def credit_requests_admin_list(request):
     """
     Get all credit requests made by users
@@ -324,6 +338,54 @@ def credit_request_status_update(request, pk):
     credit_request = get_object_or_404(CreditRequest, pk=pk)
     serializer = CreditRequestStatusUpdateSerializer(credit_request, data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        # The status change and the events emitted by its receivers commit together
+        with transaction.atomic():
+            serializer.save()
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@swagger_auto_schema(
+    method="post",
+    request_body=CreditRequestBulkDecisionSerializer,
+    responses={
+        200: openapi.Response(
+            "Decision counts",
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "updated": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "unchanged": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "approved": openapi.Schema(type=openapi.TYPE_INTEGER),
+                },
+            ),
+        ),
+        400: "Bad Request",
+    },
+)
+@api_view(["POST"])
+@permission_classes([IsSuperUser])
+def credit_request_bulk_decision(request):
+    """
+    Update the status of many credit requests at once
+
+    Only admin users can access this endpoint.
+
+    The body holds a list of {id, status} decisions. The batch is applied
+    all or nothing: if any credit request does not exist, nothing is
+    updated. Credit lines for the approved requests are created by the
+    provisioning worker.
+    """
+    serializer = CreditRequestBulkDecisionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    decisions = {
+        decision["id"]: decision["status"]
+        for decision in serializer.validated_data["decisions"]
+    }
+    try:
+        result = CreditRequest.objects.apply_decisions(decisions)
+    except DjangoValidationError as e:
+        return Response(e.message_dict, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result)
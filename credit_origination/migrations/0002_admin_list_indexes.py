@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 09:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_origination', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='creditrequest',
+            index=models.Index(fields=['-created'], name='credit_request_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditrequest',
+            index=models.Index(fields=['status', '-created'], name='credit_request_status_idx'),
+        ),
+    ]
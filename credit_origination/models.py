@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, When, Value
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from core.models import OutboxEvent
+from core.outbox import build_event
 
 User = get_user_model()
 
@@ -18,6 +21,62 @@ class CreditType(models.Model):
         ordering = ["-created"]
 
 
+class CreditRequestManager(models.Manager):
+    def apply_decisions(self, decisions):
+        """
+        Apply a batch of underwriter decisions, given as a {pk: status} dict.
+
+        The current statuses are read (and locked) in one query, the changed
+        requests are updated with a single CASE-based UPDATE and one
+        "credit_request.approved" event per newly approved request is
+        bulk-inserted, so the provisioning worker creates their credit lines
+        in batch. Decisions that do not change the status are skipped.
+
+        Saves, and therefore the per-instance signals, are bypassed. Raises
+        ValidationError, without changing anything, if any pk does not exist.
+        """
+        with transaction.atomic():
+            current = {
+                credit_request.pk: credit_request
+                for credit_request in self.select_for_update().filter(
+                    pk__in=decisions
+                )
+            }
+            missing = sorted(set(decisions) - set(current))
+            if missing:
+                raise ValidationError(
+                    {"decisions": f"Credit requests not found: {missing}"}
+                )
+
+            changed = {}
+            for pk, new_status in decisions.items():
+                if current[pk].status != new_status:
+                    changed.setdefault(new_status, []).append(pk)
+            changed_pks = [pk for pks in changed.values() for pk in pks]
+
+            if changed_pks:
+                self.filter(pk__in=changed_pks).update(
+                    status=Case(
+                        *[
+                            When(pk__in=pks, then=Value(new_status))
+                            for new_status, pks in changed.items()
+                        ],
+                        output_field=models.CharField(),
+                    )
+                )
+
+            approved = changed.get("approved", [])
+            OutboxEvent.objects.bulk_create(
+                [current[pk].approval_event() for pk in approved]
+            )
+
+        return {
+            "updated": len(changed_pks),
+            "unchanged": len(decisions) - len(changed_pks),
+            "approved": len(approved),
+        }
+
+
 class CreditRequest(models.Model):
     CREDIT_REQUEST_STATUS = (
         ("pending", "Pending"),
@@ -54,8 +113,29 @@ class CreditRequest(models.Model):
         self.full_clean()
         super().save(*args, **kwargs)
 
+    objects = CreditRequestManager()
+
     def __str__(self):
         return f"{self.user} - {self.created} - {self.status}"
 
+    def approval_event(self):
+        """
+        Unsaved outbox event announcing the approval of this request.
+        """
+        return build_event(
+            "credit_request.approved",
+            self,
+            {
+                "user_id": self.user_id,
+                "amount": self.amount,
+                "term": self.term,
+                "credit_type_id": self.credit_type_id,
+            },
+        )
+
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["-created"], name="credit_request_created_idx"),
+            models.Index(fields=["status", "-created"], name="credit_request_status_idx"),
+        ]
@@ -1,11 +1,12 @@
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.utils import timezone
-from credit_origination.models import CreditRequest
-from credit_line.models import CreditLine
+from core.tracing import traced
+from credit_origination.models import CreditType, CreditRequest
+from core.cache import invalidate
 
 
 @receiver(pre_save, sender=CreditRequest)
+@traced()
 def capture_previous_status(sender, instance, **kwargs):
     if instance.pk:
         previous = CreditRequest.objects.get(pk=instance.pk)
@@ -13,20 +14,23 @@ def capture_previous_status(sender, instance, **kwargs):
 
 
 @receiver(post_save, sender=CreditRequest)
-def create_credit_line(sender, instance, created, **kwargs):
+@traced()
+def enqueue_credit_line_creation(sender, instance, created, **kwargs):
     if not created:
         if (
             hasattr(instance, "_previous_status")
             and instance.status == "approved"
             and instance._previous_status != "approved"
         ):
-            CreditLine.objects.get_or_create(
-                user=instance.user,
-                defaults={
-                    "credit_limit": instance.amount,
-                    "start_date": timezone.now().date(),
-                    "status": "pending",
-                },
-            )
+            # The credit line is created by the provisioning worker
+            # (credit_line.provisioning) when it consumes this event.
+            instance.approval_event().save()
 
         # If you want, you could send an email for admin notification
+
+
+@receiver(post_save, sender=CreditType)
+@receiver(post_delete, sender=CreditType)
+@traced()
+def invalidate_credit_type_cache(sender, instance, **kwargs):
+    invalidate("credit_types")
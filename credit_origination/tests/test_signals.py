@@ -1,6 +1,9 @@
+from decimal import Decimal
 from django.utils import timezone
 from credit_origination.models import CreditRequest
 from credit_line.models import CreditLine
+from credit_line.provisioning import provision_credit_lines
+from core.models import OutboxEvent
 from accounts.tests.base_test import BaseTest
 
 
@@ -28,7 +31,7 @@ class CreditRequestSignalTestCase(BaseTest):
     def test_create_credit_line_on_approval(self):
         """
         Ensure that a CreditLine is created with the correct details
-        when the CreditRequest status changes to 'approved'.
+        once the approval of a CreditRequest has been processed.
         """
         credit_request = CreditRequest.objects.create(
             user=self.user,
@@ -39,11 +42,41 @@ class CreditRequestSignalTestCase(BaseTest):
         )
         credit_request.status = "approved"
         credit_request.save()
+        provision_credit_lines()
         credit_line = CreditLine.objects.get(user=self.user)
         self.assertEqual(credit_line.credit_limit, credit_request.amount)
         self.assertEqual(credit_line.status, "pending")
         self.assertEqual(credit_line.currency, "mxn")
         self.assertEqual(credit_line.start_date, timezone.now().date())
+        self.assertEqual(credit_line.available_amount, credit_request.amount)
+
+    def test_approval_does_not_create_credit_line_inline(self):
+        credit_request = CreditRequest.objects.create(
+            user=self.user,
+            credit_type=self.credit_type,
+            amount=10000,
+            term=12,
+            status="pending",
+        )
+        credit_request.status = "approved"
+        credit_request.save()
+        self.assertFalse(CreditLine.objects.filter(user=self.user).exists())
+
+    def test_approval_emits_outbox_event(self):
+        credit_request = CreditRequest.objects.create(
+            user=self.user,
+            credit_type=self.credit_type,
+            amount=10000,
+            term=12,
+            status="pending",
+        )
+        credit_request.status = "approved"
+        credit_request.save()
+
+        event = OutboxEvent.objects.get(topic="credit_request.approved")
+        self.assertEqual(event.aggregate_id, credit_request.pk)
+        self.assertEqual(event.payload["user_id"], self.user.pk)
+        self.assertEqual(Decimal(event.payload["amount"]), credit_request.amount)
 
     def test_no_credit_line_on_non_approval(self):
         """
@@ -76,12 +109,14 @@ class CreditRequestSignalTestCase(BaseTest):
         )
         credit_request.status = "approved"
         credit_request.save()
+        provision_credit_lines()
         credit_line = CreditLine.objects.get(user=self.user)
         self.assertEqual(credit_line.credit_limit, credit_request.amount)
         self.assertEqual(CreditLine.objects.filter(user=self.user).count(), 1)
 
         credit_request.status = "approved"
         credit_request.save()
+        provision_credit_lines()
         self.assertEqual(CreditLine.objects.filter(user=self.user).count(), 1)
 
     def test_credit_line_not_created_if_already_approved(self):
@@ -103,6 +138,7 @@ class CreditRequestSignalTestCase(BaseTest):
 
         credit_request.status = "approved"
         credit_request.save()
+        provision_credit_lines()
         self.assertEqual(CreditLine.objects.filter(user=self.user).count(), 1)
 
     def test_credit_line_retains_original_limit_on_new_credit_request(self):
@@ -121,6 +157,7 @@ class CreditRequestSignalTestCase(BaseTest):
         )
         first_credit_request.status = "approved"
         first_credit_request.save()
+        provision_credit_lines()
 
         # Verify the credit line created with the first credit request
         credit_line = CreditLine.objects.get(user=self.user)
@@ -135,6 +172,7 @@ class CreditRequestSignalTestCase(BaseTest):
         )
         second_credit_request.status = "approved"
         second_credit_request.save()
+        provision_credit_lines()
 
         # Verify the credit line still has the original credit limit
         credit_line.refresh_from_db()
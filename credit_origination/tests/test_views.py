@@ -1,5 +1,10 @@
 from accounts.tests.base_test import BaseTest
 from credit_origination.models import CreditType, CreditRequest
+from credit_line.models import CreditLine
+from credit_line.provisioning import provision_credit_lines
+from core.models import OutboxEvent
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
@@ -91,6 +96,39 @@ class CreditTypeViewsTests(BaseTest):
         self.assertEqual(len(response.data["results"]), 10)
         self.assertEqual(response.data["count"], 16)
 
+    def test_list_credit_types_cache_is_invalidated(self):
+        cache.clear()
+        self.assertEqual(self.client.get(self.list_url).data["count"], 1)
+        with self.assertNumQueries(0):
+            self.client.get(self.list_url)
+
+        credit_type = CreditType.objects.create(name="Mortgage")
+        self.assertEqual(self.client.get(self.list_url).data["count"], 2)
+
+        credit_type.delete()
+        self.assertEqual(self.client.get(self.list_url).data["count"], 1)
+
+    @override_settings(ALLOWED_HOSTS=["testserver", "internal", "api.example.com"])
+    def test_list_credit_types_cache_is_shared_across_schemes(self):
+        cache.clear()
+        for n in range(15):
+            CreditType.objects.create(name=f"Type {n}", description="Sample description")
+        self.client.get(self.list_url, HTTP_HOST="internal:8000")
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.list_url, secure=True, HTTP_HOST="api.example.com"
+            )
+        self.assertEqual(len(response.data["results"]), 10)
+        # The links are built for each request, not cached with the page
+        self.assertEqual(
+            response.data["next"], f"https://api.example.com{self.list_url}?page=2"
+        )
+        self.assertIsNone(response.data["previous"])
+
+        # Other pages are cached separately
+        response = self.client.get(self.list_url, {"page": 2})
+        self.assertEqual(len(response.data["results"]), 6)
+
     def test_list_credit_types_admin(self):
         self.client.force_authenticate(user=self.superuser)
         url = self.admin_list_url
@@ -465,3 +503,95 @@ class TestCreditRequestStatusUpdateView(BaseTest, APITestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.put(self.url, {"status": "approved"}, format="json")
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class TestCreditRequestBulkDecisionView(BaseTest, APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.superuser)
+        self.credit_requests = [
+            CreditRequest.objects.create(
+                credit_type=self.credit_type,
+                amount=Decimal("5000.00") * (i + 1),
+                term=24,
+                user=user,
+                status="pending",
+            )
+            for i, user in enumerate([self.user, self.admin_user, self.inactive_user])
+        ]
+        self.url = reverse("credit_origination_api:credit_request_bulk_decision")
+
+    def decide(self, pairs):
+        return self.client.post(
+            self.url,
+            {"decisions": [{"id": pk, "status": value} for pk, value in pairs]},
+            format="json",
+        )
+
+    def test_bulk_decision_updates_statuses(self):
+        first, second, third = self.credit_requests
+        response = self.decide(
+            [(first.pk, "approved"), (second.pk, "rejected"), (third.pk, "pending")]
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data, {"updated": 2, "unchanged": 1, "approved": 1}
+        )
+        statuses = dict(CreditRequest.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[first.pk], "approved")
+        self.assertEqual(statuses[second.pk], "rejected")
+        self.assertEqual(statuses[third.pk], "pending")
+
+    def test_bulk_approval_queues_credit_lines(self):
+        first, second, _ = self.credit_requests
+        self.decide([(first.pk, "approved"), (second.pk, "approved")])
+
+        events = OutboxEvent.objects.filter(topic="credit_request.approved")
+        self.assertEqual(
+            sorted(events.values_list("aggregate_id", flat=True)),
+            sorted([first.pk, second.pk]),
+        )
+        self.assertFalse(CreditLine.objects.exists())
+
+        provision_credit_lines()
+        self.assertEqual(
+            dict(CreditLine.objects.values_list("user_id", "credit_limit")),
+            {self.user.pk: first.amount, self.admin_user.pk: second.amount},
+        )
+
+    def test_reapproval_does_not_queue_credit_line(self):
+        first = self.credit_requests[0]
+        self.decide([(first.pk, "approved")])
+        response = self.decide([(first.pk, "approved")])
+        self.assertEqual(response.data["unchanged"], 1)
+        self.assertEqual(
+            OutboxEvent.objects.filter(topic="credit_request.approved").count(), 1
+        )
+
+    def test_bulk_decision_with_missing_request_changes_nothing(self):
+        first = self.credit_requests[0]
+        response = self.decide([(first.pk, "approved"), (999999, "approved")])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("decisions", response.data)
+        first.refresh_from_db()
+        self.assertEqual(first.status, "pending")
+
+    def test_bulk_decision_invalid_status(self):
+        response = self.decide([(self.credit_requests[0].pk, "invalid_status")])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_decision_duplicate_ids(self):
+        pk = self.credit_requests[0].pk
+        response = self.decide([(pk, "approved"), (pk, "rejected")])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_decision_query_count(self):
+        pairs = [(credit_request.pk, "approved") for credit_request in self.credit_requests]
+        # savepoint, locking read, bulk update, event insert, release
+        with self.assertNumQueries(5):
+            self.decide(pairs)
+
+    def test_bulk_decision_forbidden_for_staff(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.decide([(self.credit_requests[0].pk, "approved")])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -4,6 +4,7 @@ from credit_subline.models import (
     CreditAmountAdjustment,
     InterestRateAdjustment,
     CreditSublineStatusAdjustment,
+    AdjustmentLedgerEntry,
 )
 from loan_management.admin import LoanTermInline
 
@@ -74,4 +75,23 @@ class CreditSublineAdmin(admin.ModelAdmin):
     ]
 
 
+class AdjustmentLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = [
+        "kind",
+        "source_id",
+        "credit_line",
+        "adjustment_status",
+        "effective_date",
+        "is_current",
+    ]
+    list_filter = ["kind", "adjustment_status", "is_current"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(CreditSubline, CreditSublineAdmin)
+admin.site.register(AdjustmentLedgerEntry, AdjustmentLedgerEntryAdmin)
@@ -59,6 +59,11 @@ urlpatterns = [
         views.credit_subline_adjustments_admin_list,
         name="credit_subline_adjustments_admin_list",
     ),
+    path(
+        "adjustments/ledger/<int:credit_line_pk>/",
+        views.credit_adjustment_ledger,
+        name="credit_adjustment_ledger",
+    ),
     path(
         "adjustments/<str:type>/<int:adj_id>/",
         views.get_credit_subline_adjustment,
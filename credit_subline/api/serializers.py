@@ -4,8 +4,10 @@ from credit_subline.models import (
     CreditAmountAdjustment,
     InterestRateAdjustment,
     CreditSublineStatusAdjustment,
+    AdjustmentLedgerEntry,
 )
 from decimal import Decimal
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils import timezone
 
 
@@ -62,9 +64,13 @@ class CreditSublineSerializer(serializers.ModelSerializer):
             )
 
         # Now, 'credit_line' is not in validated_data anymore, so it won't conflict
-        credit_subline = CreditSubline.objects.create(
-            credit_line=credit_line, **validated_data
-        )
+        # Saving reserves the amount against the credit line's available credit
+        try:
+            credit_subline = CreditSubline.objects.create(
+                credit_line=credit_line, **validated_data
+            )
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.message_dict)
         return credit_subline
 
     def update(self, instance, validated_data):
@@ -510,3 +516,39 @@ class CreditSublineStatusAdjustmentStatusSerializer(serializers.ModelSerializer)
             )
 
         return value
+
+
+class AdjustmentLedgerEntrySerializer(serializers.ModelSerializer):
+    """
+    Read-only representation of an adjustment ledger entry. Only the payload
+    columns relevant to the entry's kind are populated; the rest are null.
+    """
+
+    credit_line_id = serializers.IntegerField(read_only=True)
+    credit_subline_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = AdjustmentLedgerEntry
+        fields = [
+            "id",
+            "kind",
+            "source_id",
+            "credit_line_id",
+            "credit_subline_id",
+            "adjustment_status",
+            "effective_date",
+            "is_current",
+            "previous_amount",
+            "new_amount",
+            "previous_interest_rate",
+            "new_interest_rate",
+            "previous_status",
+            "new_status",
+            "previous_end_date",
+            "new_end_date",
+            "previous_currency",
+            "new_currency",
+            "reason",
+            "recorded",
+        ]
+        read_only_fields = fields
@@ -16,6 +16,7 @@ from credit_subline.api.serializers import (
     InterestRateAdjustmentStatusSerializer,
     CreditSublineStatusAdjustmentSerializer,
     CreditSublineStatusAdjustmentStatusSerializer,
+    AdjustmentLedgerEntrySerializer,
 )
 from credit_line.models import CreditLine
 from credit_origination.api.views import (
@@ -28,9 +29,10 @@ from credit_subline.models import (
     CreditAmountAdjustment,
     InterestRateAdjustment,
     CreditSublineStatusAdjustment,
+    AdjustmentLedgerEntry,
 )
 from accounts.api.permissions import IsSuperUser
-from itertools import chain
+from core.db.routers import read_from_replica
 
 
 class CreditSublinesPagination(PageNumberPagination):
@@ -102,6 +104,7 @@ def credit_subline_create(request, credit_line_pk):
 )
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
+@read_from_replica
 def credit_sublines_admin_list(request):
     """
     Retrieves the list of all credit sublines with pagination support.
@@ -112,7 +115,7 @@ def credit_sublines_admin_list(request):
     """
     status = request.query_params.get("status")
 
-    query_set = CreditSubline.objects.all().order_by("-created")
+    query_set = CreditSubline.objects.select_related("credit_line").order_by("-created")
 
     if status:
         query_set = query_set.filter(status=status)
@@ -282,6 +285,24 @@ def credit_amount_adjustment_status_update(request, adj_pk):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    # Check that an approved increase fits in the credit line's available credit
+    if (
+        request.data.get("adjustment_status") == "approved"
+        and adjustment.adjusted_amount is not None
+    ):
+        credit_subline = adjustment.credit_subline
+        increase = adjustment.adjusted_amount - credit_subline.subline_amount
+        if increase > credit_subline.credit_line.available_amount:
+            return Response(
+                {
+                    "error": (
+                        "The adjusted amount exceeds the available credit "
+                        "of the credit line."
+                    )
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
     serializer = CreditAmountAdjustmentStatusSerializer(
         adjustment, data=request.data, partial=True
     )
@@ -561,6 +582,7 @@ adjustment_status_param = openapi.Parameter(
 )
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
+@read_from_replica
 def credit_subline_adjustments_admin_list(request):
     """
     Retrieves a list of all credit subline adjustments.
@@ -581,60 +603,48 @@ def credit_subline_adjustments_admin_list(request):
 
     paginator = CreditSublineAdjustmentsPagination()
 
-    # Initially set to None to avoid unnecessary filtering.
-    adjustments_query = None
+    # The ledger holds one current entry per adjustment of every type, so
+    # filtering, ordering and pagination all happen in a single indexed query.
+    entries = AdjustmentLedgerEntry.objects.filter(
+        is_current=True, kind__in=AdjustmentLedgerEntry.SUBLINE_KINDS
+    )
 
-    # Adjust the queries to include adjustment_status if it's provided.
-    if adjustment_type == "amount":
-        adjustments_query = CreditAmountAdjustment.objects.all()
-    elif adjustment_type == "interest_rate":
-        adjustments_query = InterestRateAdjustment.objects.all()
-    elif adjustment_type == "status":
-        adjustments_query = CreditSublineStatusAdjustment.objects.all()
+    # Unknown types fall back to listing every adjustment type.
+    if adjustment_type in AdjustmentLedgerEntry.SUBLINE_KINDS:
+        entries = entries.filter(kind=adjustment_type)
 
-    if adjustments_query is not None and adjustment_status:
-        adjustments_query = adjustments_query.filter(
-            adjustment_status=adjustment_status
-        )
+    if adjustment_status:
+        entries = entries.filter(adjustment_status=adjustment_status)
 
-    if adjustments_query is None:
-        # This means we need to fetch all types and possibly filter by status.
-        queries = [
-            CreditAmountAdjustment.objects.all(),
-            InterestRateAdjustment.objects.all(),
-            CreditSublineStatusAdjustment.objects.all(),
-        ]
-        if adjustment_status:
-            queries = [q.filter(adjustment_status=adjustment_status) for q in queries]
-
-        adjustments = list(chain(*queries))
-        # Since it's a combined list from different types, sort it here.
-        adjustments.sort(key=lambda x: x.effective_date, reverse=True)
-    else:
-        # If adjustments_query is not None, it's already filtered by type and status.
-        adjustments = list(adjustments_query.order_by("-effective_date"))
+    entries = entries.order_by("-effective_date", "-id").only("kind", "source_id")
+    page = paginator.paginate_queryset(entries, request)
+
+    type_map = {
+        "amount": (CreditAmountAdjustment, CreditAmountAdjustmentSerializer),
+        "interest_rate": (InterestRateAdjustment, InterestRateAdjustmentSerializer),
+        "status": (
+            CreditSublineStatusAdjustment,
+            CreditSublineStatusAdjustmentSerializer,
+        ),
+    }
+
+    # Fetch the adjustments on this page with one query per type.
+    adjustments = {}
+    for kind, (model, _) in type_map.items():
+        ids = [entry.source_id for entry in page if entry.kind == kind]
+        if ids:
+            queryset = model.objects.select_related("credit_subline")
+            for pk, adjustment in queryset.in_bulk(ids).items():
+                adjustments[(kind, pk)] = adjustment
 
-    page = paginator.paginate_queryset(adjustments, request)
     results = []
-    for adjustment in page:
-        if isinstance(adjustment, CreditAmountAdjustment):
-            serializer = CreditAmountAdjustmentSerializer(
-                adjustment, context={"request": request}
-            )
-            result = serializer.data
-            result["adjustment_type"] = "amount"
-        elif isinstance(adjustment, InterestRateAdjustment):
-            serializer = InterestRateAdjustmentSerializer(
-                adjustment, context={"request": request}
-            )
-            result = serializer.data
-            result["adjustment_type"] = "interest_rate"
-        elif isinstance(adjustment, CreditSublineStatusAdjustment):
-            serializer = CreditSublineStatusAdjustmentSerializer(
-                adjustment, context={"request": request}
-            )
-            result = serializer.data
-            result["adjustment_type"] = "status"
+    for entry in page:
+        adjustment = adjustments.get((entry.kind, entry.source_id))
+        if adjustment is None:
+            continue
+        serializer_class = type_map[entry.kind][1]
+        result = serializer_class(adjustment, context={"request": request}).data
+        result["adjustment_type"] = entry.kind
         results.append(result)
 
     return paginator.get_paginated_response(results)
@@ -702,3 +712,42 @@ def get_credit_subline_adjustment(request, type, adj_id):
 
     serializer = serializer_class(adjustment)
     return Response(serializer.data)
+
+
+@swagger_auto_schema(
+    method="get",
+    responses={
+        200: openapi.Response(
+            description="A paginated ledger of adjustments for a credit line",
+            schema=AdjustmentLedgerEntrySerializer(many=True),
+        ),
+        401: "Unauthorized - Authentication credentials were not provided or are invalid",
+        403: "Forbidden - The user does not have permission to access this resource",
+        404: "Not Found - The requested credit line does not exist",
+    },
+    manual_parameters=[page_param, page_size_param, adjustment_status_param],
+)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def credit_adjustment_ledger(request, credit_line_pk):
+    """
+    Retrieves the adjustment ledger of a credit line.
+
+
+    Lists every credit line and credit subline adjustment entry recorded
+    for the account, newest first, with optional filtering by adjustment status.
+
+
+    Access is restricted for admin users only.
+    """
+    credit_line = get_object_or_404(CreditLine, pk=credit_line_pk)
+    adjustment_status = request.query_params.get("adjustment_status")
+
+    entries = AdjustmentLedgerEntry.objects.filter(credit_line=credit_line)
+    if adjustment_status:
+        entries = entries.filter(adjustment_status=adjustment_status)
+
+    paginator = CreditSublineAdjustmentsPagination()
+    page = paginator.paginate_queryset(entries.order_by("-effective_date", "-id"), request)
+    serializer = AdjustmentLedgerEntrySerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
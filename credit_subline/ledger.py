@@ -0,0 +1,121 @@
+from django.db.models import QuerySet
+from credit_subline.models import AdjustmentLedgerEntry
+
+
+def credit_line_adjustment_payload(adjustment):
+    return {
+        "credit_line_id": adjustment.credit_line_id,
+        "effective_date": adjustment.adjustment_date,
+        "previous_amount": adjustment.previous_credit_limit,
+        "new_amount": adjustment.new_credit_limit,
+        "previous_end_date": adjustment.previous_end_date,
+        "new_end_date": adjustment.new_end_date,
+        "previous_status": adjustment.previous_status,
+        "new_status": adjustment.new_status,
+        "previous_currency": adjustment.previous_currency,
+        "new_currency": adjustment.new_currency,
+        "reason": adjustment.reason,
+    }
+
+
+def amount_adjustment_payload(adjustment):
+    return {
+        "credit_line_id": adjustment.credit_subline.credit_line_id,
+        "credit_subline_id": adjustment.credit_subline_id,
+        "effective_date": adjustment.effective_date,
+        "previous_amount": adjustment.initial_amount,
+        "new_amount": adjustment.adjusted_amount,
+        "reason": adjustment.reason_for_adjustment,
+    }
+
+
+def interest_rate_adjustment_payload(adjustment):
+    return {
+        "credit_line_id": adjustment.credit_subline.credit_line_id,
+        "credit_subline_id": adjustment.credit_subline_id,
+        "effective_date": adjustment.effective_date,
+        "previous_interest_rate": adjustment.initial_interest_rate,
+        "new_interest_rate": adjustment.adjusted_interest_rate,
+        "reason": adjustment.reason_for_adjustment,
+    }
+
+
+def status_adjustment_payload(adjustment):
+    return {
+        "credit_line_id": adjustment.credit_subline.credit_line_id,
+        "credit_subline_id": adjustment.credit_subline_id,
+        "effective_date": adjustment.effective_date,
+        "previous_status": adjustment.initial_status,
+        "new_status": adjustment.adjusted_status,
+        "reason": adjustment.reason_for_adjustment,
+    }
+
+
+LEDGER_PAYLOADS = {
+    "credit_line": credit_line_adjustment_payload,
+    "amount": amount_adjustment_payload,
+    "interest_rate": interest_rate_adjustment_payload,
+    "status": status_adjustment_payload,
+}
+
+
+def build_ledger_entry(kind, adjustment):
+    """
+    Build an unsaved ledger entry capturing the current state of an adjustment.
+    """
+    return AdjustmentLedgerEntry(
+        kind=kind,
+        source_id=adjustment.pk,
+        adjustment_status=adjustment.adjustment_status,
+        **LEDGER_PAYLOADS[kind](adjustment),
+    )
+
+
+def record_adjustment(kind, adjustment, created):
+    """
+    Append a ledger entry for a newly created adjustment, or for an existing one
+    whose adjustment_status or payload has changed since its current entry was
+    written.
+
+    The comparison happens inside the UPDATE that retires the current entry,
+    so unchanged saves cost a single statement and no SELECT.
+    """
+    entry = build_ledger_entry(kind, adjustment)
+    if not created:
+        retired = (
+            AdjustmentLedgerEntry.objects.filter(
+                kind=kind, source_id=adjustment.pk, is_current=True
+            )
+            .exclude(
+                adjustment_status=entry.adjustment_status,
+                **LEDGER_PAYLOADS[kind](adjustment),
+            )
+            .update(is_current=False)
+        )
+        if not retired:
+            return None
+
+    entry.save()
+    return entry
+
+
+def record_deletion(kind, adjustment, origin=None):
+    """
+    Retire the current entry of a deleted adjustment and append a "deleted"
+    entry, which is never current, so that its history stays in the ledger.
+
+    Nothing is recorded when the adjustment goes with its credit line or
+    subline (origin is what delete() was called on): their ledger entries are
+    deleted along with them.
+    """
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin is not None and origin_model is not type(adjustment):
+        return None
+    AdjustmentLedgerEntry.objects.filter(
+        kind=kind, source_id=adjustment.pk, is_current=True
+    ).update(is_current=False)
+    entry = build_ledger_entry(kind, adjustment)
+    entry.adjustment_status = "deleted"
+    entry.is_current = False
+    entry.save()
+    return entry
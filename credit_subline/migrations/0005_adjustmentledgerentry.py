@@ -0,0 +1,44 @@
+# Generated by Django 5.0.6 on 2026-10-19 07:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_line', '0003_alter_creditlineadjustment_previous_end_date'),
+        ('credit_subline', '0004_creditsublinestatusadjustment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdjustmentLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('credit_line', 'Credit Line'), ('amount', 'Amount'), ('interest_rate', 'Interest Rate'), ('status', 'Status')], max_length=20)),
+                ('source_id', models.PositiveBigIntegerField()),
+                ('adjustment_status', models.CharField(choices=[('pending_review', 'Pending Review'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('implemented', 'Implemented')], max_length=20)),
+                ('effective_date', models.DateField()),
+                ('is_current', models.BooleanField(default=True)),
+                ('previous_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('new_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('previous_interest_rate', models.DecimalField(blank=True, decimal_places=3, max_digits=6, null=True)),
+                ('new_interest_rate', models.DecimalField(blank=True, decimal_places=3, max_digits=6, null=True)),
+                ('previous_status', models.CharField(blank=True, max_length=25, null=True)),
+                ('new_status', models.CharField(blank=True, max_length=25, null=True)),
+                ('previous_end_date', models.DateField(blank=True, null=True)),
+                ('new_end_date', models.DateField(blank=True, null=True)),
+                ('previous_currency', models.CharField(blank=True, max_length=5, null=True)),
+                ('new_currency', models.CharField(blank=True, max_length=5, null=True)),
+                ('reason', models.TextField(blank=True)),
+                ('recorded', models.DateTimeField(auto_now_add=True)),
+                ('credit_line', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='credit_line.creditline')),
+                ('credit_subline', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='credit_subline.creditsubline')),
+            ],
+            options={
+                'ordering': ['-effective_date', '-id'],
+                'indexes': [models.Index(fields=['credit_line', '-effective_date', '-id'], name='ledger_account_date_idx'), models.Index(condition=models.Q(('is_current', True)), fields=['adjustment_status', '-effective_date', '-id'], name='ledger_status_queue_idx'), models.Index(condition=models.Q(('is_current', True)), fields=['kind', 'adjustment_status', '-effective_date', '-id'], name='ledger_kind_queue_idx'), models.Index(fields=['kind', 'source_id'], name='ledger_source_idx')],
+            },
+        ),
+    ]
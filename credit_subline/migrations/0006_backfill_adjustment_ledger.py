@@ -0,0 +1,100 @@
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def backfill_adjustment_ledger(apps, schema_editor):
+    AdjustmentLedgerEntry = apps.get_model("credit_subline", "AdjustmentLedgerEntry")
+    CreditLineAdjustment = apps.get_model("credit_line", "CreditLineAdjustment")
+    CreditAmountAdjustment = apps.get_model("credit_subline", "CreditAmountAdjustment")
+    InterestRateAdjustment = apps.get_model("credit_subline", "InterestRateAdjustment")
+    CreditSublineStatusAdjustment = apps.get_model(
+        "credit_subline", "CreditSublineStatusAdjustment"
+    )
+
+    def credit_line_entry(adjustment):
+        return AdjustmentLedgerEntry(
+            kind="credit_line",
+            source_id=adjustment.pk,
+            credit_line_id=adjustment.credit_line_id,
+            adjustment_status=adjustment.adjustment_status,
+            effective_date=adjustment.adjustment_date,
+            previous_amount=adjustment.previous_credit_limit,
+            new_amount=adjustment.new_credit_limit,
+            previous_end_date=adjustment.previous_end_date,
+            new_end_date=adjustment.new_end_date,
+            previous_status=adjustment.previous_status,
+            new_status=adjustment.new_status,
+            previous_currency=adjustment.previous_currency,
+            new_currency=adjustment.new_currency,
+            reason=adjustment.reason,
+        )
+
+    def subline_entry(kind, adjustment, **payload):
+        return AdjustmentLedgerEntry(
+            kind=kind,
+            source_id=adjustment.pk,
+            credit_line_id=adjustment.credit_subline.credit_line_id,
+            credit_subline_id=adjustment.credit_subline_id,
+            adjustment_status=adjustment.adjustment_status,
+            effective_date=adjustment.effective_date,
+            reason=adjustment.reason_for_adjustment,
+            **payload,
+        )
+
+    sources = [
+        (CreditLineAdjustment.objects.all(), credit_line_entry),
+        (
+            CreditAmountAdjustment.objects.select_related("credit_subline"),
+            lambda adj: subline_entry(
+                "amount",
+                adj,
+                previous_amount=adj.initial_amount,
+                new_amount=adj.adjusted_amount,
+            ),
+        ),
+        (
+            InterestRateAdjustment.objects.select_related("credit_subline"),
+            lambda adj: subline_entry(
+                "interest_rate",
+                adj,
+                previous_interest_rate=adj.initial_interest_rate,
+                new_interest_rate=adj.adjusted_interest_rate,
+            ),
+        ),
+        (
+            CreditSublineStatusAdjustment.objects.select_related("credit_subline"),
+            lambda adj: subline_entry(
+                "status",
+                adj,
+                previous_status=adj.initial_status,
+                new_status=adj.adjusted_status,
+            ),
+        ),
+    ]
+
+    for queryset, build_entry in sources:
+        entries = []
+        for adjustment in queryset.iterator(chunk_size=BATCH_SIZE):
+            entries.append(build_entry(adjustment))
+            if len(entries) >= BATCH_SIZE:
+                AdjustmentLedgerEntry.objects.bulk_create(entries)
+                entries = []
+        AdjustmentLedgerEntry.objects.bulk_create(entries)
+
+
+def clear_adjustment_ledger(apps, schema_editor):
+    AdjustmentLedgerEntry = apps.get_model("credit_subline", "AdjustmentLedgerEntry")
+    AdjustmentLedgerEntry.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("credit_line", "0003_alter_creditlineadjustment_previous_end_date"),
+        ("credit_subline", "0005_adjustmentledgerentry"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_adjustment_ledger, clear_adjustment_ledger),
+    ]
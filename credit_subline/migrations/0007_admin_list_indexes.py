@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-19 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_subline', '0006_backfill_adjustment_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adjustmentledgerentry',
+            index=models.Index(condition=models.Q(('is_current', True)), fields=['-effective_date', '-id'], name='ledger_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditsubline',
+            index=models.Index(fields=['-created'], name='credit_subline_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditsubline',
+            index=models.Index(fields=['status', '-created'], name='credit_subline_status_idx'),
+        ),
+    ]
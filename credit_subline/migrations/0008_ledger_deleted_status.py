@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_subline', '0007_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adjustmentledgerentry',
+            name='adjustment_status',
+            field=models.CharField(choices=[('pending_review', 'Pending Review'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('implemented', 'Implemented'), ('deleted', 'Deleted')], max_length=20),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from credit_line.models import CreditLine
 from credit_origination.models import CreditType
@@ -49,11 +49,62 @@ class CreditSubline(models.Model):
         self.full_clean()  # This will call the clean method before saving
         if self.interest_rate and self.interest_rate > 1:
             self.interest_rate /= Decimal("100.0")
-        super().save(*args, **kwargs)
+
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        # New sublines draw on the credit line's available credit
+        with transaction.atomic():
+            if not CreditLine.objects.reserve_credit(
+                self.credit_line_id, self.subline_amount
+            ):
+                raise ValidationError(
+                    {
+                        "subline_amount": (
+                            "Subline amount exceeds the available credit "
+                            "of the credit line."
+                        )
+                    }
+                )
+            super().save(*args, **kwargs)
+
+    def change_amount(self, new_amount):
+        """
+        Set a new subline amount and move the difference into the
+        credit line's committed amount within the caller's transaction.
+
+        Raises ValidationError when an increase exceeds the available credit
+        of the credit line.
+        """
+        current_amount = (
+            CreditSubline.objects.select_for_update()
+            .values_list("subline_amount", flat=True)
+            .get(pk=self.pk)
+        )
+        if not CreditLine.objects.adjust_committed_credit(
+            self.credit_line_id, new_amount - current_amount
+        ):
+            raise ValidationError(
+                {
+                    "subline_amount": (
+                        "Subline amount exceeds the available credit "
+                        "of the credit line."
+                    )
+                }
+            )
+        self.subline_amount = new_amount
+        self.save()
 
     def __str__(self):
         return f"{self.subline_type} - {self.subline_amount} - {self.status}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created"], name="credit_subline_created_idx"),
+            models.Index(fields=["status", "-created"], name="credit_subline_status_idx"),
+        ]
+
 
 class CreditAmountAdjustment(models.Model):
     ADJUSTMENT_STATUS_CHOICES = (
@@ -183,3 +234,93 @@ class CreditSublineStatusAdjustment(models.Model):
 
     class Meta:
         ordering = ["-effective_date"]
+
+
+class AdjustmentLedgerEntry(models.Model):
+    """
+    Append-only ledger of credit line and credit subline adjustments.
+
+    A new entry is written when an adjustment is requested and each time its
+    adjustment_status or payload changes; the entry it replaces is flagged as
+    no longer current. Deleting an adjustment appends a "deleted" entry and
+    leaves it without a current one.
+
+    Payload columns are typed so every adjustment kind shares one table,
+    which keeps per-account histories and status queues to a single index scan.
+    """
+
+    KIND_CHOICES = (
+        ("credit_line", "Credit Line"),
+        ("amount", "Amount"),
+        ("interest_rate", "Interest Rate"),
+        ("status", "Status"),
+    )
+    SUBLINE_KINDS = ("amount", "interest_rate", "status")
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    source_id = models.PositiveBigIntegerField()
+    credit_line = models.ForeignKey(
+        CreditLine, related_name="ledger_entries", on_delete=models.CASCADE
+    )
+    credit_subline = models.ForeignKey(
+        CreditSubline,
+        related_name="ledger_entries",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    adjustment_status = models.CharField(
+        max_length=20,
+        choices=CreditAmountAdjustment.ADJUSTMENT_STATUS_CHOICES
+        + (("deleted", "Deleted"),),
+    )
+    effective_date = models.DateField()
+    is_current = models.BooleanField(default=True)
+    previous_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, blank=True
+    )
+    new_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, blank=True
+    )
+    previous_interest_rate = models.DecimalField(
+        max_digits=6, decimal_places=3, null=True, blank=True
+    )
+    new_interest_rate = models.DecimalField(
+        max_digits=6, decimal_places=3, null=True, blank=True
+    )
+    previous_status = models.CharField(max_length=25, null=True, blank=True)
+    new_status = models.CharField(max_length=25, null=True, blank=True)
+    previous_end_date = models.DateField(null=True, blank=True)
+    new_end_date = models.DateField(null=True, blank=True)
+    previous_currency = models.CharField(max_length=5, null=True, blank=True)
+    new_currency = models.CharField(max_length=5, null=True, blank=True)
+    reason = models.TextField(blank=True)
+    recorded = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} adjustment {self.source_id} - {self.adjustment_status}"
+
+    class Meta:
+        ordering = ["-effective_date", "-id"]
+        indexes = [
+            models.Index(
+                fields=["credit_line", "-effective_date", "-id"],
+                name="ledger_account_date_idx",
+            ),
+            models.Index(
+                fields=["-effective_date", "-id"],
+                condition=models.Q(is_current=True),
+                name="ledger_queue_idx",
+            ),
+            models.Index(
+                fields=["adjustment_status", "-effective_date", "-id"],
+                condition=models.Q(is_current=True),
+                name="ledger_status_queue_idx",
+            ),
+            models.Index(
+                fields=["kind", "adjustment_status", "-effective_date", "-id"],
+                condition=models.Q(is_current=True),
+                name="ledger_kind_queue_idx",
+            ),
+            models.Index(fields=["kind", "source_id"], name="ledger_source_idx"),
+        ]
@@ -1,17 +1,41 @@
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
+from credit_line.models import CreditLine
 from credit_subline.models import (
+    CreditSubline,
     CreditAmountAdjustment,
     InterestRateAdjustment,
     CreditSublineStatusAdjustment,
 )
+from credit_subline.ledger import record_adjustment, record_deletion
+from core.outbox import emit_event
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.db import transaction
 from django.dispatch import receiver
+from core.tracing import traced
 
 _previous__amount_adjustment_statuses = {}
 
 
+def reject_adjustment(instance, topic, error):
+    """
+    Reject an approved adjustment that can no longer be implemented, e.g. an
+    increase whose credit was reserved by another subline after the approval
+    was checked. The approval has committed and nothing would retry it, so it
+    ends rejected, with an event for the consumers.
+    """
+    with transaction.atomic():
+        instance.adjustment_status = "rejected"
+        instance.save()
+        emit_event(
+            topic,
+            instance,
+            {"credit_subline_id": instance.credit_subline_id, "errors": error.messages},
+        )
+
+
 @receiver(pre_save, sender=CreditAmountAdjustment)
+@traced()
 def capture_previous_amount_adjustment_status(sender, instance, **kwargs):
     if instance.pk:
         try:
@@ -26,6 +50,7 @@ def capture_previous_amount_adjustment_status(sender, instance, **kwargs):
 
 
 @receiver(post_save, sender=CreditAmountAdjustment)
+@traced()
 def update_credit_subline_amount_on_approval(sender, instance, **kwargs):
     previous_status = _previous__amount_adjustment_statuses.pop(instance.pk, None)
 
@@ -33,16 +58,28 @@ def update_credit_subline_amount_on_approval(sender, instance, **kwargs):
     if instance.adjustment_status == "approved" and previous_status != "approved":
 
         def process_adjustment():
-            with transaction.atomic():
-                if instance.adjusted_amount is not None:
-                    credit_subline = instance.credit_subline
-                    credit_subline.subline_amount = instance.adjusted_amount
-                    credit_subline.save()
-
-                # update the adjustment_status to "implemented" and the effective_date
-                instance.adjustment_status = "implemented"
-                instance.effective_date = timezone.now().date()
-                instance.save()
+            try:
+                with transaction.atomic():
+                    if instance.adjusted_amount is not None:
+                        instance.credit_subline.change_amount(instance.adjusted_amount)
+
+                    # update the adjustment_status to "implemented" and the effective_date
+                    instance.adjustment_status = "implemented"
+                    instance.effective_date = timezone.now().date()
+                    instance.save()
+
+                    emit_event(
+                        "credit_subline.amount_adjustment_implemented",
+                        instance,
+                        {
+                            "credit_subline_id": instance.credit_subline_id,
+                            "adjusted_amount": instance.adjusted_amount,
+                        },
+                    )
+            except ValidationError as error:
+                reject_adjustment(
+                    instance, "credit_subline.amount_adjustment_rejected", error
+                )
 
         transaction.on_commit(process_adjustment)
 
@@ -51,6 +88,7 @@ _previous__interest_rate_adjustment_statuses = {}
 
 
 @receiver(pre_save, sender=InterestRateAdjustment)
+@traced()
 def capture_previous_interest_rate_adjustment_status(sender, instance, **kwargs):
     if instance.pk:
         try:
@@ -65,6 +103,7 @@ def capture_previous_interest_rate_adjustment_status(sender, instance, **kwargs)
 
 
 @receiver(post_save, sender=InterestRateAdjustment)
+@traced()
 def update_credit_subline_interest_rate_on_approval(sender, instance, **kwargs):
     previous_status = _previous__interest_rate_adjustment_statuses.pop(
         instance.pk, None
@@ -74,16 +113,30 @@ def update_credit_subline_interest_rate_on_approval(sender, instance, **kwargs):
     if instance.adjustment_status == "approved" and previous_status != "approved":
 
         def process_adjustment():
-            with transaction.atomic():
-                if instance.adjusted_interest_rate is not None:
-                    credit_subline = instance.credit_subline
-                    credit_subline.interest_rate = instance.adjusted_interest_rate
-                    credit_subline.save()
-
-                # update the adjustment_status to "implemented" and the effective_date
-                instance.adjustment_status = "implemented"
-                instance.effective_date = timezone.now().date()
-                instance.save()
+            try:
+                with transaction.atomic():
+                    if instance.adjusted_interest_rate is not None:
+                        credit_subline = instance.credit_subline
+                        credit_subline.interest_rate = instance.adjusted_interest_rate
+                        credit_subline.save()
+
+                    # update the adjustment_status to "implemented" and the effective_date
+                    instance.adjustment_status = "implemented"
+                    instance.effective_date = timezone.now().date()
+                    instance.save()
+
+                    emit_event(
+                        "credit_subline.interest_rate_adjustment_implemented",
+                        instance,
+                        {
+                            "credit_subline_id": instance.credit_subline_id,
+                            "adjusted_interest_rate": instance.adjusted_interest_rate,
+                        },
+                    )
+            except ValidationError as error:
+                reject_adjustment(
+                    instance, "credit_subline.interest_rate_adjustment_rejected", error
+                )
 
         transaction.on_commit(process_adjustment)
 
@@ -92,6 +145,7 @@ _previous__credit_subline_status_adjustment_statuses = {}
 
 
 @receiver(pre_save, sender=CreditSublineStatusAdjustment)
+@traced()
 def capture_previous_subline_status_adjustment_status(sender, instance, **kwargs):
     if instance.pk:
         try:
@@ -106,6 +160,7 @@ def capture_previous_subline_status_adjustment_status(sender, instance, **kwargs
 
 
 @receiver(post_save, sender=CreditSublineStatusAdjustment)
+@traced()
 def update_credit_subline_status_on_approval(sender, instance, **kwargs):
     previous_status = _previous__credit_subline_status_adjustment_statuses.pop(
         instance.pk, None
@@ -115,15 +170,61 @@ def update_credit_subline_status_on_approval(sender, instance, **kwargs):
     if instance.adjustment_status == "approved" and previous_status != "approved":
 
         def process_adjustment():
-            with transaction.atomic():
-                if instance.adjusted_status is not None:
-                    credit_subline = instance.credit_subline
-                    credit_subline.status = instance.adjusted_status
-                    credit_subline.save()
-
-                # update the adjustment_status to "implemented" and the effective_date
-                instance.adjustment_status = "implemented"
-                instance.effective_date = timezone.now().date()
-                instance.save()
+            try:
+                with transaction.atomic():
+                    if instance.adjusted_status is not None:
+                        credit_subline = instance.credit_subline
+                        credit_subline.status = instance.adjusted_status
+                        credit_subline.save()
+
+                    # update the adjustment_status to "implemented" and the effective_date
+                    instance.adjustment_status = "implemented"
+                    instance.effective_date = timezone.now().date()
+                    instance.save()
+
+                    emit_event(
+                        "credit_subline.status_adjustment_implemented",
+                        instance,
+                        {
+                            "credit_subline_id": instance.credit_subline_id,
+                            "adjusted_status": instance.adjusted_status,
+                        },
+                    )
+            except ValidationError as error:
+                reject_adjustment(
+                    instance, "credit_subline.status_adjustment_rejected", error
+                )
 
         transaction.on_commit(process_adjustment)
+
+
+LEDGER_KINDS = {
+    CreditAmountAdjustment: "amount",
+    InterestRateAdjustment: "interest_rate",
+    CreditSublineStatusAdjustment: "status",
+}
+
+
+@receiver(post_save, sender=CreditAmountAdjustment)
+@receiver(post_save, sender=InterestRateAdjustment)
+@receiver(post_save, sender=CreditSublineStatusAdjustment)
+@traced()
+def record_subline_adjustment(sender, instance, created, **kwargs):
+    record_adjustment(LEDGER_KINDS[sender], instance, created)
+
+
+@receiver(post_delete, sender=CreditAmountAdjustment)
+@receiver(post_delete, sender=InterestRateAdjustment)
+@receiver(post_delete, sender=CreditSublineStatusAdjustment)
+@traced()
+def record_subline_adjustment_deletion(sender, instance, **kwargs):
+    record_deletion(LEDGER_KINDS[sender], instance, kwargs.get("origin"))
+
+
+@receiver(post_delete, sender=CreditSubline)
+@traced()
+def release_credit_subline_amount(sender, instance, **kwargs):
+    # Filtering by id keeps this a no-op when the credit line itself is being deleted
+    CreditLine.objects.adjust_committed_credit(
+        instance.credit_line_id, -instance.subline_amount
+    )
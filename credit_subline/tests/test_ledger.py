@@ -0,0 +1,215 @@
+from credit_subline.tests.base_test import BaseCreditSublineViewTests
+from credit_line.models import CreditLineAdjustment
+from credit_subline.models import (
+    CreditSubline,
+    CreditAmountAdjustment,
+    InterestRateAdjustment,
+    CreditSublineStatusAdjustment,
+    AdjustmentLedgerEntry,
+)
+from decimal import Decimal
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+
+class AdjustmentLedgerRecordingTests(BaseCreditSublineViewTests):
+    def setUp(self):
+        super().setUp()
+        self.credit_subline = CreditSubline.objects.create(
+            credit_line=self.credit_line,
+            subline_amount=Decimal("50000"),
+            interest_rate=Decimal("5.0"),
+            status="pending",
+        )
+
+    def test_amount_adjustment_creates_current_entry(self):
+        adjustment = CreditAmountAdjustment.objects.create(
+            credit_subline=self.credit_subline,
+            adjusted_amount=Decimal("60000"),
+            reason_for_adjustment="Increase",
+        )
+        entry = AdjustmentLedgerEntry.objects.get(kind="amount", source_id=adjustment.pk)
+        self.assertTrue(entry.is_current)
+        self.assertEqual(entry.credit_line, self.credit_line)
+        self.assertEqual(entry.credit_subline, self.credit_subline)
+        self.assertEqual(entry.previous_amount, Decimal("50000"))
+        self.assertEqual(entry.new_amount, Decimal("60000"))
+        self.assertEqual(entry.adjustment_status, "pending_review")
+        self.assertEqual(entry.reason, "Increase")
+
+    def test_each_adjustment_kind_is_recorded(self):
+        InterestRateAdjustment.objects.create(
+            credit_subline=self.credit_subline,
+            adjusted_interest_rate=Decimal("4.5"),
+            reason_for_adjustment="Loyalty",
+        )
+        CreditSublineStatusAdjustment.objects.create(
+            credit_subline=self.credit_subline,
+            adjusted_status="active",
+            reason_for_adjustment="Review",
+        )
+        CreditLineAdjustment.objects.create(
+            credit_line=self.credit_line,
+            previous_credit_limit=self.credit_line.credit_limit,
+            new_credit_limit=Decimal("2000000"),
+            previous_status=self.credit_line.status,
+            previous_currency=self.credit_line.currency,
+            reason="Growth",
+        )
+
+        kinds = set(
+            AdjustmentLedgerEntry.objects.filter(
+                credit_line=self.credit_line
+            ).values_list("kind", flat=True)
+        )
+        self.assertEqual(kinds, {"interest_rate", "status", "credit_line"})
+
+        rate_entry = AdjustmentLedgerEntry.objects.get(kind="interest_rate")
+        self.assertEqual(rate_entry.new_interest_rate, Decimal("4.5"))
+        status_entry = AdjustmentLedgerEntry.objects.get(kind="status")
+        self.assertEqual(status_entry.previous_status, "pending")
+        self.assertEqual(status_entry.new_status, "active")
+        line_entry = AdjustmentLedgerEntry.objects.get(kind="credit_line")
+        self.assertIsNone(line_entry.credit_subline)
+        self.assertEqual(line_entry.new_amount, Decimal("2000000"))
+
+    def test_status_change_appends_entry_and_retires_previous(self):
+        adjustment = CreditAmountAdjustment.objects.create(
+            credit_subline=self.credit_subline,
+            adjusted_amount=Decimal("60000"),
+            reason_for_adjustment="Increase",
+        )
+        adjustment.adjustment_status = "rejected"
+        adjustment.save()
+
+        entries = AdjustmentLedgerEntry.objects.filter(
+            kind="amount", source_id=adjustment.pk
+        ).order_by("id")
+        self.assertEqual(
+            [(e.adjustment_status, e.is_current) for e in entries],
+            [("pending_review", False), ("rejected", True)],
+        )
+
+    def test_save_without_changes_does_not_append(self):
+        adjustment = CreditSublineStatusAdjustment.objects.create(
+            credit_subline=self.credit_subline,
+            adjusted_status="active",
+            reason_for_adjustment="Review",
+        )
+        adjustment.save()
+
+        self.assertEqual(
+            AdjustmentLedgerEntry.objects.filter(
+                kind="status", source_id=adjustment.pk
+            ).count(),
+            1,
+        )
+
+    def test_payload_change_appends_entry_and_retires_previous(self):
+        adjustment = CreditAmountAdjustment.objects.create(
+            credit_subline=self.credit_subline,
+            adjusted_amount=Decimal("60000"),
+            reason_for_adjustment="Increase",
+        )
+        adjustment.adjusted_amount = Decimal("65000")
+        adjustment.save()
+
+        entries = AdjustmentLedgerEntry.objects.filter(
+            kind="amount", source_id=adjustment.pk
+        ).order_by("id")
+        self.assertEqual(
+            [(e.new_amount, e.adjustment_status, e.is_current) for e in entries],
+            [
+                (Decimal("60000"), "pending_review", False),
+                (Decimal("65000"), "pending_review", True),
+            ],
+        )
+
+        line_adjustment = CreditLineAdjustment.objects.create(
+            credit_line=self.credit_line,
+            new_credit_limit=Decimal("2000000"),
+            reason="Growth",
+        )
+        line_adjustment.new_currency = "usd"
+        line_adjustment.save()
+        current = AdjustmentLedgerEntry.objects.get(
+            kind="credit_line", source_id=line_adjustment.pk, is_current=True
+        )
+        self.assertEqual(current.new_currency, "usd")
+
+    def test_deleting_adjustment_records_a_deleted_entry(self):
+        adjustment = InterestRateAdjustment.objects.create(
+            credit_subline=self.credit_subline,
+            adjusted_interest_rate=Decimal("4.5"),
+            reason_for_adjustment="Loyalty",
+        )
+        adjustment.delete()
+
+        entries = AdjustmentLedgerEntry.objects.filter(kind="interest_rate").order_by("id")
+        self.assertEqual(
+            [(e.adjustment_status, e.is_current) for e in entries],
+            [("pending_review", False), ("deleted", False)],
+        )
+        self.assertEqual(entries[1].new_interest_rate, Decimal("4.5"))
+
+    def test_deleting_credit_line_deletes_its_ledger(self):
+        CreditAmountAdjustment.objects.create(
+            credit_subline=self.credit_subline,
+            adjusted_amount=Decimal("60000"),
+            reason_for_adjustment="Increase",
+        )
+        self.credit_line.delete()
+        self.assertFalse(AdjustmentLedgerEntry.objects.exists())
+
+
+class CreditAdjustmentLedgerViewTests(BaseCreditSublineViewTests, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.credit_subline = CreditSubline.objects.create(
+            credit_line=self.credit_line,
+            subline_amount=Decimal("50000"),
+            interest_rate=Decimal("5.0"),
+            status="pending",
+        )
+        today = timezone.now().date()
+        for days_ago in (3, 1, 2):
+            CreditAmountAdjustment.objects.create(
+                credit_subline=self.credit_subline,
+                adjusted_amount=Decimal("60000"),
+                effective_date=today - timezone.timedelta(days=days_ago),
+                reason_for_adjustment=f"Adjustment {days_ago}",
+            )
+        self.url = reverse(
+            "credit_subline_api:credit_adjustment_ledger",
+            kwargs={"credit_line_pk": self.credit_line.pk},
+        )
+
+    def test_ledger_sorted_by_effective_date(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dates = [entry["effective_date"] for entry in response.data["results"]]
+        self.assertEqual(len(dates), 3)
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_ledger_filter_by_adjustment_status(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(self.url, {"adjustment_status": "approved"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [])
+
+    def test_ledger_requires_staff(self):
+        self.client.force_authenticate(user=self.regular_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_ledger_for_missing_credit_line(self):
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse(
+            "credit_subline_api:credit_adjustment_ledger",
+            kwargs={"credit_line_pk": 999999},
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
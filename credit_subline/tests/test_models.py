@@ -1,5 +1,6 @@
 from accounts.tests.base_test import BaseTest
 from credit_line.models import CreditLine
+from core.models import OutboxEvent
 from decimal import Decimal
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -402,3 +403,74 @@ class CreditSublineStatusAdjustmentTest(BaseCreditSublineViewTests):
         adjustment.save()
         # Verifying the final state is as expected
         self.assertEqual(adjustment.adjustment_status, "approved")
+
+
+class CreditSublineCommittedCreditTests(BaseCreditSublineViewTests):
+    def setUp(self):
+        super().setUp()
+        self.credit_subline = CreditSubline.objects.create(
+            credit_line=self.credit_line,
+            subline_amount=Decimal("400000"),
+            interest_rate=Decimal("5.0"),
+        )
+
+    def test_creation_commits_subline_amount(self):
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.committed_amount, Decimal("400000"))
+        self.assertEqual(self.credit_line.available_amount, Decimal("600000"))
+
+    def test_creation_over_available_credit_is_rejected(self):
+        with self.assertRaises(ValidationError) as context:
+            CreditSubline.objects.create(
+                credit_line=self.credit_line,
+                subline_amount=Decimal("600000.01"),
+                interest_rate=Decimal("5.0"),
+            )
+        self.assertIn("subline_amount", context.exception.message_dict)
+        self.assertEqual(CreditSubline.objects.count(), 1)
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.committed_amount, Decimal("400000"))
+
+    def test_change_amount_moves_difference(self):
+        self.credit_subline.change_amount(Decimal("450000"))
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.committed_amount, Decimal("450000"))
+        self.assertEqual(self.credit_line.available_amount, Decimal("550000"))
+
+    def test_change_amount_over_available_credit_is_rejected(self):
+        with self.assertRaises(ValidationError) as context:
+            self.credit_subline.change_amount(Decimal("1000000.01"))
+        self.assertIn("subline_amount", context.exception.message_dict)
+
+        self.credit_subline.refresh_from_db()
+        self.assertEqual(self.credit_subline.subline_amount, Decimal("400000"))
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.committed_amount, Decimal("400000"))
+        self.assertEqual(self.credit_line.available_amount, Decimal("600000"))
+
+    def test_deletion_releases_subline_amount(self):
+        self.credit_subline.delete()
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.committed_amount, Decimal("0"))
+        self.assertEqual(self.credit_line.available_amount, Decimal("1000000"))
+
+    def test_approved_increase_without_available_credit_is_rejected(self):
+        adjustment = CreditAmountAdjustment.objects.create(
+            credit_subline=self.credit_subline,
+            adjusted_amount=Decimal("700000"),
+            reason_for_adjustment="Increase",
+        )
+        # Reserved by another subline after the approval was checked
+        CreditLine.objects.reserve_credit(self.credit_line.pk, Decimal("500000"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            adjustment.adjustment_status = "approved"
+            adjustment.save()
+
+        adjustment.refresh_from_db()
+        self.assertEqual(adjustment.adjustment_status, "rejected")
+        self.credit_subline.refresh_from_db()
+        self.assertEqual(self.credit_subline.subline_amount, Decimal("400000"))
+        event = OutboxEvent.objects.get(topic="credit_subline.amount_adjustment_rejected")
+        self.assertEqual(event.aggregate_id, adjustment.pk)
+        self.assertIn("exceeds the available credit", event.payload["errors"][0])
@@ -52,6 +52,10 @@ class CreditSublineAdjustmentSignalTests(BaseCreditSublineViewTests):
         # Assert the subline_amount has been updated correctly
         self.assertEqual(self.credit_subline.subline_amount, Decimal("60000"))
 
+        # The difference is committed against the credit line
+        self.credit_line.refresh_from_db()
+        self.assertEqual(self.credit_line.committed_amount, Decimal("60000"))
+
         # Assert the adjustment_status and effective_date are set correctly
         amount_adjustment.refresh_from_db()
         self.assertEqual(amount_adjustment.adjustment_status, "implemented")
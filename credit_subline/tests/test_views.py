@@ -20,6 +20,14 @@ class CreateCreditSublineViewTests(BaseCreditSublineViewTests, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(CreditSubline.objects.count(), 1)
 
+    def test_create_credit_subline_over_available_credit(self):
+        self.client.force_authenticate(user=self.admin_user)
+        data = {**self.data, "subline_amount": Decimal("1000000.01")}
+        response = self.client.post(self.create_url, data=data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("subline_amount", response.data)
+        self.assertFalse(CreditSubline.objects.exists())
+
     def test_create_credit_subline_unauthorized(self):
         self.client.force_authenticate(user=self.user)
         response = self.client.post(self.create_url, data=self.data, format="json")
@@ -311,6 +319,20 @@ class CreditAmountAdjustmentViewTests(BaseCreditSublineViewTests, APITestCase):
         self.adjustment.refresh_from_db()
         self.assertEqual(self.adjustment.adjustment_status, "approved")
 
+    def test_status_update_over_available_credit(self):
+        self.credit_line.refresh_from_db()
+        self.adjustment.adjusted_amount = (
+            self.credit_subline.subline_amount + self.credit_line.available_amount + 1
+        )
+        self.adjustment.save()
+
+        self.client.force_authenticate(user=self.superuser)
+        data = {"adjustment_status": "approved"}
+        response = self.client.patch(self.update_url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.adjustment.refresh_from_db()
+        self.assertEqual(self.adjustment.adjustment_status, "pending_review")
+
     def test_status_update_by_non_superuser(self):
         self.client.force_authenticate(user=self.admin_user)
         data = {"adjustment_status": "approved"}
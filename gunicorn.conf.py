@@ -0,0 +1,101 @@
+"""
+Production gunicorn configuration.
+
+    gunicorn althea.wsgi
+
+gunicorn picks this file up from the working directory. The application is
+loaded once in the master (preload_app), including pandas, the holiday
+calendar and the OpenAPI schema, and forked workers share those pages
+copy-on-write. Every value can be overridden with the GUNICORN_* environment
+variables below.
+"""
+
+import gc
+import multiprocessing
+import os
+
+import decouple
+
+# Load the numeric stack in the master so workers inherit it
+os.environ.setdefault("PRELOAD_FINANCE_UTILS", "True")
+# and the OpenAPI schema, generated there when it was not prebuilt
+os.environ.setdefault("PRELOAD_OPENAPI_SCHEMA", "True")
+
+bind = decouple.config("GUNICORN_BIND", default="0.0.0.0:8000")
+workers = decouple.config(
+    "GUNICORN_WORKERS", default=multiprocessing.cpu_count() * 2 + 1, cast=int
+)
+threads = decouple.config("GUNICORN_THREADS", default=1, cast=int)
+preload_app = decouple.config("GUNICORN_PRELOAD", default=True, cast=bool)
+
+# Recycle workers to bound memory growth; jitter avoids restarting all at once
+max_requests = decouple.config("GUNICORN_MAX_REQUESTS", default=1000, cast=int)
+max_requests_jitter = decouple.config(
+    "GUNICORN_MAX_REQUESTS_JITTER", default=100, cast=int
+)
+
+# A worker silent for longer than timeout is killed; on shutdown or reload
+# workers get graceful_timeout to finish in-flight requests.
+timeout = decouple.config("GUNICORN_TIMEOUT", default=30, cast=int)
+graceful_timeout = decouple.config("GUNICORN_GRACEFUL_TIMEOUT", default=30, cast=int)
+keepalive = decouple.config("GUNICORN_KEEPALIVE", default=5, cast=int)
+
+# Heartbeat files in memory rather than on the container's overlay filesystem
+worker_tmp_dir = decouple.config("GUNICORN_WORKER_TMP_DIR", default="/dev/shm")
+
+accesslog = decouple.config("GUNICORN_ACCESSLOG", default="-")
+errorlog = "-"
+
+# Shared by the workers to aggregate request metrics (see core.metrics)
+metrics_dir = decouple.config("METRICS_MULTIPROC_DIR", default="")
+
+
+def on_starting(server):
+    # Start the metrics of this server from zero
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for name in os.listdir(metrics_dir):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+# Database connections a worker inherited from the master. They are kept
+# referenced: closing one, even from the garbage collector, would send a
+# Terminate message on the socket the master and the other workers share.
+_inherited_connections = []
+
+
+def pre_fork(server, worker):
+    # Close the connections opened while preloading once, in the master,
+    # before any worker can inherit them
+    if server.cfg.preload_app:
+        from django.db import connections
+
+        connections.close_all()
+    # Move everything allocated while preloading to a permanent generation so
+    # the collector in the workers does not touch (and copy) those pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Never use a connection opened in the master; drop it without closing so
+    # the worker connects again on its first query
+    if server.cfg.preload_app:
+        from django.db import connections
+
+        for connection in connections.all(initialized_only=True):
+            if connection.connection is not None:
+                _inherited_connections.append(connection.connection)
+                connection.connection = None
+
+
+def worker_exit(server, worker):
+    from core.metrics import flush
+
+    flush(force=True)
+
+
+def child_exit(server, worker):
+    if metrics_dir:
+        from core.metrics import mark_process_dead
+
+        mark_process_dead(worker.pid, metrics_dir)
@@ -7,3 +7,9 @@ class LoanManagementConfig(AppConfig):
 
     def ready(self):
         import loan_management.signals  # noqa: F401
+        from django.conf import settings
+
+        if settings.PRELOAD_FINANCE_UTILS:
+            from loan_management.finance_utils import preload
+
+            preload()
@@ -1,29 +1,71 @@
-import pandas as pd
-from pandas.tseries.holiday import AbstractHolidayCalendar, nearest_workday, Holiday
-from pandas.tseries.offsets import CustomBusinessDay
-from pandas import Timestamp
-import numpy_financial as npf
-
-
-class MexicanHolidaysCalendar(AbstractHolidayCalendar):
-    rules = [
-        Holiday("New Year", month=1, day=1, observance=nearest_workday),
-        Holiday("Constitution Day", month=2, day=5, observance=nearest_workday),
-        Holiday("Benito Juarez Birthday", month=3, day=21, observance=nearest_workday),
-        Holiday("Labor Day", month=5, day=1, observance=nearest_workday),
-        Holiday("Independence Day", month=9, day=16, observance=nearest_workday),
-        Holiday("Revolution Day", month=11, day=20, observance=nearest_workday),
-        Holiday("Christmas", month=12, day=25, observance=nearest_workday),
-    ]
+"""
+Amortization helpers.
+
+pandas and numpy_financial are heavy to import and the holiday calendar is
+costly to build, so both are deferred until a schedule is actually computed.
+Workers that will amortize can pay that cost up front with preload().
+"""
+
+import functools
+from core.tracing import traced
+
+
+@functools.lru_cache(maxsize=None)
+def get_mexican_holidays_calendar():
+    from pandas.tseries.holiday import (
+        AbstractHolidayCalendar,
+        nearest_workday,
+        Holiday,
+    )
+
+    class MexicanHolidaysCalendar(AbstractHolidayCalendar):
+        rules = [
+            Holiday("New Year", month=1, day=1, observance=nearest_workday),
+            Holiday("Constitution Day", month=2, day=5, observance=nearest_workday),
+            Holiday(
+                "Benito Juarez Birthday", month=3, day=21, observance=nearest_workday
+            ),
+            Holiday("Labor Day", month=5, day=1, observance=nearest_workday),
+            Holiday("Independence Day", month=9, day=16, observance=nearest_workday),
+            Holiday("Revolution Day", month=11, day=20, observance=nearest_workday),
+            Holiday("Christmas", month=12, day=25, observance=nearest_workday),
+        ]
+
+    return MexicanHolidaysCalendar
 
 
-mex_bday = CustomBusinessDay(calendar=MexicanHolidaysCalendar())
+@functools.lru_cache(maxsize=None)
+def get_mex_bday():
+    from pandas.tseries.offsets import CustomBusinessDay
+
+    return CustomBusinessDay(calendar=get_mexican_holidays_calendar()())
+
+
+def __getattr__(name):
+    # Keep the old module-level names working without building them at import
+    if name == "MexicanHolidaysCalendar":
+        return get_mexican_holidays_calendar()
+    if name == "mex_bday":
+        return get_mex_bday()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def preload():
+    """
+    Import pandas and numpy_financial and build the business day calendar
+    now rather than on the first amortization, e.g. in a worker that is
+    about to fork or that serves amortization traffic.
+    """
+    import pandas  # noqa: F401
+    import numpy_financial  # noqa: F401
+
+    get_mex_bday()
 
 
 def adjust_payment_date(date):
     """Adjust the payment date to the previous
     valid business day if it falls on a holiday or weekend."""
-    return mex_bday.rollback(date)
+    return get_mex_bday().rollback(date)
 
 
 def calculate_periodic_interest_rate(annual_rate, frequency):
@@ -42,6 +84,7 @@ def calculate_periodic_interest_rate(annual_rate, frequency):
     return annual_rate / frequency_map[frequency]
 
 
+@traced()
 def generate_amortization_schedule(
     subline_amount,
     interest_rate,
@@ -51,6 +94,10 @@ def generate_amortization_schedule(
     payment_due_day,
 ):
     """Generate an amortization schedule with specified parameters."""
+    import pandas as pd
+    import numpy_financial as npf
+    from pandas import Timestamp
+
     period_interest_rate = calculate_periodic_interest_rate(
         interest_rate, repayment_frequency
     )
@@ -1,11 +1,14 @@
 from loan_management.models import LoanTerm, PeriodicPayment
 from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
+from core.tracing import span, traced
+from core.outbox import emit_event
 
 _previous_loan_term_status = {}
 
 
 @receiver(pre_save, sender=LoanTerm)
+@traced()
 def capture_previous_loan_term_status(sender, instance, **kwargs):
     if instance is not None and instance.pk:
         try:
@@ -18,6 +21,7 @@ def capture_previous_loan_term_status(sender, instance, **kwargs):
 
 
 @receiver(post_save, sender=LoanTerm)
+@traced()
 def generate_periodic_payments(sender, instance, created, **kwargs):
     if instance is None or instance.status != "approved" or not instance.pk or created:
         return
@@ -59,4 +63,16 @@ def generate_periodic_payments(sender, instance, created, **kwargs):
             payments.append(payment)
 
         # Bulk create PeriodicPayment instances
-        PeriodicPayment.objects.bulk_create(payments)
+        with span("loan_management.periodic_payments.bulk_create", payments=len(payments)):
+            PeriodicPayment.objects.bulk_create(payments)
+
+        emit_event(
+            "loan_term.schedule_generated",
+            instance,
+            {
+                "credit_subline_id": instance.credit_subline_id,
+                "payments": len(payments),
+                "first_due_date": payments[0].due_date if payments else None,
+                "last_due_date": payments[-1].due_date if payments else None,
+            },
+        )
@@ -1,6 +1,9 @@
 from django.test import TestCase
+import subprocess
+import sys
 import pandas as pd
 
+from loan_management import finance_utils
 from loan_management.finance_utils import (
     calculate_periodic_interest_rate,
     adjust_payment_date,
@@ -8,6 +11,28 @@ from loan_management.finance_utils import (
 )
 
 
+class TestLazyImports(TestCase):
+    def test_import_does_not_load_pandas(self):
+        code = (
+            "import sys, loan_management.finance_utils; "
+            "print(sorted(m for m in ('pandas', 'numpy_financial') if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+
+    def test_module_level_calendar_names(self):
+        self.assertIs(finance_utils.mex_bday, finance_utils.get_mex_bday())
+        self.assertEqual(
+            finance_utils.MexicanHolidaysCalendar.__name__, "MexicanHolidaysCalendar"
+        )
+
+    def test_preload(self):
+        finance_utils.preload()
+        self.assertEqual(finance_utils.get_mex_bday.cache_info().currsize, 1)
+
+
 class TestPeriodicInterestRate(TestCase):
     def test_periodic_interest_rate_monthly(self):
         self.assertEqual(calculate_periodic_interest_rate(0.12, "monthly"), 0.01)
@@ -144,7 +144,7 @@ class UpdateLoanTermStatusSerializerTest(BaseCreditSublineViewTests):
         cls.credit_subline = CreditSubline.objects.create(
             credit_line=cls.credit_line,
             subline_type=cls.credit_type,
-            subline_amount=500000,
+            subline_amount=300000,
             interest_rate=5.5,
             status="active",
         )
@@ -152,7 +152,7 @@ class UpdateLoanTermStatusSerializerTest(BaseCreditSublineViewTests):
         cls.credit_subline_2 = CreditSubline.objects.create(
             credit_line=cls.credit_line,
             subline_type=cls.credit_type,
-            subline_amount=500000,
+            subline_amount=300000,
             interest_rate=5.5,
             status="active",
         )
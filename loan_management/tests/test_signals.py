@@ -3,6 +3,7 @@ from credit_subline.models import CreditSubline
 from decimal import Decimal
 from django.utils import timezone
 from loan_management.models import LoanTerm, PeriodicPayment
+from core.models import OutboxEvent
 from loan_management.signals import (
     generate_periodic_payments,
     _previous_loan_term_status,
@@ -48,6 +49,17 @@ class GeneratePeriodicPaymentsSignalTests(BaseCreditSublineViewTests):
             PeriodicPayment.objects.count(), self.expected_number_of_payments
         )
 
+    def test_schedule_generated_event_emitted(self):
+        self.loan_term.status = "approved"
+        self.loan_term.save()
+
+        event = OutboxEvent.objects.get(topic="loan_term.schedule_generated")
+        self.assertEqual(event.aggregate_type, "loan_management.loanterm")
+        self.assertEqual(event.aggregate_id, self.loan_term.pk)
+        self.assertEqual(
+            event.payload["payments"], self.expected_number_of_payments
+        )
+
     def test_generate_periodic_payments_signal_rejected(self):
         # Change LoanTerm status to rejected
         self.loan_term.status = "rejected"